@@ -0,0 +1,33 @@
+"""Compare decode throughput of the available JSON codecs on sample HitBTC frames.
+
+Run with ``python benchmarks/bench_codecs.py [n_iterations]``.
+"""
+# Import Built-Ins
+import sys
+import timeit
+
+# Import Homebrew
+from hitbtc.codecs import available_codecs, get_codec
+
+from frames import TICKER, UPDATE_TRADES, UPDATE_ORDERBOOK, snapshot_orderbook
+
+FRAMES = {'ticker': TICKER, 'updateTrades': UPDATE_TRADES, 'updateOrderbook': UPDATE_ORDERBOOK,
+          'snapshotOrderbook': snapshot_orderbook()}
+
+
+def main(n=20000):
+    """Run the benchmark and print frames/sec per codec and frame type."""
+    codecs = [get_codec(name) for name in available_codecs()]
+    print("%-20s" % 'frame' + ''.join('%14s' % codec.name for codec in codecs))
+    for label, frame in FRAMES.items():
+        row = "%-20s" % label
+        data = frame.encode('utf-8')
+        for codec in codecs:
+            seconds = timeit.timeit(lambda: codec.loads(data), number=n)
+            row += '%12.0f/s' % (n / seconds)
+        print(row)
+    print("(bytes input, decoded frames per second)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
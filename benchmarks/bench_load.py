@@ -0,0 +1,123 @@
+"""Load test the client against the local mock server (see hitbtc.mockserver).
+
+Steps up the rate of order book updates until the client no longer keeps up, i.e. receives
+less than 99% of the messages the server sent, and reports the highest sustained rate. Then
+measures the round-trip time of orders placed one by one, and of a pipelined batch.
+
+The server runs in a thread of the same process, so the two compete for the GIL; the rates
+reported are a lower bound of what the client sustains against a remote server.
+
+Requires the websockets package. Run with
+``python benchmarks/bench_load.py [n_symbols] [seconds_per_step] [n_orders]``.
+"""
+# Import Built-Ins
+import logging
+import queue
+import sys
+import time
+from threading import Event, Thread
+
+# Import Homebrew
+from hitbtc import HitBTC
+from hitbtc.mockserver import MockHitBTCServer
+
+
+def drain(client, stop, counter):
+    """Receive items until ``stop`` is set, counting them."""
+    while not stop.is_set():
+        try:
+            client.recv(timeout=0.1)
+        except queue.Empty:
+            continue
+        counter[0] += 1
+
+
+def throughput(n_symbols, rate, seconds):
+    """Subscribe to the books of ``n_symbols`` symbols, updated ``rate`` times per second.
+
+    :return: tuple of messages per second sent by the server and received by the client
+    """
+    server = MockHitBTCServer(symbols=n_symbols, rate=rate)
+    server.start()
+    client = HitBTC(url=server.url, silent=True, log_level=logging.WARNING, q_maxsize=100000)
+    client.start()
+    while not client.is_connected():
+        time.sleep(0.01)
+    for symbol in server.markets:
+        client.subscribe_book(symbol=symbol).result(5)
+    received, stop = [0], Event()
+    consumer = Thread(target=drain, args=(client, stop, received), daemon=True)
+    consumer.start()
+    # Let subscriptions settle, then measure a window
+    time.sleep(0.5)
+    sent_before, received_before = server.messages_sent, received[0]
+    time.sleep(seconds)
+    sent, got = server.messages_sent - sent_before, received[0] - received_before
+    stop.set()
+    client.stop()
+    server.stop()
+    return sent / seconds, got / seconds
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def round_trips(n_orders):
+    """Place and cancel ``n_orders`` orders one by one, then place and cancel them as batches.
+
+    :return: dict of latency percentiles (seconds) of single orders, and of the batches
+    """
+    server = MockHitBTCServer(symbols=1, rate=1)
+    server.start()
+    client = HitBTC('key', 'secret', url=server.url, silent=True, log_level=logging.WARNING)
+    client.start()
+    while not client.is_connected():
+        time.sleep(0.01)
+    client.login().result(5)
+    client.subscribe_reports().result(5)
+    latencies = []
+    for i in range(n_orders):
+        future = client.place_order(symbol='ETHBTC', side='buy', quantity='0.001',
+                                    price='0.010000', clientOrderId='order%d' % i)
+        future.result(5)
+        latencies.append(future.latency)
+        client.cancel_order(clientOrderId='order%d' % i).result(5)
+    orders = [{'symbol': 'ETHBTC', 'side': 'buy', 'quantity': '0.001', 'price': '0.010000',
+               'clientOrderId': 'batch%d' % i} for i in range(n_orders)]
+    started = time.perf_counter()
+    batch = client.place_orders(orders).result(10)
+    batch_seconds = time.perf_counter() - started
+    client.cancel_orders([order['clientOrderId'] for order in orders]).result(10)
+    client.stop()
+    server.stop()
+    return {'p50': percentile(latencies, 0.5), 'p99': percentile(latencies, 0.99),
+            'batch': batch_seconds, 'batch_ok': len(batch.succeeded)}
+
+
+def main(n_symbols=10, seconds=2, n_orders=200):
+    """Run the load test and print its results."""
+    print("Order book updates, %s symbols, %ss per step" % (n_symbols, seconds))
+    sustained = 0
+    rate = 100
+    while True:
+        sent, received = throughput(n_symbols, rate, seconds)
+        print("%8d updates/s/symbol: sent %10.0f msg/s, received %10.0f msg/s" %
+              (rate, sent, received))
+        # The server itself may fall behind the requested rate; judge by what it sent
+        if received < 0.99 * sent or sent < 0.5 * rate * n_symbols:
+            break
+        sustained = received
+        rate *= 2
+    print("Max sustained: %.0f msg/s" % sustained)
+
+    results = round_trips(n_orders)
+    print("Order round-trip: p50 %.1f us, p99 %.1f us" % (results['p50'] * 1e6,
+                                                         results['p99'] * 1e6))
+    print("Batch of %s orders: %.1f ms, %s ok" % (n_orders, results['batch'] * 1e3,
+                                                  results['batch_ok']))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
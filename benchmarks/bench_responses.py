@@ -0,0 +1,65 @@
+"""Measure the cost of a getSymbols round-trip through the response path.
+
+Compares eager formatting, as done prior to lazy response summaries, with the lazy path when
+printing, when silent but logging summaries at DEBUG level (to wss.log), and when silent at the
+connector's default INFO level, which formats nothing.
+
+Run with ``python benchmarks/bench_responses.py [n_iterations] [n_symbols]``.
+"""
+# Import Built-Ins
+import contextlib
+import logging
+import os
+import sys
+import time
+
+# Import Homebrew
+from hitbtc.connector import HitBTCConnector
+from hitbtc.utils import ResponseSummary
+
+from frames import get_symbols_response
+
+
+class EagerConnector(HitBTCConnector):
+    """Connector formatting every response eagerly, as done prior to ResponseSummary."""
+
+    def _handle_request_response(self, request, response):
+        print(request)
+        text = str(ResponseSummary(request['method'], request, response['result']))
+        self.log.info(text)
+        self.echo(text)
+        self._deliver('Response', 'Success', (request, response))
+
+
+def run(connector, frame, n):
+    """Send ``n`` getSymbols requests and feed their responses to the connector.
+
+    :return: mean seconds per round-trip
+    """
+    started = time.perf_counter()
+    for _ in range(n):
+        i_d = connector.requests.next_id()
+        connector.requests.add(i_d, {'method': 'getSymbols', 'params': {}, 'id': i_d},
+                               connector._create_future())
+        connector._on_message(None, frame.replace('"id":1}', '"id":%d}' % i_d))
+        connector.q.get_nowait()
+    return (time.perf_counter() - started) / n
+
+
+def main(n=200, n_symbols=400):
+    """Run the benchmark and print the mean round-trip time per configuration."""
+    frame = get_symbols_response(1, n_symbols)
+    configs = [('eager (before)', EagerConnector, False, None),
+               ('lazy, printing', HitBTCConnector, False, None),
+               ('lazy, silent, DEBUG', HitBTCConnector, True, logging.DEBUG),
+               ('lazy, silent', HitBTCConnector, True, None)]
+    print("getSymbols response with %s symbols, %s round-trips" % (n_symbols, n))
+    for label, connector_cls, silent, log_level in configs:
+        connector = connector_cls(silent=silent, log_level=log_level)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            seconds = run(connector, frame, n)
+        print("%-20s %10.1f us/round-trip" % (label, seconds * 1e6))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
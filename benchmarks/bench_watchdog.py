@@ -0,0 +1,57 @@
+"""Compare per-message time-out handling: Timer re-arming versus the Watchdog timestamp.
+
+Run with ``python benchmarks/bench_watchdog.py [n_messages]``.
+"""
+# Import Built-Ins
+import sys
+import time
+from threading import Timer
+
+# Import Homebrew
+from hitbtc.connector import HitBTCConnector
+
+FRAME = '{"jsonrpc":"2.0","method":"ticker","params":{"ask":"0.054464","bid":"0.054463",' \
+        '"last":"0.054463","open":"0.057133","low":"0.053615","high":"0.057559",' \
+        '"volume":"33068.346","volumeQuote":"1832.687530809","timestamp":"2017-10-19T15:45:44.941Z",' \
+        '"symbol":"ETHBTC"}}'
+
+
+class TimerChurnConnector(HitBTCConnector):
+    """Connector re-arming a threading.Timer per message, as done prior to the Watchdog."""
+
+    def _on_message(self, ws, message):
+        if self.connection_timer:
+            self.connection_timer.cancel()
+        self.connection_timer = Timer(self.connection_timeout, self._connection_timed_out)
+        self.connection_timer.start()
+        super(TimerChurnConnector, self)._on_message(ws, message)
+
+
+def run(connector, n):
+    """Feed ``n`` ticker frames to ``connector`` and return the achieved messages/sec."""
+    start = time.perf_counter()
+    for _ in range(n):
+        connector._on_message(None, FRAME)
+        connector.q.get_nowait()
+    return n / (time.perf_counter() - start)
+
+
+def main(n=20000):
+    """Run the benchmark and print the results."""
+    watchdog = HitBTCConnector(silent=True)
+    watchdog._start_timer()
+    churn = TimerChurnConnector(silent=True)
+    churn.connection_timer = None
+    try:
+        before = run(churn, n)
+        after = run(watchdog, n)
+    finally:
+        churn.connection_timer.cancel()
+        watchdog._stop_timer()
+    print("Timer per message: %10.0f msg/s" % before)
+    print("Watchdog:          %10.0f msg/s" % after)
+    print("Speed-up:          %10.1fx" % (after / before))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,55 @@
+"""Sample HitBTC frames, shaped after frames recorded from the v2 websocket API."""
+# Import Built-Ins
+import json
+import random
+
+TICKER = '{"jsonrpc":"2.0","method":"ticker","params":{"ask":"0.054464","bid":"0.054463",' \
+         '"last":"0.054463","open":"0.057133","low":"0.053615","high":"0.057559",' \
+         '"volume":"33068.346","volumeQuote":"1832.687530809",' \
+         '"timestamp":"2017-10-19T15:45:44.941Z","symbol":"ETHBTC"}}'
+
+UPDATE_TRADES = '{"jsonrpc":"2.0","method":"updateTrades","params":{"data":[{"id":54469813,' \
+                '"price":"0.054670","quantity":"0.183","side":"buy",' \
+                '"timestamp":"2017-10-19T16:34:25.041Z"}],"symbol":"ETHBTC"}}'
+
+UPDATE_ORDERBOOK = '{"jsonrpc":"2.0","method":"updateOrderbook","params":{"ask":[{"price":' \
+                   '"0.054590","size":"0.000"},{"price":"0.054591","size":"0.000"}],"bid":[{' \
+                   '"price":"0.054504","size":"0.000"}],"symbol":"ETHBTC","sequence":8073830}}'
+
+
+def snapshot_orderbook(symbol='ETHBTC', depth=100, sequence=8073827):
+    """Return a snapshotOrderbook frame with ``depth`` levels per side."""
+    rng = random.Random(depth)
+    asks = [{'price': '%.6f' % (0.054588 + i * 1e-6), 'size': '%.3f' % rng.uniform(0.001, 50)}
+            for i in range(depth)]
+    bids = [{'price': '%.6f' % (0.054558 - i * 1e-6), 'size': '%.3f' % rng.uniform(0.001, 50)}
+            for i in range(depth)]
+    return json.dumps({'jsonrpc': '2.0', 'method': 'snapshotOrderbook',
+                       'params': {'ask': asks, 'bid': bids, 'symbol': symbol,
+                                  'sequence': sequence}}, separators=(',', ':'))
+
+
+def update_orderbook(symbol='ETHBTC', sequence=8073828, levels=3, seed=None):
+    """Return an updateOrderbook frame changing ``levels`` price levels per side."""
+    rng = random.Random(seed if seed is not None else sequence)
+    asks = [{'price': '%.6f' % (0.054588 + rng.randrange(100) * 1e-6),
+             'size': rng.choice(('0.000', '%.3f' % rng.uniform(0.001, 50)))}
+            for _ in range(levels)]
+    bids = [{'price': '%.6f' % (0.054558 - rng.randrange(100) * 1e-6),
+             'size': rng.choice(('0.000', '%.3f' % rng.uniform(0.001, 50)))}
+            for _ in range(levels)]
+    return json.dumps({'jsonrpc': '2.0', 'method': 'updateOrderbook',
+                       'params': {'ask': asks, 'bid': bids, 'symbol': symbol,
+                                  'sequence': sequence}}, separators=(',', ':'))
+
+
+def get_symbols_response(i_d=1, n=400):
+    """Return a getSymbols response frame listing ``n`` symbols."""
+    result = [{'id': 'SYM%dBTC' % i, 'baseCurrency': 'SYM%d' % i, 'quoteCurrency': 'BTC',
+               'quantityIncrement': '0.001', 'tickSize': '0.000001',
+               'takeLiquidityRate': '0.001', 'provideLiquidityRate': '-0.0001',
+               'feeCurrency': 'BTC'} for i in range(n)]
+    return json.dumps({'jsonrpc': '2.0', 'result': result, 'id': i_d}, separators=(',', ':'))
+
+
+STREAM = [TICKER, UPDATE_TRADES, UPDATE_ORDERBOOK, snapshot_orderbook()]
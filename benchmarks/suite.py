@@ -0,0 +1,265 @@
+"""Benchmark suite of the connector's hot paths, storing results per version.
+
+Covers frame decoding and dispatch per frame type, the queue handoff to ``recv()``, response
+correlation in ``_handle_response``, login signing in ``authenticate`` and - if the websockets
+package is installed - the order round-trip against the local mock server.
+
+Results are written to ``benchmarks/results/<label>.json``; the label defaults to the output of
+``git describe``, or the package version. Pass ``--compare <label>`` to print the change
+relative to an earlier run, flagging regressions beyond ``--threshold`` (default 10%)::
+
+    python benchmarks/suite.py --label before
+    python benchmarks/suite.py --compare before
+
+Run ``python benchmarks/suite.py --help`` for all options.
+"""
+# Import Built-Ins
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from threading import Thread
+
+# Import Homebrew
+from hitbtc.connector import HitBTCConnector
+
+from frames import TICKER, UPDATE_TRADES, snapshot_orderbook, update_orderbook
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+CASES = {}
+
+
+def case(name, unit='ns/op'):
+    """Register a benchmark case.
+
+    The decorated function is called with the number of operations to run, and returns the
+    seconds they took - or, for latency cases, a list of latencies in seconds.
+    """
+    def register(func):
+        CASES[name] = (func, unit)
+        return func
+    return register
+
+
+def connector(**kwargs):
+    """Return a connector which isn't connected, and doesn't print or log below WARNING."""
+    kwargs.setdefault('silent', True)
+    kwargs.setdefault('log_level', logging.WARNING)
+    return HitBTCConnector(**kwargs)
+
+
+def feed(conn, frames, n):
+    """Pass ``n`` frames, cycling through ``frames``, to the connector.
+
+    :return: seconds taken
+    """
+    on_message = conn._on_message
+    started = time.perf_counter()
+    for i in range(n):
+        on_message(None, frames[i % len(frames)])
+    return time.perf_counter() - started
+
+
+@case('decode.ticker')
+def decode_ticker(n):
+    return feed(connector(stdout_only=True), [TICKER], n)
+
+
+@case('decode.ticker.profiled')
+def decode_ticker_profiled(n):
+    """Like decode.ticker, with 1 in 100 frames profiled; see hitbtc.profiling."""
+    return feed(connector(stdout_only=True, profile=100), [TICKER], n)
+
+
+@case('decode.trades')
+def decode_trades(n):
+    return feed(connector(stdout_only=True), [UPDATE_TRADES], n)
+
+
+@case('decode.orderbook_snapshot')
+def decode_orderbook_snapshot(n):
+    return feed(connector(stdout_only=True), [snapshot_orderbook()], n)
+
+
+@case('decode.orderbook_update')
+def decode_orderbook_update(n):
+    # Sequences must increase, lest updates are discarded as stale
+    conn = connector(stdout_only=True)
+    conn._on_message(None, snapshot_orderbook(sequence=1))
+    frames = [update_orderbook(sequence=i + 2) for i in range(n)]
+    return feed(conn, frames, n)
+
+
+@case('recv.handoff', unit='ns latency p50')
+def recv_handoff(n):
+    """Time from placing an item on the queue until recv() returns it on another thread.
+
+    One item is in flight at a time, so the consumer is blocked in recv() when it arrives, as
+    it is between messages.
+    """
+    conn = connector()
+    latencies = []
+
+    def consume():
+        for _ in range(n):
+            sent_at = conn.recv()
+            latencies.append(time.perf_counter() - sent_at)
+
+    consumer = Thread(target=consume)
+    consumer.start()
+    for i in range(n):
+        conn.put(time.perf_counter())
+        while len(latencies) <= i:
+            time.sleep(0)
+    consumer.join()
+    return latencies
+
+
+@case('response.correlate')
+def response_correlate(n):
+    """Correlate newOrder responses with their pending requests."""
+    conn = connector(stdout_only=True)
+    result = {'id': '4345613661', 'clientOrderId': '57d5525562c945448e3cbd559bd068c3',
+              'symbol': 'ETHBTC', 'side': 'sell', 'status': 'new', 'type': 'limit',
+              'timeInForce': 'GTC', 'quantity': '0.063', 'price': '0.046016',
+              'cumQuantity': '0.000', 'postOnly': False, 'createdAt': '2017-05-15T17:01:05.092Z',
+              'updatedAt': '2017-05-15T17:01:05.092Z', 'reportType': 'new'}
+    requests = [{'method': 'newOrder', 'params': {}, 'id': i} for i in range(1, n + 1)]
+    responses = [{'jsonrpc': '2.0', 'result': result, 'id': i} for i in range(1, n + 1)]
+    create_future = conn._create_future
+    started = time.perf_counter()
+    for request, response in zip(requests, responses):
+        conn.requests.add(request['id'], request, create_future())
+        conn._handle_response(response)
+    return time.perf_counter() - started
+
+
+@case('login.sign')
+def login_sign(n):
+    """Sign login payloads; the connector isn't connected, so nothing is sent."""
+    conn = connector()
+    authenticate = conn.authenticate
+    started = time.perf_counter()
+    for i in range(n):
+        authenticate('key', 'secret', custom_nonce=str(i))
+    return time.perf_counter() - started
+
+
+@case('order.round_trip', unit='ns latency p50')
+def order_round_trip(n):
+    """Place orders one by one against the local mock server."""
+    from hitbtc import HitBTC
+    from hitbtc.mockserver import MockHitBTCServer
+    server = MockHitBTCServer(symbols=1, rate=1)
+    server.start()
+    client = HitBTC('key', 'secret', url=server.url, silent=True, log_level=logging.WARNING)
+    client.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not client.is_connected() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        client.login().result(5)
+        latencies = []
+        for i in range(n):
+            future = client.place_order(symbol='ETHBTC', side='buy', quantity='0.001',
+                                        price='0.010000', clientOrderId='bench%d' % i)
+            future.result(5)
+            latencies.append(future.latency)
+        return latencies
+    finally:
+        client.stop()
+        server.stop()
+
+
+ITERATIONS = {'recv.handoff': 20000, 'response.correlate': 20000, 'login.sign': 20000,
+              'order.round_trip': 500, 'decode.orderbook_snapshot': 2000}
+
+
+def run_case(name, repeat, scale):
+    """Run a case ``repeat`` times, returning the median ns per op, or the p50 latency in ns."""
+    func, unit = CASES[name]
+    n = max(1, int(ITERATIONS.get(name, 50000) * scale))
+    values = []
+    for _ in range(repeat):
+        outcome = func(n)
+        if isinstance(outcome, list):
+            values.append(statistics.median(outcome) * 1e9)
+        else:
+            values.append(outcome / n * 1e9)
+    return {'value': statistics.median(values), 'min': min(values), 'unit': unit, 'n': n,
+            'repeat': repeat}
+
+
+def default_label():
+    """Return ``git describe`` of the working tree, or the package version."""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        with open(os.path.join(os.path.dirname(RESULTS_DIR), os.pardir, 'setup.py')) as f:
+            return re.search(r"VERSION = '([^']+)'", f.read()).group(1)
+
+
+def load(label):
+    """Load the results stored under ``label``, which may also be a path."""
+    path = label if os.path.exists(label) else os.path.join(RESULTS_DIR, label + '.json')
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    """Run the suite, store and print its results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('cases', nargs='*', help='cases to run, by name prefix; default: all')
+    parser.add_argument('--label', help='name to store the results under')
+    parser.add_argument('--compare', help='label or path of results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown reported as a regression')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0, help='multiplies all iterations')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args(argv)
+
+    names = [name for name in CASES if not args.cases or name.startswith(tuple(args.cases))]
+    if importlib.util.find_spec('websockets') is None:
+        print("websockets isn't installed, skipping order.round_trip")
+        names = [name for name in names if name != 'order.round_trip']
+
+    label = args.label or default_label()
+    baseline = load(args.compare)['results'] if args.compare else {}
+    results = {}
+    regressions = []
+    print("%-28s %14s  %-16s %s" % ('case', 'value', 'unit', 'change' if baseline else ''))
+    for name in names:
+        results[name] = result = run_case(name, args.repeat, args.scale)
+        change = ''
+        if name in baseline:
+            ratio = result['value'] / baseline[name]['value'] - 1
+            change = '%+.1f%%' % (ratio * 100)
+            if ratio > args.threshold:
+                change += '  REGRESSION'
+                regressions.append(name)
+        print("%-28s %14.1f  %-16s %s" % (name, result['value'], result['unit'], change))
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, label + '.json')
+        with open(path, 'w') as f:
+            json.dump({'label': label, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'python': platform.python_version(), 'platform': platform.platform(),
+                       'codec': connector().codec.name, 'results': results}, f, indent=2)
+        print("Results stored in %s" % path)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
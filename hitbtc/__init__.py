@@ -1,4 +1,5 @@
 """HitBTC WSS API V2.0 Client."""
 
 from hitbtc.client import HitBTC
+from hitbtc.aio import AsyncHitBTC
 
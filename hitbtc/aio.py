@@ -0,0 +1,266 @@
+"""asyncio-based Connector and Client, running entirely inside an event loop.
+
+Requires the optional ``websockets`` package (``pip install hitbtc[aio]``).
+"""
+# Import Built-Ins
+import logging
+import asyncio
+import time
+
+# Import Third-Party
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+# Import Homebrew
+from hitbtc.wss import WebSocketConnector
+from hitbtc.connector import HitBTCProtocol
+from hitbtc.client import HitBTC
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class AsyncWebSocketConnector(WebSocketConnector):
+    """Websocket connector running as a set of tasks in the current event loop.
+
+    Instead of a Watchdog thread, time-outs are checked by a task of the same loop. Outbound
+    payloads are written, in order, by a dedicated writer task.
+
+    Data received is available by awaiting AsyncWebSocketConnector.recv()
+    """
+
+    def __init__(self, url, timeout=None, q_maxsize=None, reconnect_interval=None, log_level=None,
+                 codec=None, overflow=None):
+        """Initialize the instance.
+
+        Must be called while the event loop the connector should run in is running.
+
+        :param overflow: policy applied when the queue is full; either 'drop_oldest' (default)
+                         or 'drop_newest'.
+        """
+        if websockets is None:
+            raise ImportError("AsyncWebSocketConnector requires the 'websockets' package!")
+        if overflow not in (None, 'drop_oldest', 'drop_newest'):
+            raise ValueError("Overflow policy %r is not supported by AsyncWebSocketConnector!" %
+                             overflow)
+        super(AsyncWebSocketConnector, self).__init__(url, timeout=timeout, q_maxsize=q_maxsize,
+                                                      reconnect_interval=reconnect_interval,
+                                                      log_level=log_level, codec=codec)
+        self.loop = asyncio.get_running_loop()
+        self.q = asyncio.Queue(maxsize=q_maxsize or 100)
+        self.overflow = overflow or 'drop_oldest'
+        self.dropped = 0
+        self._outbox = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        """Start the connection task."""
+        self._task = self.loop.create_task(self.run())
+
+    async def run(self):
+        """Connect, receive data and reconnect until disconnect() is called."""
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=None) as ws:
+                    self.conn = ws
+                    self._on_open(ws)
+                    writer = self.loop.create_task(self._writer(ws))
+                    try:
+                        async for message in ws:
+                            # A frame failing to be handled mustn't end the connection task
+                            try:
+                                self._on_message(ws, message)
+                            except Exception as e:
+                                self.log.exception("Failed to handle %r: %s", message, e)
+                    finally:
+                        writer.cancel()
+            except (OSError, websockets.WebSocketException) as e:
+                self._on_error(self.conn, e)
+            self._on_close(self.conn)
+
+            if self.disconnect_called or not self.reconnect_required:
+                break
+            delay = self._backoff()
+            self.log.info("Attempting to connect again in %.3f seconds.", delay)
+            await asyncio.sleep(delay)
+
+    async def _writer(self, ws):
+        """Write queued payloads to the given connection."""
+        while True:
+            payload = await self._outbox.get()
+            await ws.send(payload)
+
+    def _write(self, payload):
+        """Queue the serialized payload for the writer task."""
+        self._outbox.put_nowait(payload)
+
+    def _write_scheduled(self, payload):
+        """Queue a payload released by the rate limiter's sender thread for the writer task."""
+        self.loop.call_soon_threadsafe(self._outbox.put_nowait, payload)
+
+    def _close(self):
+        """Close the current connection, if any."""
+        if self.conn:
+            self.loop.create_task(self.conn.close())
+
+    async def stop(self):
+        """Disconnect and wait for the connection task to finish."""
+        self.disconnect()
+        if self._task:
+            await asyncio.wait([self._task], timeout=1)
+
+    def disconnect(self):
+        """Disconnect from the websocket connection."""
+        self.reconnect_required = False
+        self.disconnect_called = True
+        self._is_connected = False
+        self.timers_active = False
+        self._close()
+
+    def reconnect(self):
+        """Issue a reconnection by closing the current connection."""
+        self.reconnect_required = True
+        self._is_connected = False
+        self._close()
+
+    def _start_watchdog(self):
+        """Start the task checking the connector's timers."""
+        return self.loop.create_task(self._watchdog())
+
+    async def _watchdog(self):
+        """Check the connector's timers until disconnect() is called."""
+        resolution = min(1.0, self.connection_timeout / 4)
+        while not self.disconnect_called:
+            await asyncio.sleep(resolution)
+            self._check_timers(time.monotonic())
+
+    def send_ping(self):
+        """Send a ping frame and count the answering pong as activity."""
+        self.ping_sent_at = time.monotonic()
+        self.loop.create_task(self._ping(self.conn))
+
+    async def _ping(self, ws):
+        """Ping the given connection and await its pong."""
+        try:
+            await (await ws.ping())
+        except websockets.WebSocketException as e:
+            self.log.error("Could not send ping: %s", e)
+            return
+        self._on_pong(ws)
+
+    def pass_up(self, data, recv_at):
+        """Pass data up to the client via the internal asyncio.Queue()."""
+        self._enqueue(data)
+
+    def _enqueue(self, item):
+        """Put the item on the queue, applying the overflow policy if the queue is full."""
+        if self.q.full():
+            self.dropped += 1
+            if self.overflow == 'drop_newest':
+                return
+            self.q.get_nowait()
+        self.q.put_nowait(item)
+
+    async def recv(self, timeout=None):
+        """Wait for and return the next item on the internal queue.
+
+        :param timeout: Value in seconds after which asyncio.TimeoutError is raised
+        """
+        if timeout is None:
+            return await self.q.get()
+        return await asyncio.wait_for(self.q.get(), timeout)
+
+
+class AsyncHitBTCConnector(HitBTCProtocol, AsyncWebSocketConnector):
+    """asyncio-based HitBTC connector.
+
+    Futures returned by send() are asyncio futures of the connector's loop. If the connection
+    isn't established, send() and send_batch() return a future failed with ConnectionError,
+    so that awaiting it raises, rather than None.
+    """
+
+    def send(self, method, custom_id=None, timeout=None, **params):
+        """Send the given payload; see :meth:`hitbtc.connector.HitBTCProtocol.send`."""
+        future = super(AsyncHitBTCConnector, self).send(method, custom_id, timeout, **params)
+        if future is None and not self.raw:
+            return self._not_connected(method)
+        return future
+
+    def send_batch(self, method, params_list, timeout=None):
+        """Send a batch of requests; see :meth:`hitbtc.connector.HitBTCProtocol.send_batch`."""
+        future = super(AsyncHitBTCConnector, self).send_batch(method, params_list, timeout)
+        if future is None and not self.raw:
+            return self._not_connected(method)
+        return future
+
+    def _not_connected(self, method):
+        """Return a future failed with ConnectionError, for a request that wasn't sent."""
+        future = self._create_future()
+        future.set_exception(ConnectionError("Cannot send %s - Connection not established!" %
+                                             method))
+        return future
+
+    def put(self, item, block=False, timeout=None):
+        """Place the given item on the internal asyncio.Queue."""
+        if not self.stdout_only:
+            self._enqueue(item)
+
+    def _create_future(self):
+        """Create the future returned by send()."""
+        return self.loop.create_future()
+
+
+class AsyncHitBTC(HitBTC):
+    """asyncio-based HitBTC Websocket API Client class.
+
+    Offers the same methods as :class:`hitbtc.client.HitBTC`; the futures they return may be
+    awaited. Stream data is consumed by awaiting ``recv()`` or iterating over the client::
+
+        async with AsyncHitBTC() as client:
+            await client.connected()
+            await client.subscribe_ticker(symbol='ETHBTC')
+            async for method, symbol, params in client:
+                ...
+
+    Must be instantiated while the event loop the client should run in is running.
+    """
+
+    connector_cls = AsyncHitBTCConnector
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.conn.recv()
+
+    async def recv(self, timeout=None):
+        """Retrieve data from the connector queue."""
+        return await self.conn.recv(timeout)
+
+    def queue_stats(self):
+        """Return the connector queue's size and overflow counter."""
+        return {'size': self.conn.q.qsize(), 'maxsize': self.conn.q.maxsize,
+                'policy': self.conn.overflow, 'dropped': self.conn.dropped}
+
+    async def connected(self, timeout=None):
+        """Wait until the connection is established.
+
+        :param timeout: Value in seconds after which asyncio.TimeoutError is raised
+        """
+        async def wait():
+            while not self.conn._is_connected:
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(wait(), timeout)
+
+    async def stop(self):
+        """Stop the websocket connection."""
+        await self.conn.stop()
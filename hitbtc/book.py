@@ -0,0 +1,224 @@
+"""Local Level 2 order book engine, maintained from HitBTC orderbook streams."""
+# Import Built-Ins
+import logging
+from bisect import bisect_left
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class BookSide:
+    """One side of an order book, stored as two parallel, sorted arrays.
+
+    Price levels are kept in ``keys`` (sorted ascending) and ``sizes``. Asks use the price as key,
+    bids the negated price, so that index 0 is always the best level of either side. Lookups are
+    O(log n) binary searches; inserts and deletes are O(n), as they shift the tail of the arrays.
+
+    This is a deliberate trade-off: the shift is a single memmove of a few thousand pointers at
+    most, which costs less than the Python-level rebalancing of a tree, while best level, top
+    ``n`` and publishing to shared memory remain plain index and slice operations.
+    """
+
+    __slots__ = ('keys', 'sizes', 'sign')
+
+    def __init__(self, descending=False):
+        """Initialize the instance.
+
+        :param descending: Bool, True for the bid side (best level is the highest price)
+        """
+        self.keys = []
+        self.sizes = []
+        self.sign = -1.0 if descending else 1.0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        """Remove all price levels."""
+        del self.keys[:]
+        del self.sizes[:]
+
+    def update(self, price, size):
+        """Set the size at the given price level; a size of 0 removes the level.
+
+        :param price: float, price of the level
+        :param size: float, new total size at this level
+        """
+        key = self.sign * price
+        keys = self.keys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            if size:
+                self.sizes[i] = size
+            else:
+                del keys[i]
+                del self.sizes[i]
+        elif size:
+            keys.insert(i, key)
+            self.sizes.insert(i, size)
+
+    def load(self, levels):
+        """Replace the side's contents with the given price levels.
+
+        :param levels: list of ``{'price': str, 'size': str}`` dicts, as sent by HitBTC
+        """
+        sign = self.sign
+        pairs = sorted((sign * float(level['price']), float(level['size'])) for level in levels)
+        self.keys = [key for key, size in pairs if size]
+        self.sizes = [size for key, size in pairs if size]
+
+    def best(self):
+        """Return the best level as ``(price, size)`` or None if the side is empty."""
+        if not self.keys:
+            return None
+        return self.sign * self.keys[0], self.sizes[0]
+
+    def top(self, n):
+        """Return the best ``n`` levels as a list of ``(price, size)`` tuples."""
+        sign = self.sign
+        return [(sign * key, size) for key, size in zip(self.keys[:n], self.sizes[:n])]
+
+    def depth_at(self, price):
+        """Return the size resting at exactly ``price``, or 0.0 if there is no such level."""
+        key = self.sign * price
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.sizes[i]
+        return 0.0
+
+
+class OrderBook:
+    """Order book of a single symbol.
+
+    Apply ``snapshotOrderbook`` params via :meth:`snapshot` and ``updateOrderbook`` params via
+    :meth:`update`. Updates whose ``sequence`` is not newer than the book's are discarded, as
+    are updates received before the first snapshot. An update skipping a sequence number means
+    one was missed: the book is cleared and out of sync until the next snapshot, and ``gaps``
+    is incremented. Payloads without a ``sequence`` are applied, and leave it unchanged.
+    """
+
+    __slots__ = ('symbol', 'sequence', 'bids', 'asks', 'gaps')
+
+    def __init__(self, symbol):
+        """Initialize the instance.
+
+        :param symbol: symbol this book belongs to, e.g. 'ETHBTC'
+        """
+        self.symbol = symbol
+        self.sequence = None
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide()
+        self.gaps = 0
+
+    def __repr__(self):
+        return '<OrderBook %s seq=%s bid=%r ask=%r>' % (self.symbol, self.sequence,
+                                                         self.best_bid(), self.best_ask())
+
+    @property
+    def synced(self):
+        """Whether or not a snapshot has been applied to this book."""
+        return self.sequence is not None
+
+    def clear(self):
+        """Discard all levels and mark the book as out of sync."""
+        self.sequence = None
+        self.bids.clear()
+        self.asks.clear()
+
+    def snapshot(self, params):
+        """Replace the book's contents with a ``snapshotOrderbook`` payload."""
+        self.bids.load(params.get('bid', ()))
+        self.asks.load(params.get('ask', ()))
+        sequence = params.get('sequence')
+        if sequence is not None:
+            self.sequence = sequence
+        elif self.sequence is None:
+            # Without a sequence number, later updates can't be checked for gaps
+            self.sequence = 0
+
+    def update(self, params):
+        """Apply an ``updateOrderbook`` payload.
+
+        :return: Bool, whether or not the update was applied
+        """
+        sequence = params.get('sequence')
+        if self.sequence is None:
+            return False
+        if sequence is not None:
+            if sequence <= self.sequence:
+                log.debug("Discarding stale update %s for %s (book at %s)",
+                          sequence, self.symbol, self.sequence)
+                return False
+            if sequence != self.sequence + 1:
+                log.warning("Missed updates %s to %s of %s, discarding the book",
+                            self.sequence + 1, sequence - 1, self.symbol)
+                self.gaps += 1
+                self.clear()
+                return False
+        for level in params.get('bid', ()):
+            self.bids.update(float(level['price']), float(level['size']))
+        for level in params.get('ask', ()):
+            self.asks.update(float(level['price']), float(level['size']))
+        if sequence is not None:
+            self.sequence = sequence
+        return True
+
+    def best_bid(self):
+        """Return the best bid as ``(price, size)`` or None."""
+        return self.bids.best()
+
+    def best_ask(self):
+        """Return the best ask as ``(price, size)`` or None."""
+        return self.asks.best()
+
+    def spread(self):
+        """Return the difference between best ask and best bid, or None if a side is empty."""
+        if not self.bids.keys or not self.asks.keys:
+            return None
+        return self.asks.keys[0] + self.bids.keys[0]
+
+    def top(self, n=1):
+        """Return the best ``n`` levels of both sides as ``(bids, asks)``."""
+        return self.bids.top(n), self.asks.top(n)
+
+    def depth_at(self, side, price):
+        """Return the size resting at ``price`` on the given side ('bid' or 'ask')."""
+        return (self.bids if side == 'bid' else self.asks).depth_at(price)
+
+
+class BookManager(dict):
+    """Mapping of symbol to :class:`OrderBook`, creating books on first access."""
+
+    def __init__(self, on_gap=None):
+        """Initialize the instance.
+
+        :param on_gap: callable, called with the symbol of a book which missed an update and
+                       needs a new snapshot
+        """
+        super(BookManager, self).__init__()
+        self.on_gap = on_gap
+
+    def __missing__(self, symbol):
+        book = self[symbol] = OrderBook(symbol)
+        return book
+
+    def apply(self, method, symbol, params):
+        """Apply an orderbook stream message to the relevant book.
+
+        :return: the updated :class:`OrderBook`, or None if the message was discarded
+        """
+        book = self[symbol]
+        if method == 'snapshotOrderbook':
+            book.snapshot(params)
+            return book
+        gaps = book.gaps
+        if not book.update(params):
+            if book.gaps != gaps and self.on_gap is not None:
+                self.on_gap(symbol)
+            return None
+        return book
+
+    def reset(self):
+        """Mark all books as out of sync and discard their levels."""
+        for book in self.values():
+            book.clear()
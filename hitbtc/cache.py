@@ -0,0 +1,67 @@
+"""Cache of the latest value received per stream and symbol."""
+# Import Built-Ins
+import time
+from collections import namedtuple
+
+# A cached value, together with the number of times it was updated and when it last was
+Latest = namedtuple('Latest', ('value', 'sequence', 'updated_at'))
+
+
+class LatestValueCache:
+    """Conflating cache, holding only the most recent value per key.
+
+    Written by the connector's receiving thread only. Entries are immutable tuples replaced as a
+    whole, so readers on other threads never need a lock and never see a partial update.
+
+    Each key's ``sequence`` starts at 1 and is incremented on every update, so readers may tell
+    whether a value changed since they last read it. Sequences survive ``clear()``, which counts
+    as an update of each discarded value, so they never repeat for the lifetime of the cache.
+    """
+
+    def __init__(self):
+        """Initialize the instance."""
+        self._values = {}
+        self._sequences = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def set(self, key, value):
+        """Store ``value`` as the latest value of ``key``."""
+        sequence = self._sequences.get(key, 0) + 1
+        self._sequences[key] = sequence
+        self._values[key] = Latest(value, sequence, time.monotonic())
+
+    def set_if_changed(self, key, value):
+        """Store ``value`` as the latest value of ``key``, if it differs from the current one.
+
+        :return: Bool, whether or not the value was updated
+        """
+        previous = self._values.get(key)
+        if previous is not None and previous.value == value:
+            return False
+        self.set(key, value)
+        return True
+
+    def get(self, key):
+        """Return the :class:`Latest` entry of ``key``, or None."""
+        return self._values.get(key)
+
+    def changed(self, key, sequence):
+        """Return whether or not ``key`` was updated or discarded since it had the given
+        sequence number."""
+        current = self._sequences.get(key)
+        return current is not None and current != sequence
+
+    def keys(self):
+        """Return a list of all cached keys."""
+        return list(self._values)
+
+    def clear(self):
+        """Discard all cached values, advancing their sequences."""
+        values, self._values = self._values, {}
+        for key in values:
+            self._sequences[key] += 1
@@ -5,7 +5,8 @@ import logging
 # Import Third-Party
 
 # Import Homebrew
-from hitbtc.connector import HitBTCConnector
+from hitbtc.connector import HitBTCConnector, HitBTCConnectorProcess, HitBTCReplayConnector
+from hitbtc.shm import SharedBookReader
 
 # Init Logging Facilities
 log = logging.getLogger(__name__)
@@ -15,6 +16,10 @@ class CredentialsError(ValueError):
     pass
 
 
+CONNECTORS = {'thread': HitBTCConnector, 'process': HitBTCConnectorProcess,
+              'replay': HitBTCReplayConnector}
+
+
 class HitBTC:
     """HitBTC Websocket API Client class.
 
@@ -23,10 +28,17 @@ class HitBTC:
     Documentation can be found here:
         https://api.hitbtc.com/?python#socket-api-reference
 
+    All ``request_*``, ``subscribe_*`` and order methods return a future, which is resolved with
+    the ``result`` of the related response, or raises :class:`hitbtc.pending.RequestError` if
+    the API answered with an error. Pass ``timeout=<seconds>`` to any of these methods to override
+    the default deadline, after which the future raises :class:`hitbtc.pending.RequestTimeout`.
+    The round-trip time of a request is available as ``future.latency`` once it is resolved.
     """
 
+    connector_cls = HitBTCConnector
+
     def __init__(self, key=None, secret=None, raw=None, stdout_only=False, silent=False, url=None,
-                 **conn_ops):
+                 mode=None, **conn_ops):
         """
         Initialize the instance.
 
@@ -36,9 +48,15 @@ class HitBTC:
         :param stdout_only: Bool, passing True will turn off placing data on self.conn.q
         :param silent: Bool, passing True turns off print() arguments
         :param url: URL of the websocket API. Defaults to wss://api.hitbtc.com/api/2/ws
-        :param conn_ops: Optional Kwargs to pass to the HitBTCConnector object
+        :param mode: 'thread' (default) to receive data in a thread, 'process' to receive
+                     and process it in a child process (see HitBTCConnectorProcess), or
+                     'replay' to replay a recording passed as ``replay=<path>`` (see
+                     HitBTCReplayConnector)
+        :param conn_ops: Optional Kwargs to pass to the HitBTCConnector object, e.g.
+                         ``codec='orjson'`` to select the JSON codec (see hitbtc.codecs)
         """
-        self.conn = HitBTCConnector(url, raw, stdout_only, silent, **conn_ops)
+        connector_cls = CONNECTORS[mode] if mode else self.connector_cls
+        self.conn = connector_cls(url, raw, stdout_only, silent, **conn_ops)
         self.key = key
         self.secret = secret
 
@@ -46,6 +64,53 @@ class HitBTC:
         """Retrieve data from the connector queue."""
         return self.conn.recv(block, timeout)
 
+    def queue_stats(self):
+        """Return the connector queue's size and overflow counters.
+
+        See :class:`hitbtc.queues.OverflowQueue` for the available overflow policies, which are
+        selected via the ``overflow`` kwarg on instantiation.
+        """
+        return self.conn.q.stats()
+
+    def metrics(self):
+        """Return a snapshot of the connection's counters and latency histograms.
+
+        See :class:`hitbtc.metrics.ConnectionMetrics`; pass the snapshot to
+        :func:`hitbtc.metrics.to_prometheus` for the Prometheus text format.
+
+        :raises ValueError: if the client wasn't instantiated with ``metrics=True``
+        """
+        if self.conn.metrics is None:
+            raise ValueError("Metrics aren't collected - pass metrics=True!")
+        return self.conn.metrics.snapshot(self.queue_stats())
+
+    def outbound_stats(self):
+        """Return counters and queue wait times (seconds) of the rate limiter, per lane.
+
+        Empty unless ``rate_limit`` was passed on instantiation.
+        """
+        if self.conn.scheduler is None:
+            return {}
+        return self.conn.scheduler.metrics()
+
+    @property
+    def orders(self):
+        """The connector's :class:`hitbtc.orders.OrderTracker`.
+
+        Kept up to date from the reports subscription (see ``subscribe_reports()``) and the
+        results of order requests. Register callbacks via ``orders.add_callback()``.
+        """
+        return self.conn.orders
+
+    @property
+    def symbols(self):
+        """The connector's :class:`hitbtc.symbols.SymbolRegistry`.
+
+        Populated by ``request_symbols()`` and ``request_currencies()``, or from the cache file
+        passed as ``symbols_cache`` on instantiation.
+        """
+        return self.conn.symbols
+
     @property
     def credentials_given(self):
         """Assert if credentials are complete."""
@@ -61,7 +126,81 @@ class HitBTC:
 
     def is_connected(self):
         return self.conn._is_connected
-        
+
+    @property
+    def router(self):
+        """The connector's :class:`hitbtc.routing.Router`.
+
+        Use it to pass stream data of selected methods and symbols to handlers instead of the
+        queue, or to discard it before it is decoded::
+
+            client.router.add_handler(on_trades, method='updateTrades', symbol='ETHBTC')
+            client.router.block(method='updateOrderbook', symbol='DOGEBTC')
+        """
+        return self.conn.router
+
+    def on(self, channel, callback, symbol=None, offload=False):
+        """Register a callback for a channel's data, bypassing the queue.
+
+        The callback is invoked as ``callback(method, symbol, params)`` directly on the
+        receiving thread - for responses, as ``callback('Response', status, (request, response))``
+        - and data passed to it is not placed on the queue.
+
+        :param channel: one of 'ticker', 'orderbook', 'trades', 'candles', 'reports' or
+                        'responses'
+        :param callback: callable to invoke
+        :param symbol: only invoke the callback for this symbol; defaults to all symbols
+        :param offload: Bool, run the callback in the connector's worker pool instead of the
+                        receiving thread; its size is set via the ``callback_workers`` kwarg.
+        """
+        self.conn.router.add_channel_handler(channel, callback, symbol, offload)
+
+    def off(self, channel, callback, symbol=None):
+        """Unregister a callback previously registered via on()."""
+        self.conn.router.remove_channel_handler(channel, callback, symbol)
+
+    def latest_ticker(self, symbol):
+        """Return the latest ticker of ``symbol``, or None if none was received yet.
+
+        The returned :class:`hitbtc.cache.Latest` tuple holds the ticker params as ``value``,
+        and a ``sequence`` number which is incremented on every update. Reading it requires no
+        locking and is safe from any thread.
+
+        To only maintain the cache and skip queueing tickers, call
+        ``client.router.mute(method='ticker')``.
+        """
+        return self.conn.latest.get(('ticker', symbol))
+
+    def latest_top(self, symbol):
+        """Return the latest top of book of ``symbol``, or None.
+
+        The ``value`` of the returned :class:`hitbtc.cache.Latest` tuple is ``(bid, ask)``,
+        each a ``(price, size)`` tuple or None. Its ``sequence`` is only incremented if the
+        top of book changed.
+        """
+        return self.conn.latest.get(('top', symbol))
+
+    def latest_candle(self, symbol, period='M30'):
+        """Return the latest candle of ``symbol`` and ``period``, or None."""
+        return self.conn.latest.get(('candle', symbol, period))
+
+    def order_book(self, symbol):
+        """Return the local :class:`hitbtc.book.OrderBook` of ``symbol``, or None.
+
+        Books are maintained automatically for all symbols subscribed to via ``subscribe_book()``.
+        """
+        return self.conn.books.get(symbol)
+
+    def shared_books(self):
+        """Return a :class:`hitbtc.shm.SharedBookReader` of the books published by the connector.
+
+        Requires passing ``publish_books`` on instantiation; pass ``reader.name`` to other
+        processes, so they can create a reader of their own.
+        """
+        if self.conn.publisher is None:
+            raise ValueError("Books aren't published - pass publish_books=True!")
+        return SharedBookReader(self.conn.publisher.name)
+
     def login(self, key=None, secret=None, basic=None, custom_nonce=None):
         """
         Login using the WSS API.
@@ -72,7 +211,7 @@ class HitBTC:
         if not self.credentials_given and not (key and secret):
             raise CredentialsError("Must give API key and Secret to login to API!")
         else:
-            self.conn.authenticate(key or self.key, secret or self.secret, basic, custom_nonce)
+            return self.conn.authenticate(key or self.key, secret or self.secret, basic, custom_nonce)
 
     def request_currencies(self, custom_id=None, **params):
         """
@@ -81,7 +220,7 @@ class HitBTC:
         Offical Endpoint Documentation:
             https://api.hitbtc.com/?python#get-currencies
         """
-        self.conn.send('getCurrencies', custom_id, **params)
+        return self.conn.send('getCurrencies', custom_id, **params)
 
     def request_symbols(self, custom_id=None, **params):
         """
@@ -90,7 +229,7 @@ class HitBTC:
         Offical Endpoint Documentation:
             https://api.hitbtc.com/?python#get-symbols
         """
-        self.conn.send('getSymbols', custom_id, **params)
+        return self.conn.send('getSymbols', custom_id, **params)
 
     def request_trades(self, custom_id=None, **params):
         """
@@ -99,7 +238,7 @@ class HitBTC:
         Offical Endpoint Documentation:
             https://api.hitbtc.com/?python#get-trades
         """
-        self.conn.send('getTrades', custom_id=custom_id, **params)
+        return self.conn.send('getTrades', custom_id=custom_id, **params)
 
     def request_balance(self, custom_id=None, **params):
         """
@@ -110,7 +249,7 @@ class HitBTC:
         Offical Endpoint Documentation:
             https://api.hitbtc.com/?python#get-trading-balance
         """
-        self.conn.send('getTradingBalance', custom_id=custom_id, **params)
+        return self.conn.send('getTradingBalance', custom_id=custom_id, **params)
 
     def request_active_orders(self, custom_id=None, **params):
         """
@@ -121,7 +260,7 @@ class HitBTC:
         Offical Endpoint Documentation:
             https://api.hitbtc.com/?python#get-active-orders-2
         """
-        self.conn.send('getOrders', custom_id=custom_id, **params)
+        return self.conn.send('getOrders', custom_id=custom_id, **params)
 
     def subscribe_reports(self, cancel=False, custom_id=None, **params):
         """
@@ -135,7 +274,7 @@ class HitBTC:
         method = 'subscribeReports'
         if cancel:
             method = 'un' + method
-        self.conn.send(method, custom_id=custom_id, **params)
+        return self.conn.send(method, custom_id=custom_id, **params)
 
     def subscribe_ticker(self, cancel=False, custom_id=None, **params):
         """Request a stream for ticker data.
@@ -146,7 +285,7 @@ class HitBTC:
         method = 'subscribeTicker'
         if cancel:
             method = 'un' + method
-        self.conn.send(method, custom_id=custom_id, **params)
+        return self.conn.send(method, custom_id=custom_id, **params)
 
     def subscribe_book(self, cancel=False, custom_id=None, **params):
         """Request a stream for order book data.
@@ -157,7 +296,7 @@ class HitBTC:
         method = 'subscribeOrderbook'
         if cancel:
             method = 'un' + method
-        self.conn.send(method, custom_id=custom_id, **params)
+        return self.conn.send(method, custom_id=custom_id, **params)
 
     def subscribe_trades(self, cancel=False, custom_id=None, **params):
         """Request a stream for trade data.
@@ -168,7 +307,7 @@ class HitBTC:
         method = 'subscribeTrades'
         if cancel:
             method = 'un' + method
-        self.conn.send(method, custom_id=custom_id, **params)
+        return self.conn.send(method, custom_id=custom_id, **params)
 
     def subscribe_candles(self, cancel=False, custom_id=None, **params):
         """Request a stream for candle data.
@@ -179,16 +318,66 @@ class HitBTC:
         method = 'subscribeCandles'
         if cancel:
             method = 'un' + method
-        self.conn.send(method, custom_id=custom_id, **params)
+        return self.conn.send(method, custom_id=custom_id, **params)
 
     def place_order(self, custom_id=None, **params):
         """
         Place a new order via Websocket.
 
+        Price and quantity are validated against the symbol's tick size and quantity increment
+        first, if the symbol is known to the registry (see ``symbols``).
+
         Offical Endpoint Documentation:
             https://api.hitbtc.com/?python#place-new-order
+
+        :raises OrderValidationError: if price or quantity would be rejected by the exchange
+        """
+        self._validate_order(params)
+        return self.conn.send('newOrder', custom_id=custom_id, **params)
+
+    def _validate_order(self, params):
+        """Validate the parameters of a new order against the symbol registry."""
+        if 'symbol' in params and 'quantity' in params:
+            price = None if params.get('type') in ('market', 'stopMarket') else params.get('price')
+            self.conn.symbols.validate_order(params['symbol'], params['quantity'], price)
+
+    def place_orders(self, orders, timeout=None):
+        """
+        Place several orders at once, pipelining their requests.
+
+        All orders are validated as by ``place_order()`` before any of them is sent.
+
+        :param orders: list of dicts of ``newOrder`` parameters
+        :param timeout: seconds to wait for each response
+        :return: a future resolved with a :class:`hitbtc.pending.BatchResult`, holding the
+                 result or error and the latency of each order, in the given order
+        :raises OrderValidationError: if price or quantity of any order would be rejected
+        """
+        for params in orders:
+            self._validate_order(params)
+        return self.conn.send_batch('newOrder', orders, timeout)
+
+    def cancel_orders(self, orders, timeout=None):
+        """
+        Cancel several orders at once, pipelining their requests.
+
+        :param orders: list of ``clientOrderId`` strings, or dicts of ``cancelOrder`` parameters
+        :param timeout: seconds to wait for each response
+        :return: a future resolved with a :class:`hitbtc.pending.BatchResult`
+        """
+        params_list = [{'clientOrderId': order} if isinstance(order, str) else order
+                       for order in orders]
+        return self.conn.send_batch('cancelOrder', params_list, timeout)
+
+    def replace_orders(self, orders, timeout=None):
+        """
+        Replace several orders at once, pipelining their requests.
+
+        :param orders: list of dicts of ``cancelReplaceOrder`` parameters
+        :param timeout: seconds to wait for each response
+        :return: a future resolved with a :class:`hitbtc.pending.BatchResult`
         """
-        self.conn.send('newOrder', custom_id=custom_id, **params)
+        return self.conn.send_batch('cancelReplaceOrder', orders, timeout)
 
     def cancel_order(self, custom_id=None, **params):
         """
@@ -197,7 +386,7 @@ class HitBTC:
         Offical Endpoint Documentation:
             https://api.hitbtc.com/?python#cancel-order
         """
-        self.conn.send('cancelOrder', custom_id=custom_id, **params)
+        return self.conn.send('cancelOrder', custom_id=custom_id, **params)
 
     def replace_order(self, custom_id=None, **params):
         """
@@ -206,4 +395,4 @@ class HitBTC:
         Offical Endpoint Documentation:
             https://api.hitbtc.com/?python#cancel-replace-orders
         """
-        self.conn.send('cancelReplaceOrder', custom_id=custom_id, **params)
+        return self.conn.send('cancelReplaceOrder', custom_id=custom_id, **params)
@@ -0,0 +1,92 @@
+"""Pluggable JSON codecs used to decode received frames and encode sent payloads.
+
+Available codecs, in order of preference:
+
+    - 'orjson', if the orjson package is installed
+    - 'ujson', if the ujson package is installed
+    - 'json', the standard library's json module
+
+All codecs accept str as well as bytes-like frames.
+"""
+# Import Built-Ins
+import json
+
+
+class JSONCodec:
+    """Codec based on the standard library's json module."""
+
+    name = 'json'
+
+    @staticmethod
+    def loads(data):
+        """Decode the given str or bytes-like object."""
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj):
+        """Encode the given object as str."""
+        return json.dumps(obj)
+
+
+class OrjsonCodec:
+    """Codec based on orjson."""
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.loads = orjson.loads
+        _dumps = orjson.dumps
+        self.dumps = lambda obj: _dumps(obj).decode('utf-8')
+
+
+class UjsonCodec:
+    """Codec based on ujson."""
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        _loads = ujson.loads
+        self.dumps = ujson.dumps
+
+        def loads(data):
+            if isinstance(data, (bytearray, memoryview)):
+                data = bytes(data)
+            return _loads(data)
+        self.loads = loads
+
+
+CODECS = {'orjson': OrjsonCodec, 'ujson': UjsonCodec, 'json': JSONCodec}
+
+
+def available_codecs():
+    """Return the names of all codecs which can be used in this environment."""
+    names = []
+    for name, codec_cls in CODECS.items():
+        try:
+            codec_cls()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_codec(codec=None):
+    """Return a codec instance.
+
+    :param codec: name of a codec, a codec instance or None. None or 'auto' selects the
+                  fastest codec available.
+    :raises ValueError: if the given name is unknown
+    :raises ImportError: if the package required by the named codec isn't installed
+    """
+    if codec is None or codec == 'auto':
+        return CODECS[available_codecs()[0]]()
+    if not isinstance(codec, str):
+        return codec
+    try:
+        return CODECS[codec]()
+    except KeyError:
+        raise ValueError("Unknown codec %r! Choose one of %s" % (codec, ', '.join(CODECS)))
@@ -2,20 +2,36 @@
 
 import logging
 import time
-import json
 import hmac
 import hashlib
-from threading import Timer
-from collections import defaultdict
-
-from hitbtc.wss import WebSocketConnectorThread
-from hitbtc.utils import response_types
+import queue
+from concurrent.futures import Future
+from threading import Event, Thread
+
+from hitbtc.wss import FORK, WebSocketConnectorThread, WebSocketConnectorProcess
+from hitbtc.book import BookManager
+from hitbtc.cache import LatestValueCache
+from hitbtc.orders import OrderTracker
+from hitbtc.pending import PendingRequests, RequestError, RequestTimeout, gather
+from hitbtc.profiling import Hooks, SamplingProfiler
+from hitbtc.metrics import ConnectionMetrics
+from hitbtc.ratelimit import RequestScheduler
+from hitbtc.recording import FrameReader, FrameRecorder
+from hitbtc.records import TypedConverter
+from hitbtc.routing import Router, peek
+from hitbtc.shm import SharedBookPublisher
+from hitbtc.subscriptions import SubscriptionRegistry
+from hitbtc.symbols import SymbolRegistry
+from hitbtc.utils import ResponseSummary
 
 log = logging.getLogger(__name__)
 
 
-class HitBTCConnector(WebSocketConnectorThread):
-    """Class to pre-process HitBTC data, before putting it on the internal queue.
+class HitBTCProtocol:
+    """Mixin to pre-process HitBTC data, before putting it on the internal queue.
+
+    Handles the HitBTC JSONRPC protocol independent of the transport; combine it with a
+    WebSocketConnector subclass to obtain a working connector (see :class:`HitBTCConnector`).
 
     Data on the queue is available as a 3-item-tuple by default.
     
@@ -29,16 +45,116 @@ class HitBTCConnector(WebSocketConnectorThread):
     Stream items on the queue are formatted as:
         (method, symbol, params)
 
+    Order book streams are additionally applied to a local book per symbol, which is available
+    via ``HitBTCConnector.books[symbol]``.
+
+    The latest ticker, top of book and candle of every symbol are cached in
+    ``HitBTCConnector.latest`` (see :class:`hitbtc.cache.LatestValueCache`), keyed by
+    ``('ticker', symbol)``, ``('top', symbol)`` and ``('candle', symbol, period)`` respectively.
+
+    Stream data can be routed to handlers or discarded by method and symbol via
+    ``HitBTCConnector.router`` (see :class:`hitbtc.routing.Router`); discarded frames are never
+    fully decoded, and are not applied to the local books either.
+
+    Passing ``publish_books`` publishes the top levels of every local book into shared memory
+    after each update, where other processes can read them via
+    :class:`hitbtc.shm.SharedBookReader` without any serialization.
+
+    Passing ``typed=True`` (or ``typed='numpy'``) emits the levels of order book data, trades
+    and candles as integer fixed-point records (or numpy structured arrays), scaled by the
+    symbol's tick size and quantity increment; see :mod:`hitbtc.records`. Scales are taken from
+    ``HitBTCConnector.symbols``, so request the symbols first, or load them from a cache file.
+
+    Our orders are tracked in ``HitBTCConnector.orders`` (see :class:`hitbtc.orders.OrderTracker`),
+    from ``activeOrders`` snapshots and ``report`` updates of the reports subscription, and from
+    the results of order requests.
+
+    Subscriptions are recorded in ``HitBTCConnector.subscriptions`` (see
+    :class:`hitbtc.subscriptions.SubscriptionRegistry`) and replayed as soon as the connection
+    is re-established; if ``login`` was called before, the connection is logged in again with
+    the same credentials before private channels are re-subscribed. Local books and cached
+    values are discarded as soon as the connection drops, as they are stale until the
+    subscriptions deliver fresh snapshots.
+
+    Passing ``rate_limit=<requests per second>`` queues outbound requests in priority lanes
+    (cancels, orders, market data, reference data), which a sender thread drains at no more than
+    the given rate (see :class:`hitbtc.ratelimit.RequestScheduler`).
+
+    Results of ``getSymbols`` and ``getCurrencies`` requests are kept in
+    ``HitBTCConnector.symbols`` (see :class:`hitbtc.symbols.SymbolRegistry`); pass
+    ``symbols_cache=<path>`` to persist them between runs.
+
     You can disable extraction and handling by passing 'raw=True' on instantiation. Note that this
     will also turn off recording of sent requests, as well all logging activity.
     """
 
-    def __init__(self, url=None, raw=None, stdout_only=False, silent=False, **conn_ops):
-        """Initialize a HitBTCConnector instance."""
+    def __init__(self, url=None, raw=None, stdout_only=False, silent=False, request_timeout=None,
+                 max_pending=None, callback_workers=None, publish_books=None, publish_depth=None,
+                 publish_max_symbols=None, typed=None, symbols_cache=None, symbols_ttl=None,
+                 rate_limit=None, rate_burst=None, outbound_maxsize=None, record=None,
+                 record_compression=None, timestamps=None, metrics=None, profile=None,
+                 **conn_ops):
+        """Initialize a HitBTCConnector instance.
+
+        :param request_timeout: default seconds to wait for a response to a request, before
+                                failing its future with RequestTimeout; defaults to 30s.
+        :param max_pending: maximum number of requests awaiting a response; defaults to 1000.
+        :param callback_workers: number of threads running callbacks registered with
+                                 ``offload=True``; defaults to 4.
+        :param publish_books: True or the name of a shared memory block to publish books into;
+                              see ``publisher.name`` for the name chosen if True is passed.
+        :param publish_depth: levels per side to publish; defaults to 20.
+        :param publish_max_symbols: maximum number of books to publish; defaults to 64.
+        :param typed: True or 'records' to emit typed records, 'numpy' to emit numpy arrays
+        :param symbols_cache: path of a file caching symbol and currency metadata
+        :param symbols_ttl: seconds the cached metadata is valid for; defaults to 1 hour.
+        :param rate_limit: maximum requests per second; defaults to no limit.
+        :param rate_burst: requests which may be sent at once after a quiet period; defaults to
+                           ``rate_limit``.
+        :param outbound_maxsize: maximum number of requests queued by the rate limiter;
+                                 defaults to 1000.
+        :param record: path of a file to record all received frames to; see
+                       :mod:`hitbtc.recording`.
+        :param record_compression: None, 'zlib', 'zstd' or 'lz4'
+        :param timestamps: Bool, whether or not to append a pair of the ``time.monotonic()``
+                           receive and dispatch times to each item placed on the queue
+        :param metrics: Bool, whether or not to collect latency histograms and counters; see
+                        :class:`hitbtc.metrics.ConnectionMetrics`.
+        :param profile: int N, to time the stages of 1 in N frames and requests; see
+                        :class:`hitbtc.profiling.SamplingProfiler`.
+        """
         url = url or 'wss://api.hitbtc.com/api/2/ws'
-        super(HitBTCConnector, self).__init__(url, **conn_ops)
-        self.books = defaultdict(dict)
-        self.requests = {}
+        super(HitBTCProtocol, self).__init__(url, **conn_ops)
+        self.books = BookManager(on_gap=self._resync_book)
+        self.latest = LatestValueCache()
+        self.requests = PendingRequests(request_timeout, max_pending)
+        self.router = Router(workers=callback_workers)
+        self.publisher = None
+        if publish_books:
+            self.publisher = SharedBookPublisher(
+                None if publish_books is True else publish_books, publish_max_symbols,
+                publish_depth)
+        self.symbols = SymbolRegistry(symbols_cache, symbols_ttl)
+        self.orders = OrderTracker()
+        self.subscriptions = SubscriptionRegistry()
+        self._credentials = None
+        # Set by HitBTCRedundant to discard items already received via another connection
+        self.dedup = None
+        self.scheduler = None
+        if rate_limit:
+            self.scheduler = RequestScheduler(self._write_scheduled, rate_limit, rate_burst,
+                                              outbound_maxsize, self._drop_request)
+        self.typed = TypedConverter(typed == 'numpy', self.symbols.scales) if typed else None
+        self.recorder = FrameRecorder(record, record_compression) if record else None
+        self.timestamps = bool(timestamps)
+        self.metrics = ConnectionMetrics() if metrics else None
+        # None unless hooks are registered, so that disabled hooks cost a single check
+        self.hooks = None
+        self._hook_every = 1
+        self.profiler = None
+        if profile:
+            self.profiler = SamplingProfiler(profile)
+            self.profiler.install(self)
         self.raw = raw
         self.logged_in = False
         self.silent = silent
@@ -49,45 +165,88 @@ class HitBTCConnector(WebSocketConnectorThread):
         if not self.stdout_only:
             self.q.put(item, block, timeout)
 
+    def add_hook(self, event, callback):
+        """Register ``callback`` to be called on ``event``.
+
+        See :mod:`hitbtc.profiling` for the available events and their callbacks' arguments.
+
+        :raises ValueError: if the event is unknown
+        """
+        hooks = self.hooks or Hooks(self._hook_every)
+        hooks.add(event, callback)
+        self.hooks = hooks
+
+    def remove_hook(self, event, callback):
+        """Unregister a callback previously registered via add_hook()."""
+        if self.hooks is None:
+            return
+        self.hooks.remove(event, callback)
+        if not self.hooks:
+            self.hooks = None
+
+    def sample_hooks(self, every):
+        """Run the hooks for only 1 in ``every`` received frames and sent requests.
+
+        Frames and requests which aren't sampled skip the hooks at the cost of a counter
+        increment; pass 1 to run the hooks for all of them again.
+        """
+        self._hook_every = max(1, int(every))
+        if self.hooks is not None:
+            self.hooks.every = self._hook_every
+
     def echo(self, msg):
         """Print message to stdout if ``silent`` isn't True."""
         if not self.silent:
             print(msg)
 
-    def _start_timers(self):
-        """Reset and start timers for API connection."""
-        self._stop_timers()
-
-        # Automatically reconnect if we didnt receive data
-        self.connection_timer = Timer(self.connection_timeout,
-                                      self._connection_timed_out)
-        self.connection_timer.start()
-
-    def _stop_timers(self):
-        """Stop connection timer."""
-        if self.connection_timer:
-            self.connection_timer.cancel()
-
     def _on_message(self, ws, message):
         """Handle and pass received data to the appropriate handlers."""
-
-        self._stop_timer()
+        self.last_message_at = time.monotonic()
+        if self.recorder is not None:
+            self.recorder.write(message)
+        if self.metrics is not None:
+            self.metrics.on_frame(message)
 
         if not self.raw:
-            decoded_message = json.loads(message)
+            if self.router.active:
+                method, symbol = peek(message)
+                if method is not None and self.router.lookup(method, symbol) is None:
+                    return
+            hooks = self.hooks
+            if hooks is not None:
+                hooks.frames += 1
+                if hooks.frames % hooks.every:
+                    hooks = None
+            if hooks is not None:
+                hooks.run('pre_decode', message)
+                decoded_message = self.codec.loads(message)
+                hooks.run('post_decode', decoded_message)
+            else:
+                decoded_message = self.codec.loads(message)
             if 'jsonrpc' in decoded_message:
                 if 'result' in decoded_message or 'error' in decoded_message:
-                    self._handle_response(decoded_message)
+                    if hooks is not None:
+                        hooks.run('pre_dispatch', 'Response', None, decoded_message)
+                        self._handle_response(decoded_message)
+                        hooks.run('post_dispatch', 'Response', None, decoded_message)
+                    else:
+                        self._handle_response(decoded_message)
                 else:
                     try:
                         method = decoded_message['method']
-                        symbol = decoded_message['params']['symbol']
                         params = decoded_message['params']
+                        # activeOrders params are a list, and carry no single symbol
+                        symbol = params['symbol'] if isinstance(params, dict) else None
                     except Exception as e:
                         self.log.exception(e)
                         self.log.error(decoded_message)
                         return
-                    self._handle_stream(method, symbol, params)
+                    if hooks is not None:
+                        hooks.run('pre_dispatch', method, symbol, params)
+                        self._handle_stream(method, symbol, params)
+                        hooks.run('post_dispatch', method, symbol, params)
+                    else:
+                        self._handle_stream(method, symbol, params)
         else:
             self.put(message)
 
@@ -105,68 +264,54 @@ class HitBTCConnector(WebSocketConnectorThread):
             self.log.error("An expected Response ID was not found in %s", response)
             raise
 
-        try:
-            request = self.requests.pop(i_d)
-        except KeyError as e:
-            log.exception(e)
-            log.error("Could not find Request relating to Response object %s", response)
-            raise
+        entry = self.requests.pop(i_d)
+        if entry is None:
+            log.error("Could not find Request relating to Response object %s - it may have "
+                      "timed out already.", response)
+            return
 
+        request = entry.request
         if 'result' in response:
+            self._capture_metadata(request['method'], response['result'])
             self._handle_request_response(request, response)
+            self.requests.resolve(entry, response['result'])
         elif 'error' in response:
             self._handle_error(request, response)
+            self.requests.reject(entry, RequestError(request, response))
+        if self.metrics is not None:
+            self.metrics.on_response(request['method'], entry.future.latency)
+
+    def _capture_metadata(self, method, result):
+        """Add symbol and currency metadata to the registry, and order results to the tracker."""
+        if method in ('newOrder', 'cancelOrder', 'cancelReplaceOrder'):
+            if isinstance(result, dict) and 'clientOrderId' in result:
+                self.orders.apply(result)
+        elif method == 'getSymbols':
+            self.symbols.update_symbols(result)
+        elif method == 'getSymbol':
+            self.symbols.update_symbols([result])
+        elif method == 'getCurrencies':
+            self.symbols.update_currencies(result)
+        elif method == 'getCurrency':
+            self.symbols.update_currencies([result])
 
     def _handle_request_response(self, request, response):
         """
         Handle responses to succesful requests.
 
-        Logs messages and prints them to screen.
+        Logs messages at DEBUG level and prints them to screen. The human-readable summary is
+        only formatted if it is printed or a log handler emits it, so with ``silent=True`` and
+        the default log level this path is free of any formatting work.
 
         Finally, we'll put the response and its corresponding request on the internal queue for
         retrieval by the client.
         """
-        method = request['method']
-
-        try:
-            msg = response_types[method]
-        except KeyError as e:
-            log.exception(e)
-            log.error("Response's method %s is unknown to the client! %s", method, response)
-            return
-        print(request)
-        if method.startswith('subscribe'):
-            if 'symbol' in request['params']:
-                formatted_msg = msg.format(symbol=request['params']['symbol'])
-            else:
-                formatted_msg = msg
-            self.log.info(formatted_msg)
-            self.echo(formatted_msg)
-        else:
-            text = "Sucessfully processed %s request:\n" % method
-            if method.startswith('get'):
-                # loop over item in response['result'] for:
-                # getSymbols, getTrades, getTradingBalance, getOrders
-                for item in response['result']:
-                    # Don't print zero balances
-                    if method is not 'getTradingBalance' or (float(item['available']) > 0 or float(item['reserved']) > 0):
-                        try:
-                            text += msg.format(**item)
-                        except KeyError as e :
-                            print("Formatter for method {} failed on item {} with KeyError {}... item keys {}".format(method, item, e, item.keys()))
-                self.log.info(text)
-                self.echo(text)
-            else:
-                # Format messages for these using response['result'] directly
-                # (place, cancel, replace, getSymbol, getCurrency)
-                try:
-                    text += msg.format(**response['result'])
-                except TypeError:
-                    text += msg.format(response['result'])
-                self.log.info(text)
-                self.echo(text)
+        if not self.silent or self.log.isEnabledFor(logging.DEBUG):
+            summary = ResponseSummary(request['method'], request, response['result'])
+            self.log.debug("%s", summary)
+            self.echo(summary)
         self.log.debug("Request: %r, Response: %r", request, response)
-        self.put(('Response', 'Success', (request, response)))
+        self._deliver('Response', 'Success', (request, response))
 
     def _handle_error(self, request, response):
         """
@@ -182,28 +327,252 @@ class HitBTCConnector(WebSocketConnectorThread):
         err_message += " Related Request: %r" % request
         self.log.error(err_message)
         self.echo(err_message)
-        self.put(('Response', 'Failure', (request, response)))
+        self._deliver('Response', 'Failure', (request, response))
 
     def _handle_stream(self, method, symbol, params):
-        """Handle streamed data."""
-        self.put((method, symbol, params))
+        """Handle streamed data.
+
+        Order book snapshots and updates are applied to the local book of ``symbol``; stale
+        updates are discarded before being placed on the queue, or passed to the handlers
+        registered for them on the router.
+
+        Tickers, top of book and candles additionally update the latest value cache, and
+        reports the order tracker.
+
+        In typed mode, params are converted to records after updating books and caches.
+
+        With metrics enabled, the data's latencies are recorded once it was delivered.
+        """
+        if method == 'ticker':
+            self.latest.set(('ticker', symbol), params)
+        elif method in ('snapshotOrderbook', 'updateOrderbook'):
+            book = self.books.apply(method, symbol, params)
+            if book is None:
+                return
+            self.latest.set_if_changed(('top', symbol), (book.best_bid(), book.best_ask()))
+            if self.publisher is not None:
+                self.publisher.publish(book)
+        elif method in ('snapshotCandles', 'updateCandles'):
+            if params.get('data'):
+                self.latest.set(('candle', symbol, params.get('period')), params['data'][-1])
+        elif method in ('activeOrders', 'report'):
+            self._track_orders(method, params)
+        if self.typed is not None:
+            self._deliver(method, symbol, self._typed_params(method, symbol, params))
+        else:
+            self._deliver(method, symbol, params)
+        if self.metrics is not None:
+            self.metrics.on_dispatch(method, symbol, params, self.last_message_at)
+
+    def _track_orders(self, method, params):
+        """Apply an activeOrders snapshot or report to the order tracker."""
+        if method == 'activeOrders':
+            self.orders.snapshot(params)
+        else:
+            self.orders.apply(params)
+
+    def _typed_params(self, method, symbol, params):
+        """Return the typed params of the given stream data."""
+        return self.typed.convert(method, symbol, params)
+
+    def _deliver(self, method, symbol, params):
+        """Pass data to the handlers registered on the router, or place it on the queue.
 
-    def send(self, method, custom_id=None, **params):
+        If the connection is one of several redundant ones, copies of data already delivered
+        via another connection are discarded first. With timestamps enabled, queued items are
+        extended by a ``(received_at, dispatched_at)`` pair of ``time.monotonic()`` values.
+        """
+        if self.dedup is not None:
+            params = self.dedup.admit(self, method, symbol, params)
+            if params is None:
+                return
+        if self.router.active:
+            handlers = self.router.lookup(method, symbol)
+            if handlers:
+                self.router.dispatch(handlers, method, symbol, params)
+                return
+            elif handlers is None:
+                return
+        if self.timestamps:
+            self.put((method, symbol, params, (self.last_message_at, time.monotonic())))
+        else:
+            self.put((method, symbol, params))
+
+    def disconnect(self):
+        """Disconnect, shut down the callback worker pool and the rate limiter's sender, and
+        release published books and the recording."""
+        super(HitBTCProtocol, self).disconnect()
+        self.router.shutdown()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.publisher is not None:
+            self.publisher.close()
+
+    def _check_timers(self, now):
+        """Expire requests past their deadline, then check the connection's timers."""
+        if self.requests:
+            self.requests.expire(now)
+        super(HitBTCProtocol, self)._check_timers(now)
+
+    def _on_close(self, ws, *args):
+        """Flush the recording, discard stale books and fail pending requests, as their
+        responses will never arrive."""
+        if self.metrics is not None and not self.disconnect_called:
+            self.metrics.reconnects += 1
+        super(HitBTCProtocol, self)._on_close(ws, *args)
+        if self.recorder is not None:
+            self.recorder.flush()
+        self._resync()
+        self._fail_pending()
+
+    def _resync(self):
+        """Mark all books as out of sync and discard cached values."""
+        if self.publisher is not None:
+            for symbol in self.books:
+                self.publisher.clear(symbol)
+        self.books.reset()
+        self.latest.clear()
+
+    def _fail_pending(self):
+        """Discard queued payloads and fail all pending requests."""
+        if self.scheduler is not None:
+            self.scheduler.clear()
+        self.requests.clear()
+
+    def _resubscribe(self):
+        """Log in again and replay all recorded subscriptions.
+
+        Public subscriptions are sent right away; private ones once the login succeeded.
+        """
+        if not self.subscriptions and self._credentials is None:
+            return
+        self.log.info("Connected, replaying %s subscriptions..", len(self.subscriptions))
+        for method, params in self.subscriptions.public():
+            self.send(method, **params)
+        private = self.subscriptions.private()
+        if self._credentials is None:
+            for method, params in private:
+                self.send(method, **params)
+            return
+        login = self.authenticate(*self._credentials)
+        if login is not None and private:
+            login.add_done_callback(lambda future: self._replay_private(future, private))
+
+    def _replay_private(self, login, subscriptions):
+        """Replay private subscriptions, if the login succeeded."""
+        if login.cancelled() or login.exception() is not None:
+            self.log.error("Re-login failed, cannot re-subscribe to %s",
+                           [method for method, _ in subscriptions])
+            return
+        for method, params in subscriptions:
+            self.send(method, **params)
+
+    def _resync_book(self, symbol):
+        """Subscribe to the book of ``symbol`` again, for a snapshot after missed updates."""
+        params = next((params for method, params in self.subscriptions
+                       if method == 'subscribeOrderbook' and params.get('symbol') == symbol),
+                      {'symbol': symbol})
+        self.log.info("Requesting a new snapshot of the %s book..", symbol)
+        self.send('subscribeOrderbook', **params)
+
+    def send(self, method, custom_id=None, timeout=None, **params):
         """
         Send the given Payload to the API via the websocket connection.
 
         :param method: JSONRPC method to call
         :param custom_id: custom ID to identify response messages relating to this request
+        :param timeout: seconds to wait for a response, before failing the returned future
+                        with RequestTimeout; defaults to the connector's ``request_timeout``.
         :param kwargs: payload parameters as key=value pairs
+        :return: a future resolved with the response's result, or None if the payload
+                 was not sent or ``raw`` is True
         """
+        # Recorded even if not connected, so the subscription is sent once we are
+        self.subscriptions.track(method, params)
         if not self._is_connected:
             self.echo("Cannot Send payload - Connection not established!")
-            return
-        payload = {'method': method, 'params': params, 'id': custom_id or int(10000 * time.time())}
+            return None
+        i_d = custom_id or self.requests.next_id()
+        payload = {'method': method, 'params': params, 'id': i_d}
+        hooks = self.hooks
+        if hooks is not None:
+            hooks.requests += 1
+            if hooks.requests % hooks.every:
+                hooks = None
+        if hooks is not None:
+            hooks.run('pre_send', method, payload)
+        future = None
         if not self.raw:
-            self.requests[payload['id']] = payload
+            future = self._create_future()
+            self.requests.add(i_d, payload, future, timeout)
         self.log.debug("Sending: %s", payload)
-        self.conn.send(json.dumps(payload))
+        data = self.codec.dumps(payload)
+        if self.scheduler is None:
+            self._write(data)
+        elif not self.scheduler.submit(method, data, i_d):
+            self._drop_request(i_d)
+        if hooks is not None:
+            hooks.run('post_send', method, payload)
+        return future
+
+    def send_batch(self, method, params_list, timeout=None):
+        """Send a request per item of ``params_list``, back to back.
+
+        All payloads are serialized first and then written in one go, without waiting for any
+        response in between.
+
+        :param method: JSONRPC method to call
+        :param params_list: list of dicts of payload parameters
+        :param timeout: seconds to wait for each response; defaults to the connector's
+                        ``request_timeout``.
+        :return: a future resolved with a :class:`hitbtc.pending.BatchResult` once all
+                 requests have been answered or timed out, or None if the payloads were not
+                 sent or ``raw`` is True
+        """
+        if not self._is_connected:
+            self.echo("Cannot Send payload - Connection not established!")
+            return None
+        payloads = [{'method': method, 'params': params, 'id': self.requests.next_id()}
+                    for params in params_list]
+        hooks = self.hooks
+        if hooks is not None:
+            hooks.requests += 1
+            if hooks.requests % hooks.every:
+                hooks = None
+        if hooks is not None:
+            hooks.run('pre_send', method, payloads)
+        futures = []
+        if not self.raw:
+            for payload in payloads:
+                future = self._create_future()
+                self.requests.add(payload['id'], payload, future, timeout)
+                futures.append(future)
+        self.log.debug("Sending batch of %s %s requests", len(payloads), method)
+        dumps = self.codec.dumps
+        if self.scheduler is None:
+            self._write_many([dumps(payload) for payload in payloads])
+        else:
+            for payload in payloads:
+                if not self.scheduler.submit(method, dumps(payload), payload['id']):
+                    self._drop_request(payload['id'])
+        if hooks is not None:
+            hooks.run('post_send', method, payloads)
+        if self.raw:
+            return None
+        return gather(payloads, futures, self._create_future())
+
+    def _drop_request(self, i_d):
+        """Fail the request of a payload dropped by the rate limiter."""
+        entry = self.requests.pop(i_d)
+        if entry is not None:
+            self.requests.reject(entry, RequestTimeout(entry.request,
+                                                       'Dropped from full outbound queue'))
+
+    def _create_future(self):
+        """Create the future returned by send()."""
+        return Future()
 
     def authenticate(self, key, secret, basic=False, custom_nonce=None):
         """Login to the HitBTC Websocket API using the given public and secret API keys."""
@@ -219,9 +588,219 @@ class HitBTCConnector(WebSocketConnectorThread):
 
         payload['algo'] = algo
         payload['pKey'] = key
-        self.send('login', **payload)
+        self._credentials = (key, secret, basic)
+        return self.send('login', **payload)
+
+
+class HitBTCConnector(HitBTCProtocol, WebSocketConnectorThread):
+    """Thread-based HitBTC connector."""
 
 
+class HitBTCConnectorProcess(HitBTCProtocol, WebSocketConnectorProcess):
+    """Process-based HitBTC connector.
+
+    Decoding, book maintenance and caching of stream data happen in a child process; stream
+    items cross to the parent through a shared memory ring buffer. Responses are passed to the
+    parent via a multiprocessing queue and handled there, where the futures returned by send()
+    live.
+
+    Note that ``books`` and ``latest`` are maintained in the child process and are therefore not
+    accessible from the parent; publish books via shared memory instead (``publish_books``).
+    Handlers registered on the router only receive responses. In typed mode, stream data is
+    converted by the parent, as symbol metadata is kept there. Reports are forwarded to the
+    parent's order tracker along with the responses, as are connection events, so that the
+    parent can replay its subscriptions and fail its pending requests.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the instance."""
+        super(HitBTCConnectorProcess, self).__init__(*args, **kwargs)
+        self._responses = FORK.Queue()
+        self._collector = None
+
+    def start(self):
+        """Start the child process and the thread handling its responses."""
+        super(HitBTCConnectorProcess, self).start()
+        self._collector = Thread(target=self._collect_responses, name='ResponseCollector',
+                                 daemon=True)
+        self._collector.start()
+
+    def _collect_responses(self):
+        """Handle responses and reports forwarded by the child, and expire requests past their
+        deadline."""
+        while not self.disconnect_called:
+            try:
+                response = self._responses.get(timeout=1)
+            except queue.Empty:
+                pass
+            except (EOFError, OSError):
+                return
+            else:
+                # Responses are received by the parent only now
+                self.last_message_at = time.monotonic()
+                if 'event' in response:
+                    self._on_child_event(response['event'], response.get('symbol'))
+                elif 'method' in response:
+                    super(HitBTCConnectorProcess, self)._track_orders(response['method'],
+                                                                      response['params'])
+                else:
+                    self._handle_response(response)
+            self.requests.expire()
+
+    def _on_child_event(self, event, symbol=None):
+        """Handle a connection or book event of the child process."""
+        if event == 'opened':
+            super(HitBTCConnectorProcess, self)._resubscribe()
+        elif event == 'closed':
+            super(HitBTCConnectorProcess, self)._fail_pending()
+        elif event == 'gap':
+            super(HitBTCConnectorProcess, self)._resync_book(symbol)
+
+    def _resync_book(self, symbol):
+        """Let the parent request a new snapshot, as it records subscriptions and requests."""
+        if self._child:
+            self._responses.put({'event': 'gap', 'symbol': symbol})
+        else:
+            super(HitBTCConnectorProcess, self)._resync_book(symbol)
+
+    def _resubscribe(self):
+        """Let the parent replay subscriptions, as it records them."""
+        if self._child:
+            self._responses.put({'event': 'opened'})
+        else:
+            super(HitBTCConnectorProcess, self)._resubscribe()
+
+    def _fail_pending(self):
+        """Let the parent fail its pending requests."""
+        if self._child:
+            self._responses.put({'event': 'closed'})
+        else:
+            super(HitBTCConnectorProcess, self)._fail_pending()
+
+    def _handle_response(self, response):
+        """Forward responses to the parent, which handles them."""
+        if self._child:
+            self._responses.put(response)
+        else:
+            super(HitBTCConnectorProcess, self)._handle_response(response)
+
+    def _track_orders(self, method, params):
+        """Forward reports to the parent, where the order tracker lives."""
+        self._responses.put({'method': method, 'params': params})
+
+    def _typed_params(self, method, symbol, params):
+        """Leave conversion to the parent; records can't cross the ring buffer."""
+        return params
+
+    def put(self, item, block=False, timeout=None):
+        """Place the item on the ring buffer (child) or the internal q (parent)."""
+        if self._child:
+            if not self.stdout_only:
+                self._publish(item)
+        else:
+            super(HitBTCConnectorProcess, self).put(item, block, timeout)
+
+    def recv(self, block=True, timeout=None):
+        """Retrieve the next response or stream item.
+
+        Responses are returned in the same format as by HitBTCConnector; stream items as
+        (method, symbol, params) tuples.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            try:
+                return self.q.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                item = self._read_ring(block=False)
+            except queue.Empty:
+                if not block or (deadline is not None and time.monotonic() >= deadline):
+                    raise
+                # Check the response queue in between polling the ring buffer
+                try:
+                    item = self._read_ring(timeout=0.01)
+                except queue.Empty:
+                    continue
+            if isinstance(item, list):
+                item = tuple(item)
+                if self.typed is not None and item[0] != 'Response':
+                    item = (item[0], item[1], self.typed.convert(*item[:3])) + item[3:]
+            return item
+
+
+class HitBTCReplayConnector(HitBTCProtocol, WebSocketConnectorThread):
+    """Connector feeding the frames of a recording to the protocol, instead of a websocket.
+
+    Frames are replayed as fast as possible, or - if ``speed`` is given - paced by their
+    recorded receive timestamps, e.g. ``speed=1`` for the original rate, ``speed=10`` for ten
+    times the original rate. Everything downstream of the connection - decoding, routing, books,
+    caches and the queue - behaves as it does live.
+
+    Nothing is sent: payloads are discarded, so requests time out, and recorded responses are
+    only handled if a request with their ID is pending. ``replay_done`` is set once all frames
+    have been replayed, or the connector was stopped.
+    """
+
+    def __init__(self, url=None, raw=None, stdout_only=False, silent=False, replay=None,
+                 speed=None, **conn_ops):
+        """Initialize the instance.
+
+        :param url: path of the recording to replay, if ``replay`` isn't given
+        :param replay: path of the recording to replay
+        :param speed: multiple of the original rate to replay frames at; defaults to as fast
+                      as possible.
+        """
+        path = replay or url
+        if path is None:
+            raise ValueError("Pass the path of the recording to replay!")
+        super(HitBTCReplayConnector, self).__init__(path, raw, stdout_only, silent, **conn_ops)
+        self.speed = speed
+        self.replayed = 0
+        self.replay_done = Event()
+
+    def _connect(self):
+        """Replay the recording's frames, then stop."""
+        self._on_open(None)
+        # Frames may be sparse; the watchdog only expires requests
+        self.timers_active = False
+        started = None
+        with FrameReader(self.url) as reader:
+            frames = iter(reader)
+            try:
+                for received_at, frame in frames:
+                    # Views of the memory map must be released before the reader is closed
+                    message = str(frame, 'utf-8')
+                    frame.release()
+                    if self.disconnect_called:
+                        break
+                    if self.speed:
+                        if started is None:
+                            started = time.monotonic_ns() - received_at / self.speed
+                        delay = (started + received_at / self.speed - time.monotonic_ns()) / 1e9
+                        if delay > 0:
+                            time.sleep(delay)
+                    self._on_message(None, message)
+                    self.replayed += 1
+            finally:
+                frames.close()
+        self._is_connected = False
+        self.log.info("Replayed %s frames of %s", self.replayed, self.url)
+        self.replay_done.set()
+
+    def _handle_response(self, response):
+        """Handle a recorded response only if a request with its ID is pending."""
+        if response.get('id') in self.requests:
+            super(HitBTCReplayConnector, self)._handle_response(response)
 
+    def _write(self, payload):
+        """Discard the payload; there is no connection to send it to."""
+        self.log.debug("Replaying, not sending %s", payload)
 
+    def send_ping(self):
+        """Do nothing; there is no connection to ping."""
 
+    def disconnect(self):
+        """Stop replaying."""
+        super(HitBTCReplayConnector, self).disconnect()
+        self.replay_done.set()
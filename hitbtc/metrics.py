@@ -0,0 +1,309 @@
+"""Latency histograms and counters of a connection, and their Prometheus text exposition."""
+# Import Built-Ins
+import calendar
+import logging
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+# Channel of each stream method, see hitbtc.routing.CHANNELS
+METHOD_CHANNELS = {'ticker': 'ticker',
+                   'snapshotOrderbook': 'orderbook', 'updateOrderbook': 'orderbook',
+                   'snapshotTrades': 'trades', 'updateTrades': 'trades',
+                   'snapshotCandles': 'candles', 'updateCandles': 'candles',
+                   'activeOrders': 'reports', 'report': 'reports'}
+
+PERCENTILES = (0.5, 0.9, 0.99, 0.999)
+
+# Snapshot keys of the percentiles, e.g. 'p99' and 'p999' for 0.99 and 0.999
+PERCENTILE_KEYS = {fraction: 'p' + ('%g' % (fraction * 100)).replace('.', '')
+                   for fraction in PERCENTILES}
+
+_SUB_BUCKETS = 16
+
+
+class Histogram:
+    """Log-linear histogram of non-negative integers, in the manner of HdrHistogram.
+
+    Values below 32 are counted exactly; larger values in 16 buckets per power of two, so
+    percentiles are accurate to within 1/16th (about 6%) of their value. Recording is O(1)
+    and never allocates once the histogram has grown to the largest value seen.
+    """
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    @staticmethod
+    def index(value):
+        """Return the bucket index of ``value``."""
+        if value < 2 * _SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - 5
+        return shift * _SUB_BUCKETS + (value >> shift)
+
+    @staticmethod
+    def bounds(index):
+        """Return the lowest and highest value counted in the bucket at ``index``."""
+        if index < 2 * _SUB_BUCKETS:
+            return index, index
+        shift = index // _SUB_BUCKETS - 1
+        lowest = (index - shift * _SUB_BUCKETS) << shift
+        return lowest, lowest + (1 << shift) - 1
+
+    def record(self, value):
+        """Count ``value``; negative values are counted as 0."""
+        value = int(value) if value > 0 else 0
+        i = self.index(value)
+        counts = self.counts
+        if i >= len(counts):
+            counts.extend([0] * (i + 1 - len(counts)))
+        counts[i] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        """Return the value below which ``fraction`` of all values lie, or None if empty."""
+        if not self.count:
+            return None
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for i, n in enumerate(list(self.counts)):
+            seen += n
+            if seen >= rank:
+                lowest, highest = self.bounds(i)
+                return min(max((lowest + highest) // 2, self.min), self.max)
+        return self.max
+
+    def snapshot(self):
+        """Return a dict of the count, min, mean, max and percentiles."""
+        result = {'count': self.count, 'min': self.min, 'max': self.max,
+                  'mean': self.total / self.count if self.count else None}
+        for fraction, key in PERCENTILE_KEYS.items():
+            result[key] = self.percentile(fraction)
+        return result
+
+
+class TimestampParser:
+    """Parses HitBTC timestamps (e.g. ``2017-10-19T15:45:44.941Z``) to epoch seconds.
+
+    The epoch of each date is computed once and cached; the time of day is parsed by slicing.
+    """
+
+    def __init__(self):
+        self._dates = {}
+
+    def __call__(self, timestamp):
+        date = timestamp[:10]
+        try:
+            epoch = self._dates[date]
+        except KeyError:
+            epoch = self._dates[date] = calendar.timegm(time.strptime(date, '%Y-%m-%d'))
+        return (epoch + int(timestamp[11:13]) * 3600 + int(timestamp[14:16]) * 60 +
+                float(timestamp[17:-1] or 0))
+
+
+class StreamStats:
+    """Counters and latency histograms of a channel and symbol."""
+
+    __slots__ = ('messages', 'dispatch', 'exchange')
+
+    def __init__(self):
+        self.messages = 0
+        self.dispatch = Histogram()
+        self.exchange = Histogram()
+
+    def snapshot(self):
+        return {'messages': self.messages, 'dispatch_us': self.dispatch.snapshot(),
+                'exchange_us': self.exchange.snapshot()}
+
+
+class ConnectionMetrics:
+    """Latency histograms and counters of a connection.
+
+    Per channel and symbol, the time from receiving a frame until its data was placed on the
+    queue or passed to its handlers (``dispatch_us``), and from the exchange's ``timestamp`` of
+    tickers, trades and candles until the frame was received (``exchange_us``) are recorded,
+    in microseconds. The latter relies on the local clock being in sync with the exchange's.
+
+    Further counted are messages and bytes received, reconnects, and round-trip times of
+    requests per method. Process connectors (see HitBTCConnectorProcess) handle stream data in
+    their child process, so their metrics cover responses only.
+    """
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.messages = 0
+        self.bytes = 0
+        self.reconnects = 0
+        self.streams = {}
+        self.requests = {}
+        self.parse_timestamp = TimestampParser()
+        self._received_wall = None
+        self._last_snapshot = (self.started_at, 0, 0)
+
+    def on_frame(self, frame):
+        """Count a received frame."""
+        self.messages += 1
+        self.bytes += len(frame)
+        self._received_wall = time.time()
+
+    def on_dispatch(self, method, symbol, params, received_at):
+        """Record the latencies of stream data dispatched just now.
+
+        :param received_at: ``time.monotonic()`` of the frame's reception
+        """
+        key = METHOD_CHANNELS.get(method, method), symbol
+        stats = self.streams.get(key)
+        if stats is None:
+            stats = self.streams[key] = StreamStats()
+        stats.messages += 1
+        stats.dispatch.record((time.monotonic() - received_at) * 1e6)
+        timestamp = None
+        if method == 'ticker':
+            timestamp = params.get('timestamp')
+        elif method in ('updateTrades', 'updateCandles') and params.get('data'):
+            timestamp = params['data'][-1].get('timestamp')
+        if timestamp and self._received_wall is not None:
+            try:
+                exchanged_at = self.parse_timestamp(timestamp)
+            except ValueError:
+                return
+            stats.exchange.record((self._received_wall - exchanged_at) * 1e6)
+
+    def on_response(self, method, latency):
+        """Record the round-trip time of a request, in seconds."""
+        histogram = self.requests.get(method)
+        if histogram is None:
+            histogram = self.requests[method] = Histogram()
+        histogram.record(latency * 1e6)
+
+    def snapshot(self, queue=None):
+        """Return a dict of all counters and histograms.
+
+        Message and byte rates are averaged over the interval since the previous snapshot.
+
+        :param queue: dict of queue stats to include, e.g. ``OverflowQueue.stats()``
+        """
+        now = time.monotonic()
+        since, messages, n_bytes = self._last_snapshot
+        self._last_snapshot = (now, self.messages, self.bytes)
+        interval = now - since or 1e-9
+        streams = {}
+        for (channel, symbol), stats in list(self.streams.items()):
+            streams.setdefault(channel, {})[symbol] = stats.snapshot()
+        return {'uptime': now - self.started_at,
+                'messages': self.messages, 'bytes': self.bytes,
+                'messages_per_sec': (self.messages - messages) / interval,
+                'bytes_per_sec': (self.bytes - n_bytes) / interval,
+                'reconnects': self.reconnects, 'queue': queue or {}, 'streams': streams,
+                'requests_us': {method: histogram.snapshot()
+                                for method, histogram in list(self.requests.items())}}
+
+
+def _labels(**labels):
+    return '{%s}' % ','.join('%s="%s"' % (key, str(value).replace('"', '\\"'))
+                             for key, value in labels.items() if value is not None)
+
+
+def to_prometheus(snapshot, prefix='hitbtc'):
+    """Return a metrics snapshot in the Prometheus text exposition format.
+
+    Histograms are exposed as summaries of their percentiles, in seconds.
+    """
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append('# HELP %s_%s %s' % (prefix, name, help_text))
+        lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+        for suffix, labels, value in samples:
+            if value is not None:
+                lines.append('%s_%s%s%s %s' % (prefix, name, suffix, labels, value))
+
+    def summary(histogram, **labels):
+        samples = [('', _labels(quantile=fraction, **labels), histogram[key] / 1e6)
+                   for fraction, key in PERCENTILE_KEYS.items() if histogram[key] is not None]
+        samples.append(('_count', _labels(**labels), histogram['count']))
+        if histogram['count']:
+            samples.append(('_sum', _labels(**labels),
+                            histogram['mean'] * histogram['count'] / 1e6))
+        return samples
+
+    metric('messages_total', 'counter', 'Frames received.', [('', '', snapshot['messages'])])
+    metric('bytes_total', 'counter', 'Bytes received.', [('', '', snapshot['bytes'])])
+    metric('reconnects_total', 'counter', 'Connections lost.', [('', '', snapshot['reconnects'])])
+    queue = snapshot.get('queue', {})
+    metric('queue_size', 'gauge', 'Items on the queue.', [('', '', queue.get('size'))])
+    metric('queue_dropped_total', 'counter', 'Items dropped from the full queue.',
+           [('', '', queue.get('dropped'))])
+    streams = [(channel, symbol, stats) for channel, symbols in snapshot['streams'].items()
+               for symbol, stats in symbols.items()]
+    metric('stream_messages_total', 'counter', 'Stream messages dispatched.',
+           [('', _labels(channel=channel, symbol=symbol), stats['messages'])
+            for channel, symbol, stats in streams])
+    metric('dispatch_latency_seconds', 'summary', 'Time from receiving to dispatching data.',
+           [sample for channel, symbol, stats in streams
+            for sample in summary(stats['dispatch_us'], channel=channel, symbol=symbol)])
+    metric('exchange_latency_seconds', 'summary', 'Time from the exchange timestamp to '
+           'receiving data.',
+           [sample for channel, symbol, stats in streams if stats['exchange_us']['count']
+            for sample in summary(stats['exchange_us'], channel=channel, symbol=symbol)])
+    metric('request_rtt_seconds', 'summary', 'Round-trip time of requests.',
+           [sample for method, histogram in snapshot['requests_us'].items()
+            for sample in summary(histogram, method=method)])
+    return '\n'.join(lines) + '\n'
+
+
+class PrometheusExporter:
+    """Serves ``to_prometheus(snapshot())`` over HTTP, for scraping by Prometheus."""
+
+    def __init__(self, snapshot, host='127.0.0.1', port=9108):
+        """Initialize the instance.
+
+        :param snapshot: callable returning a metrics snapshot, e.g. ``client.metrics``
+        :param host: interface to listen on
+        :param port: port to listen on; 0 picks a free port, see ``port`` once started.
+        """
+        self.snapshot = snapshot
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        """Start serving in a background thread."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                body = to_prometheus(exporter.snapshot()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                log.debug(*args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        Thread(target=self._server.serve_forever, name='PrometheusExporter', daemon=True).start()
+
+    def stop(self):
+        """Stop serving."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
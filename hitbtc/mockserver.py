@@ -0,0 +1,549 @@
+"""Local stand-in for the HitBTC websocket API, for load and latency testing.
+
+Speaks the JSONRPC protocol of the v2 API - logins, symbol and currency requests, stream
+subscriptions and order requests - and generates synthetic order book, trade and ticker streams
+for a configurable number of symbols, at a configurable rate. Latency and disconnects can be
+injected, and orders are answered with reports on the reports stream.
+
+Requires the optional ``websockets`` package (``pip install hitbtc[aio]``). Run it standalone
+via ``python -m hitbtc.mockserver --port 8765 --symbols 10 --rate 100``, or from Python::
+
+    server = MockHitBTCServer(symbols=10, rate=100)
+    server.start()
+    client = HitBTC(url=server.url)
+"""
+# Import Built-Ins
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from threading import Event, Thread
+
+# Import Third-Party
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+# Error codes and messages, as sent by the API
+ERRORS = {1001: ('Authorization required', ''),
+          1002: ('Method not found', ''),
+          2001: ('Symbol not found', 'Try get /api/2/public/symbol, to get list of all available '
+                                     'symbols.'),
+          2002: ('Currency not found', ''),
+          2010: ('Quantity not a valid number', ''),
+          2011: ('Quantity too low', ''),
+          20001: ('Insufficient funds', ''),
+          20002: ('Order not found', '')}
+
+STREAMS = {'subscribeTicker': 'ticker', 'subscribeOrderbook': 'orderbook',
+           'subscribeTrades': 'trades', 'subscribeCandles': 'candles'}
+
+
+class APIError(Exception):
+    """Raised by request handlers to answer with an error response."""
+
+    def __init__(self, code):
+        super(APIError, self).__init__(code)
+        self.code = code
+
+
+def _now():
+    """Return the current time in the API's timestamp format."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':'))
+
+
+class MockMarket:
+    """Synthetic order book, trades and ticker of a symbol."""
+
+    def __init__(self, symbol, depth=20, seed=None):
+        """Initialize the instance.
+
+        :param symbol: symbol name
+        :param depth: price levels per side
+        :param seed: seed of the random generator; defaults to the symbol's hash
+        """
+        self.symbol = symbol
+        self.depth = depth
+        self.rng = random.Random(seed if seed is not None else symbol)
+        self.tick = 0.000001
+        self.mid = self.rng.randint(10000, 100000)
+        self.sequence = 1
+        self.bids = {self.mid - i: self._size() for i in range(1, depth + 1)}
+        self.asks = {self.mid + i: self._size() for i in range(1, depth + 1)}
+        self.last = self.mid
+
+    def _size(self):
+        return '%.3f' % self.rng.uniform(0.001, 50)
+
+    def price(self, ticks):
+        """Return the price of the given number of ticks."""
+        return '%.6f' % (ticks * self.tick)
+
+    def _levels(self, side, changes=None):
+        items = changes if changes is not None else sorted(
+            side.items(), reverse=side is self.bids)
+        return [{'price': self.price(price), 'size': size} for price, size in items]
+
+    def snapshot(self):
+        """Return the params of a snapshotOrderbook notification."""
+        return {'ask': self._levels(self.asks), 'bid': self._levels(self.bids),
+                'symbol': self.symbol, 'sequence': self.sequence}
+
+    def update(self, levels=3):
+        """Change ``levels`` price levels per side; return the params of an updateOrderbook."""
+        self.sequence += 1
+        changes = {}
+        for side, sign in ((self.bids, -1), (self.asks, 1)):
+            side_changes = []
+            for _ in range(levels):
+                price = self.mid + sign * self.rng.randint(1, self.depth)
+                size = self._size() if self.rng.random() < 0.7 or price not in side else '0.000'
+                if size == '0.000':
+                    side.pop(price, None)
+                else:
+                    side[price] = size
+                side_changes.append((price, size))
+            changes[side is self.asks] = side_changes
+        return {'ask': self._levels(self.asks, changes[True]),
+                'bid': self._levels(self.bids, changes[False]),
+                'symbol': self.symbol, 'sequence': self.sequence}
+
+    def trade(self, trade_id):
+        """Return a trade with the given ID."""
+        side = self.rng.choice(('buy', 'sell'))
+        self.last = self.mid + (1 if side == 'buy' else -1)
+        return {'id': trade_id, 'price': self.price(self.last), 'quantity': self._size(),
+                'side': side, 'timestamp': _now()}
+
+    def ticker(self):
+        """Return the params of a ticker notification."""
+        return {'ask': self.price(min(self.asks)), 'bid': self.price(max(self.bids)),
+                'last': self.price(self.last), 'open': self.price(self.mid),
+                'low': self.price(self.mid - self.depth), 'high': self.price(self.mid + self.depth),
+                'volume': '1000.000', 'volumeQuote': '%.6f' % (1000 * self.mid * self.tick),
+                'timestamp': _now(), 'symbol': self.symbol}
+
+    def candle(self, period):
+        """Return the params of an updateCandles notification."""
+        price = self.price(self.last)
+        return {'data': [{'timestamp': _now()[:17] + '00.000Z', 'open': price, 'close': price,
+                          'min': price, 'max': price, 'volume': '1.000',
+                          'volumeQuote': price}], 'symbol': self.symbol, 'period': period}
+
+    def describe(self):
+        """Return the symbol's getSymbols result item."""
+        return {'id': self.symbol, 'baseCurrency': self.symbol[:-3],
+                'quoteCurrency': self.symbol[-3:], 'quantityIncrement': '0.001',
+                'tickSize': self.price(1), 'takeLiquidityRate': '0.001',
+                'provideLiquidityRate': '-0.0001', 'feeCurrency': self.symbol[-3:]}
+
+
+class MockConnection:
+    """A client connection, writing frames in order once their injected latency has passed."""
+
+    def __init__(self, ws, latency, jitter):
+        self.ws = ws
+        self.latency = latency
+        self.jitter = jitter
+        self.logged_in = False
+        self.streams = set()
+        self.reports = False
+        self._queue = asyncio.Queue()
+        self._due = 0
+        self._writer = asyncio.ensure_future(self._write())
+
+    def send(self, obj):
+        """Queue the given object for sending."""
+        self.write(_dumps(obj))
+
+    def write(self, frame):
+        """Queue the given serialized frame for sending."""
+        due = time.monotonic()
+        if self.latency or self.jitter:
+            due += self.latency + random.uniform(0, self.jitter)
+            # Frames never overtake each other
+            due = self._due = max(due, self._due)
+        self._queue.put_nowait((due, frame))
+
+    async def _write(self):
+        try:
+            while True:
+                due, frame = await self._queue.get()
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self.ws.send(frame)
+        except websockets.ConnectionClosed:
+            pass
+
+    def close(self):
+        self._writer.cancel()
+
+
+class MockHitBTCServer:
+    """Local HitBTC websocket API stand-in, running its event loop in a background thread.
+
+    Each of ``symbols`` symbols changes its order book ``rate`` times per second; every
+    ``trade_every``-th change comes with a trade and a ticker. Changes are broadcast to all
+    connections subscribed to them, so redundant connections receive identical streams.
+
+    Orders are kept per server, as if all connections belonged to the same account. Limit orders
+    rest until canceled; market orders are filled right away.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, symbols=10, rate=10, depth=20, trade_every=5,
+                 latency=0, jitter=0, disconnect_every=None, seed=0):
+        """Initialize the instance.
+
+        :param host: interface to listen on
+        :param port: port to listen on; defaults to a free port, see ``url`` once started.
+        :param symbols: number of symbols, or list of symbol names
+        :param rate: order book updates per symbol and second
+        :param depth: price levels per side of the synthetic books
+        :param trade_every: send a trade and ticker with every n-th book update
+        :param latency: seconds every frame sent is delayed by
+        :param jitter: maximum seconds of additional, random delay per frame
+        :param disconnect_every: seconds after which all connections are closed, repeatedly
+        :param seed: seed of the synthetic markets
+        :raises ImportError: if the websockets package isn't installed
+        """
+        if websockets is None:
+            raise ImportError("MockHitBTCServer requires the websockets package!")
+        if isinstance(symbols, int):
+            symbols = ['ETHBTC'] + ['SYM%dBTC' % i for i in range(1, symbols)]
+        self.host = host
+        self.port = port
+        self.markets = {symbol: MockMarket(symbol, depth, '%s%s' % (seed, symbol))
+                        for symbol in symbols}
+        self.rate = rate
+        self.trade_every = trade_every
+        self.latency = latency
+        self.jitter = jitter
+        self.disconnect_every = disconnect_every
+        self.connections = set()
+        self.orders = {}
+        self.messages_sent = 0
+        self.requests_received = 0
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._loop = None
+        self._thread = None
+        self._started = Event()
+        self._stop = None
+
+    @property
+    def url(self):
+        """URL of the server."""
+        return 'ws://%s:%s' % (self.host, self.port)
+
+    def start(self):
+        """Start the server in a background thread, and wait until it accepts connections."""
+        self._thread = Thread(target=self._run, name='MockHitBTCServer', daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self):
+        """Stop the server."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set_result, None)
+            self._thread.join(timeout=5)
+
+    def disconnect_all(self):
+        """Close all client connections, as the API does now and then."""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result()
+
+    def _run(self):
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        """Serve until stop() is called."""
+        self._loop = asyncio.get_running_loop()
+        self._stop = self._loop.create_future()
+        # Clients may not complete the closing handshake; disconnect_all() needn't wait for them
+        async with websockets.serve(self._handle, self.host, self.port,
+                                    close_timeout=0.5) as server:
+            self.port = next(iter(server.sockets)).getsockname()[1]
+            tasks = [asyncio.ensure_future(self._tick())]
+            if self.disconnect_every:
+                tasks.append(asyncio.ensure_future(self._disconnect_periodically()))
+            self._started.set()
+            await self._stop
+            for task in tasks:
+                task.cancel()
+            await self._close_all()
+
+    async def _close_all(self):
+        for conn in list(self.connections):
+            await conn.ws.close()
+
+    async def _disconnect_periodically(self):
+        while True:
+            await asyncio.sleep(self.disconnect_every)
+            log.info("Disconnecting %s connections.", len(self.connections))
+            await self._close_all()
+
+    async def _handle(self, ws, path=None):
+        """Serve a client connection."""
+        conn = MockConnection(ws, self.latency, self.jitter)
+        self.connections.add(conn)
+        try:
+            async for message in ws:
+                self.requests_received += 1
+                self._handle_request(conn, json.loads(message))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(conn)
+            conn.close()
+
+    def _handle_request(self, conn, request):
+        """Answer a request, and send any notifications it triggers."""
+        method, params, i_d = request.get('method'), request.get('params', {}), request.get('id')
+        handler = getattr(self, '_on_' + method, None) if method else None
+        try:
+            if handler is None:
+                raise APIError(1002)
+            result, notifications = handler(conn, params)
+        except APIError as e:
+            message, description = ERRORS[e.code]
+            conn.send({'jsonrpc': '2.0', 'error': {'code': e.code, 'message': message,
+                                                   'description': description}, 'id': i_d})
+            return
+        conn.send({'jsonrpc': '2.0', 'result': result, 'id': i_d})
+        for method, params in notifications:
+            if method == 'report':
+                # Reports go to all connections of the account
+                for subscriber in self.connections:
+                    if subscriber.reports:
+                        self._notify(subscriber, method, params)
+            else:
+                self._notify(conn, method, params)
+
+    def _notify(self, conn, method, params):
+        self.messages_sent += 1
+        conn.send({'jsonrpc': '2.0', 'method': method, 'params': params})
+
+    def _market(self, params):
+        try:
+            return self.markets[params['symbol']]
+        except KeyError:
+            raise APIError(2001)
+
+    # Requests - handlers return the result and a list of (method, params) notifications
+
+    def _on_login(self, conn, params):
+        if not params.get('pKey'):
+            raise APIError(1001)
+        conn.logged_in = True
+        return True, []
+
+    def _on_getSymbols(self, conn, params):
+        return [market.describe() for market in self.markets.values()], []
+
+    def _on_getSymbol(self, conn, params):
+        return self._market(params).describe(), []
+
+    def _on_getCurrencies(self, conn, params):
+        currencies = sorted({market.symbol[:-3] for market in self.markets.values()} |
+                            {market.symbol[-3:] for market in self.markets.values()})
+        return [self._currency(currency) for currency in currencies], []
+
+    def _on_getCurrency(self, conn, params):
+        return self._currency(params.get('currency')), []
+
+    @staticmethod
+    def _currency(currency):
+        return {'id': currency, 'fullName': currency, 'crypto': True, 'payinEnabled': True,
+                'payinPaymentId': False, 'payinConfirmations': 2, 'payoutEnabled': True,
+                'payoutIsPaymentId': False, 'transferEnabled': True, 'delisted': False,
+                'payoutFee': '0.001'}
+
+    def _on_getTrades(self, conn, params):
+        market = self._market(params)
+        return {'data': [market.trade(next(self._trade_ids)) for _ in range(10)],
+                'symbol': market.symbol}, []
+
+    def _on_getTradingBalance(self, conn, params):
+        self._require_login(conn)
+        return [{'currency': 'BTC', 'available': '1.0', 'reserved': '0'}], []
+
+    def _on_getOrders(self, conn, params):
+        self._require_login(conn)
+        return self._open_orders(), []
+
+    def _subscribe(self, conn, params, method):
+        market = self._market(params)
+        stream = STREAMS[method]
+        conn.streams.add((stream, market.symbol, params.get('period')))
+        if stream == 'orderbook':
+            return True, [('snapshotOrderbook', market.snapshot())]
+        if stream == 'trades':
+            return True, [('snapshotTrades', {'data': [], 'symbol': market.symbol})]
+        if stream == 'candles':
+            return True, [('snapshotCandles', market.candle(params.get('period', 'M30')))]
+        return True, []
+
+    def _unsubscribe(self, conn, params, method):
+        conn.streams.discard((STREAMS[method], params.get('symbol'), params.get('period')))
+        return True, []
+
+    def _on_subscribeTicker(self, conn, params):
+        return self._subscribe(conn, params, 'subscribeTicker')
+
+    def _on_subscribeOrderbook(self, conn, params):
+        return self._subscribe(conn, params, 'subscribeOrderbook')
+
+    def _on_subscribeTrades(self, conn, params):
+        return self._subscribe(conn, params, 'subscribeTrades')
+
+    def _on_subscribeCandles(self, conn, params):
+        return self._subscribe(conn, params, 'subscribeCandles')
+
+    def _on_unsubscribeTicker(self, conn, params):
+        return self._unsubscribe(conn, params, 'subscribeTicker')
+
+    def _on_unsubscribeOrderbook(self, conn, params):
+        return self._unsubscribe(conn, params, 'subscribeOrderbook')
+
+    def _on_unsubscribeTrades(self, conn, params):
+        return self._unsubscribe(conn, params, 'subscribeTrades')
+
+    def _on_unsubscribeCandles(self, conn, params):
+        return self._unsubscribe(conn, params, 'subscribeCandles')
+
+    def _on_subscribeReports(self, conn, params):
+        self._require_login(conn)
+        conn.reports = True
+        return True, [('activeOrders', self._open_orders())]
+
+    def _on_newOrder(self, conn, params):
+        self._require_login(conn)
+        market = self._market(params)
+        try:
+            quantity = float(params['quantity'])
+        except (KeyError, ValueError):
+            raise APIError(2010)
+        if quantity <= 0:
+            raise APIError(2011)
+        now = _now()
+        order = {'id': str(next(self._order_ids)),
+                 'clientOrderId': params.get('clientOrderId') or '%032x' % random.getrandbits(128),
+                 'symbol': market.symbol, 'side': params.get('side', 'buy'), 'status': 'new',
+                 'type': params.get('type', 'limit'),
+                 'timeInForce': params.get('timeInForce', 'GTC'),
+                 'quantity': params['quantity'], 'price': params.get('price', '0'),
+                 'cumQuantity': '0', 'postOnly': False, 'createdAt': now, 'updatedAt': now,
+                 'reportType': 'new'}
+        if order['type'] == 'market':
+            order.update(status='filled', cumQuantity=order['quantity'], reportType='trade',
+                         tradeQuantity=order['quantity'],
+                         tradePrice=market.price(market.last))
+        else:
+            self.orders[order['clientOrderId']] = order
+        return order, [('report', order)]
+
+    def _on_cancelOrder(self, conn, params):
+        self._require_login(conn)
+        order = self.orders.pop(params.get('clientOrderId'), None)
+        if order is None:
+            raise APIError(20002)
+        order = dict(order, status='canceled', reportType='canceled', updatedAt=_now())
+        return order, [('report', order)]
+
+    def _on_cancelReplaceOrder(self, conn, params):
+        self._require_login(conn)
+        order = self.orders.pop(params.get('clientOrderId'), None)
+        if order is None:
+            raise APIError(20002)
+        order = dict(order, clientOrderId=params.get('requestClientId'),
+                     originalRequestClientOrderId=order['clientOrderId'],
+                     quantity=params.get('quantity', order['quantity']),
+                     price=params.get('price', order['price']), reportType='replaced',
+                     updatedAt=_now())
+        self.orders[order['clientOrderId']] = order
+        return order, [('report', order)]
+
+    def _open_orders(self):
+        return [dict(order, reportType='status') for order in self.orders.values()]
+
+    @staticmethod
+    def _require_login(conn):
+        if not conn.logged_in:
+            raise APIError(1001)
+
+    # Streams
+
+    async def _tick(self):
+        """Generate ``rate`` changes per symbol and second, catching up if running late."""
+        started = time.monotonic()
+        ticks = 0
+        while True:
+            due = int((time.monotonic() - started) * self.rate) - ticks
+            for _ in range(due):
+                ticks += 1
+                for market in self.markets.values():
+                    self._broadcast(market, ticks)
+            await asyncio.sleep(max(0.001, (ticks + 1) / self.rate -
+                                    (time.monotonic() - started)))
+
+    def _broadcast(self, market, ticks):
+        """Change the market and send the change to all subscribed connections.
+
+        Each notification is serialized once, and only if a connection is subscribed to it.
+        """
+        symbol = market.symbol
+        notifications = [(('orderbook', symbol, None), 'updateOrderbook', market.update())]
+        if ticks % self.trade_every == 0:
+            notifications.append((('trades', symbol, None), 'updateTrades',
+                                  {'data': [market.trade(next(self._trade_ids))],
+                                   'symbol': symbol}))
+            notifications.append((('ticker', symbol, None), 'ticker', market.ticker()))
+        for stream, method, params in notifications:
+            frame = None
+            for conn in self.connections:
+                if stream in conn.streams:
+                    if frame is None:
+                        frame = _dumps({'jsonrpc': '2.0', 'method': method, 'params': params})
+                    self.messages_sent += 1
+                    conn.write(frame)
+
+
+def main(argv=None):
+    """Run the server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--symbols', type=int, default=10)
+    parser.add_argument('--rate', type=float, default=10,
+                        help='order book updates per symbol and second')
+    parser.add_argument('--latency', type=float, default=0, help='seconds added per frame')
+    parser.add_argument('--jitter', type=float, default=0, help='max random seconds per frame')
+    parser.add_argument('--disconnect-every', type=float, default=None,
+                        help='seconds between closing all connections')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    server = MockHitBTCServer(args.host, args.port, args.symbols, args.rate,
+                              latency=args.latency, jitter=args.jitter,
+                              disconnect_every=args.disconnect_every)
+    print("Serving on %s" % server.url)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Local model of our orders, maintained from the reports stream."""
+# Import Built-Ins
+import logging
+from collections import deque
+from threading import Lock
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+OPEN_STATUSES = frozenset(('new', 'suspended', 'partiallyFilled'))
+
+# Fields whose change is reported to callbacks
+_TRACKED_FIELDS = ('status', 'cumQuantity', 'quantity', 'price', 'updatedAt')
+
+
+class OrderTracker:
+    """Tracks the state of our orders from ``activeOrders`` snapshots and ``report`` updates.
+
+    Orders are the dicts sent by HitBTC, keyed by ``clientOrderId``; they are additionally
+    indexed by symbol and by status. Replaced orders are re-keyed to their new ``clientOrderId``.
+    Closed orders (filled, canceled, expired) are kept until ``max_closed`` newer orders have
+    been closed.
+
+    Callbacks registered via add_callback() are called as ``callback(order, previous)`` whenever
+    an order's status, quantity, price or filled quantity changes; ``previous`` is None for new
+    orders.
+    """
+
+    def __init__(self, max_closed=None):
+        """Initialize the instance.
+
+        :param max_closed: number of closed orders to keep; defaults to 1000.
+        """
+        self.orders = {}
+        self.max_closed = max_closed or 1000
+        self._by_symbol = {}
+        self._by_status = {}
+        self._closed = deque()
+        self._callbacks = []
+        self._lock = Lock()
+
+    def __contains__(self, client_order_id):
+        return client_order_id in self.orders
+
+    def __len__(self):
+        return len(self.orders)
+
+    def get(self, client_order_id):
+        """Return the order with the given ``clientOrderId``, or None."""
+        return self.orders.get(client_order_id)
+
+    def by_symbol(self, symbol):
+        """Return all tracked orders of ``symbol``."""
+        with self._lock:
+            return [self.orders[key] for key in self._by_symbol.get(symbol, ())]
+
+    def by_status(self, status):
+        """Return all tracked orders with the given status, e.g. 'partiallyFilled'."""
+        with self._lock:
+            return [self.orders[key] for key in self._by_status.get(status, ())]
+
+    def open_orders(self, symbol=None):
+        """Return all open orders, optionally only those of ``symbol``."""
+        with self._lock:
+            return [order for status in OPEN_STATUSES
+                    for order in (self.orders[key] for key in self._by_status.get(status, ()))
+                    if symbol is None or order['symbol'] == symbol]
+
+    def filled(self, client_order_id):
+        """Return the filled quantity of the given order as float, or None if it's unknown."""
+        order = self.orders.get(client_order_id)
+        return float(order.get('cumQuantity') or 0) if order is not None else None
+
+    def remaining(self, client_order_id):
+        """Return the unfilled quantity of the given order as float, or None if it's unknown."""
+        order = self.orders.get(client_order_id)
+        if order is None:
+            return None
+        if order.get('status') not in OPEN_STATUSES:
+            return 0.0
+        return float(order['quantity']) - float(order.get('cumQuantity') or 0)
+
+    def add_callback(self, callback):
+        """Call ``callback(order, previous)`` on every change of an order."""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        """Unregister a callback previously registered via add_callback()."""
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def snapshot(self, orders):
+        """Apply an ``activeOrders`` snapshot.
+
+        Open orders missing from the snapshot are no longer active, and are removed.
+        """
+        active = {order['clientOrderId'] for order in orders}
+        with self._lock:
+            stale = [key for status in OPEN_STATUSES for key in self._by_status.get(status, ())
+                     if key not in active]
+            for key in stale:
+                log.debug("Order %s is no longer active, removing it.", key)
+                self._remove(key)
+        for order in orders:
+            self.apply(order)
+
+    def apply(self, report):
+        """Apply a ``report`` update, or the result of an order request."""
+        key = report['clientOrderId']
+        with self._lock:
+            original = report.get('originalRequestClientOrderId')
+            previous = self._remove(original) if original else None
+            if previous is None:
+                previous = self._remove(key)
+            order = dict(previous or ())
+            order.update(report)
+            self.orders[key] = order
+            self._by_symbol.setdefault(order['symbol'], set()).add(key)
+            self._by_status.setdefault(order['status'], set()).add(key)
+            if order['status'] not in OPEN_STATUSES and (
+                    previous is None or previous['status'] in OPEN_STATUSES):
+                self._closed.append(key)
+                while len(self._closed) > self.max_closed:
+                    expired = self.orders.get(self._closed.popleft())
+                    if expired is not None and expired['status'] not in OPEN_STATUSES:
+                        self._remove(expired['clientOrderId'])
+        if previous is not None and all(previous.get(field) == order.get(field)
+                                        for field in _TRACKED_FIELDS):
+            return
+        for callback in self._callbacks:
+            try:
+                callback(order, previous)
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception("Order callback %r failed on %s: %s", callback, key, e)
+
+    def _remove(self, key):
+        """Remove the order from all indexes and return it, or None if it isn't tracked."""
+        order = self.orders.pop(key, None)
+        if order is not None:
+            self._by_symbol.get(order['symbol'], set()).discard(key)
+            self._by_status.get(order['status'], set()).discard(key)
+        return order
+
+    def clear(self):
+        """Forget all orders."""
+        with self._lock:
+            self.orders.clear()
+            self._by_symbol.clear()
+            self._by_status.clear()
+            self._closed.clear()
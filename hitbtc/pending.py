@@ -0,0 +1,308 @@
+"""Correlation of sent requests with their responses."""
+# Import Built-Ins
+import logging
+import time
+import heapq
+import itertools
+from threading import Lock
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class RequestError(Exception):
+    """Raised by request futures if the API responded with an error."""
+
+    def __init__(self, request, response):
+        """Initialize the instance.
+
+        :param request: the payload sent to the API
+        :param response: the error response object received from the API
+        """
+        error = response.get('error', {})
+        super(RequestError, self).__init__("{code} - {message}".format(
+            code=error.get('code'), message=error.get('message')))
+        self.request = request
+        self.response = response
+
+
+class RequestTimeout(RequestError):
+    """Raised by request futures if no response arrived before the request's deadline."""
+
+    def __init__(self, request, reason='Request timed out'):
+        """Initialize the instance.
+
+        :param request: the payload sent to the API
+        :param reason: str, why the request was given up on
+        """
+        super(RequestTimeout, self).__init__(request, {'error': {'message': reason}})
+        self.args = (reason,)
+
+
+class PendingRequest:
+    """A request awaiting its response."""
+
+    __slots__ = ('request', 'future', 'sent_at', 'deadline')
+
+    def __init__(self, request, future, sent_at, deadline):
+        self.request = request
+        self.future = future
+        self.sent_at = sent_at
+        self.deadline = deadline
+
+
+class PendingRequests:
+    """Bounded table of requests awaiting a response, keyed by request ID.
+
+    IDs are taken from a monotonic counter, so two requests never share an ID. Each entry has a
+    deadline; entries past it are failed with :class:`RequestTimeout` by :meth:`expire`. If the
+    table is full, the oldest entry is failed to make room for the new one.
+
+    Futures are given a ``latency`` attribute (seconds between sending and receiving the
+    response) before being resolved.
+    """
+
+    def __init__(self, timeout=None, maxsize=None):
+        """Initialize the instance.
+
+        :param timeout: default seconds to wait for a response; defaults to 30s.
+        :param maxsize: maximum number of pending requests; defaults to 1000.
+        """
+        self.timeout = timeout or 30
+        self.maxsize = maxsize or 1000
+        self._ids = itertools.count(1)
+        self._order = itertools.count()
+        self._entries = {}
+        self._deadlines = []
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, i_d):
+        return i_d in self._entries
+
+    def next_id(self):
+        """Return a new, unique request ID."""
+        return next(self._ids)
+
+    def add(self, i_d, request, future, timeout=None):
+        """Register a request awaiting its response.
+
+        :param i_d: ID of the request
+        :param request: the payload sent to the API
+        :param future: future to resolve once the response arrives
+        :param timeout: seconds to wait for the response; defaults to ``self.timeout``
+        """
+        now = time.monotonic()
+        entry = PendingRequest(request, future, now, now + (timeout or self.timeout))
+        evicted = []
+        with self._lock:
+            if i_d in self._entries:
+                raise ValueError("A request with ID %r is already pending!" % i_d)
+            while len(self._entries) >= self.maxsize:
+                oldest = next(iter(self._entries))
+                evicted.append(self._entries.pop(oldest))
+            self._entries[i_d] = entry
+            heapq.heappush(self._deadlines, (entry.deadline, next(self._order), i_d, entry))
+            self._compact()
+        for entry in evicted:
+            log.warning("Pending request table full, giving up on %r", entry.request)
+            _fail(entry, RequestTimeout(entry.request, 'Evicted from full pending request table'))
+
+    def pop(self, i_d):
+        """Remove and return the entry of the given request ID, or None if it isn't pending."""
+        with self._lock:
+            entry = self._entries.pop(i_d, None)
+            self._compact()
+            return entry
+
+    def _compact(self):
+        """Drop the deadlines of answered and evicted requests, once they outnumber the pending
+        ones, so the heap stays within twice ``maxsize``. Must be called holding the lock."""
+        if len(self._deadlines) <= 2 * len(self._entries) + 16:
+            return
+        entries = self._entries
+        self._deadlines = [item for item in self._deadlines if entries.get(item[2]) is item[3]]
+        heapq.heapify(self._deadlines)
+
+    def resolve(self, entry, result):
+        """Resolve the entry's future with the given result."""
+        entry.future.latency = time.monotonic() - entry.sent_at
+        if not entry.future.done():
+            entry.future.set_result(result)
+
+    def reject(self, entry, exception):
+        """Resolve the entry's future with the given exception."""
+        entry.future.latency = time.monotonic() - entry.sent_at
+        _fail(entry, exception)
+
+    def expire(self, now=None):
+        """Fail all requests whose deadline has passed.
+
+        :param now: float, current time.monotonic() value
+        :return: list of expired entries
+        """
+        now = now or time.monotonic()
+        expired = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, _, i_d, entry = heapq.heappop(self._deadlines)
+                # The ID may have been answered, or re-used by a newer request
+                if self._entries.get(i_d) is entry:
+                    expired.append(self._entries.pop(i_d))
+            if not self._entries:
+                self._deadlines = []
+        for entry in expired:
+            log.warning("No response received for request %r", entry.request)
+            _fail(entry, RequestTimeout(entry.request))
+        return expired
+
+    def clear(self, reason='Connection closed'):
+        """Fail all pending requests."""
+        with self._lock:
+            entries, self._entries, self._deadlines = self._entries, {}, []
+        for entry in entries.values():
+            _fail(entry, RequestTimeout(entry.request, reason))
+
+
+class BatchItem:
+    """Outcome of a single request of a batch."""
+
+    __slots__ = ('request', 'result', 'error', 'latency')
+
+    def __init__(self, request, result=None, error=None, latency=None):
+        self.request = request
+        self.result = result
+        self.error = error
+        self.latency = latency
+
+    def __repr__(self):
+        return '<BatchItem id=%r ok=%s latency=%s>' % (self.request.get('id'), self.ok,
+                                                      self.latency)
+
+    @property
+    def ok(self):
+        """Whether or not the request succeeded."""
+        return self.error is None
+
+
+class BatchResult:
+    """Aggregate outcome of a batch of requests, in the order they were sent.
+
+    Each item is a :class:`BatchItem` holding the request, its result or error (a
+    :class:`RequestError`, or :class:`RequestTimeout` if no response arrived in time) and the
+    request's round-trip latency in seconds (None if it timed out).
+    """
+
+    def __init__(self, items):
+        self.items = items
+
+    def __repr__(self):
+        return '<BatchResult %s/%s succeeded>' % (len(self.succeeded), len(self.items))
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    @property
+    def ok(self):
+        """Whether or not all requests succeeded."""
+        return all(item.ok for item in self.items)
+
+    @property
+    def succeeded(self):
+        """List of the items whose request succeeded."""
+        return [item for item in self.items if item.ok]
+
+    @property
+    def failed(self):
+        """List of the items whose request failed or timed out."""
+        return [item for item in self.items if not item.ok]
+
+    @property
+    def results(self):
+        """List of the results of all requests; None for failed ones."""
+        return [item.result for item in self.items]
+
+
+def gather(requests, futures, aggregate):
+    """Resolve ``aggregate`` with a :class:`BatchResult` once all ``futures`` are done.
+
+    The aggregate future is never failed; errors are reported per item instead.
+
+    :param requests: list of payloads sent
+    :param futures: list of the payloads' futures, in the same order
+    :param aggregate: future to resolve
+    :return: ``aggregate``
+    """
+    remaining = [len(futures)]
+    lock = Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        items = []
+        for request, future in zip(requests, futures):
+            latency = getattr(future, 'latency', None)
+            if future.cancelled():
+                items.append(BatchItem(request, error=RequestTimeout(request, 'Cancelled')))
+            elif future.exception() is not None:
+                items.append(BatchItem(request, error=future.exception(), latency=latency))
+            else:
+                items.append(BatchItem(request, future.result(), latency=latency))
+        if not aggregate.done():
+            aggregate.set_result(BatchResult(items))
+
+    if not futures:
+        aggregate.set_result(BatchResult([]))
+    for future in futures:
+        future.add_done_callback(done)
+    return aggregate
+
+
+def first(futures, aggregate):
+    """Resolve ``aggregate`` with the result of whichever of ``futures`` succeeds first.
+
+    If all of them fail, ``aggregate`` fails with the exception of the last one; its ``latency``
+    is that of the future it was resolved from.
+
+    :param futures: list of futures of the same request, sent via different connections
+    :param aggregate: future to resolve
+    :return: ``aggregate``
+    """
+    remaining = [len(futures)]
+    lock = Lock()
+
+    def done(future):
+        with lock:
+            remaining[0] -= 1
+            if aggregate.done():
+                return
+            failed = future.cancelled() or future.exception() is not None
+            if failed and remaining[0]:
+                return
+            aggregate.latency = getattr(future, 'latency', None)
+            if future.cancelled():
+                aggregate.cancel()
+            elif failed:
+                aggregate.set_exception(future.exception())
+            else:
+                aggregate.set_result(future.result())
+
+    for future in futures:
+        future.add_done_callback(done)
+    return aggregate
+
+
+def _fail(entry, exception):
+    """Set the exception on the entry's future, unless it was cancelled."""
+    if not entry.future.done():
+        entry.future.set_exception(exception)
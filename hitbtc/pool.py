@@ -0,0 +1,250 @@
+"""Pool of HitBTC clients sharing the load of stream subscriptions."""
+# Import Built-Ins
+import logging
+import queue
+import time
+import zlib
+from threading import Thread, Event
+
+# Import Homebrew
+from hitbtc.client import HitBTC
+from hitbtc.wss import WebSocketConnectorProcess
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+# API methods of the client's subscribe_* methods
+SUBSCRIBE_METHODS = {'subscribe_ticker': 'subscribeTicker', 'subscribe_book': 'subscribeOrderbook',
+                     'subscribe_trades': 'subscribeTrades', 'subscribe_candles': 'subscribeCandles'}
+
+
+class HitBTCPool:
+    """Distributes subscriptions across several websocket connections (shards).
+
+    Each ``subscribe_*`` call is assigned to a shard, either by hashing its symbol (``'hash'``)
+    or by picking the shard with the fewest subscriptions (``'load'``). Requests, orders and the
+    reports subscription are sent via the primary shard, i.e. the first one.
+
+    By default all shards share a single queue, so ``recv()`` returns the merged stream: the
+    first shard's queue object is assigned to all other shards' connectors, so its ``q_maxsize``
+    and overflow policy apply to the merged stream, and ``queue_stats()`` of any shard reports
+    it. Pass ``merge=False`` to keep a queue per shard, and pass ``shard=<index>`` to ``recv()``.
+
+    Passing ``mode='process'`` runs each shard in its own process, so that decoding scales
+    across cores. Their output is merged by polling the shards in turn.
+
+    A shard which has been disconnected for longer than ``failover_after`` seconds is
+    considered failed; its subscriptions are moved to the remaining shards.
+    """
+
+    def __init__(self, shards=4, key=None, secret=None, strategy='hash', merge=True,
+                 failover_after=None, client_cls=None, **client_ops):
+        """Initialize the instance.
+
+        :param shards: number of connections to open
+        :param key: API Public Key
+        :param secret: API Secret Key
+        :param strategy: 'hash' or 'load', see above
+        :param merge: Bool, whether or not all shards share a single queue
+        :param failover_after: seconds a shard may be disconnected before its subscriptions are
+                               moved; defaults to 5s.
+        :param client_cls: client class to instantiate per shard; defaults to HitBTC
+        :param client_ops: kwargs passed to each client on instantiation
+        """
+        if strategy not in ('hash', 'load'):
+            raise ValueError("Unknown sharding strategy %r!" % strategy)
+        client_cls = client_cls or HitBTC
+        self.clients = [client_cls(key, secret, **client_ops) for _ in range(shards)]
+        self.strategy = strategy
+        self.merged = merge
+        self._polled = merge and any(isinstance(client.conn, WebSocketConnectorProcess)
+                                     for client in self.clients)
+        self._next = 0
+        if merge and not self._polled:
+            for client in self.clients[1:]:
+                client.conn.q = self.clients[0].conn.q
+        self.failover_after = failover_after or 5
+        self.assignments = {}
+        # Assignments per symbol, so shard_of() needn't scan all assignments
+        self._by_symbol = {}
+        self._params = {}
+        self._failed = set()
+        self._down_since = {}
+        self._monitor = None
+        self._stopped = Event()
+
+    @property
+    def primary(self):
+        """The client handling requests, orders and reports."""
+        return self.clients[0]
+
+    def start(self):
+        """Start all connections and the failover monitor."""
+        for client in self.clients:
+            client.start()
+        self._stopped.clear()
+        self._monitor = Thread(target=self._watch, name='HitBTCPoolMonitor', daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        """Stop all connections and the failover monitor."""
+        self._stopped.set()
+        for client in self.clients:
+            client.stop()
+
+    def is_connected(self):
+        """Return whether or not all shards are connected."""
+        return all(client.is_connected() for client in self.clients)
+
+    def recv(self, block=True, timeout=None, shard=0):
+        """Retrieve data from the merged queue, or the given shard's queue if not merged."""
+        if self._polled:
+            return self._poll(block, timeout)
+        return self.clients[0 if self.merged else shard].recv(block, timeout)
+
+    def _poll(self, block, timeout):
+        """Return the next item of any shard, polling them in turn."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        delay = 0.00005
+        while True:
+            for _ in range(len(self.clients)):
+                client = self.clients[self._next]
+                self._next = (self._next + 1) % len(self.clients)
+                try:
+                    return client.recv(block=False)
+                except queue.Empty:
+                    continue
+            if not block or (deadline is not None and time.monotonic() >= deadline):
+                raise queue.Empty
+            time.sleep(delay)
+            delay = min(delay * 2, 0.001)
+
+    def shard_of(self, symbol):
+        """Return the index of the shard currently receiving data of ``symbol``, or None."""
+        assigned = self._by_symbol.get(symbol)
+        return next(iter(assigned.values())) if assigned else None
+
+    def client_of(self, symbol):
+        """Return the client currently receiving data of ``symbol``, or the primary one."""
+        shard = self.shard_of(symbol)
+        return self.clients[shard] if shard is not None else self.primary
+
+    def order_book(self, symbol):
+        """Return the local order book of ``symbol``, or None."""
+        return self.client_of(symbol).order_book(symbol)
+
+    def latest_ticker(self, symbol):
+        """Return the latest ticker of ``symbol``, or None."""
+        return self.client_of(symbol).latest_ticker(symbol)
+
+    def latest_top(self, symbol):
+        """Return the latest top of book of ``symbol``, or None."""
+        return self.client_of(symbol).latest_top(symbol)
+
+    def login(self, key=None, secret=None, basic=None, custom_nonce=None):
+        """Login the primary shard using the WSS API."""
+        return self.primary.login(key, secret, basic, custom_nonce)
+
+    def subscribe_ticker(self, cancel=False, custom_id=None, **params):
+        """Subscribe to ticker data via the symbol's shard."""
+        return self._subscribe('subscribe_ticker', cancel, custom_id, params)
+
+    def subscribe_book(self, cancel=False, custom_id=None, **params):
+        """Subscribe to order book data via the symbol's shard."""
+        return self._subscribe('subscribe_book', cancel, custom_id, params)
+
+    def subscribe_trades(self, cancel=False, custom_id=None, **params):
+        """Subscribe to trade data via the symbol's shard."""
+        return self._subscribe('subscribe_trades', cancel, custom_id, params)
+
+    def subscribe_candles(self, cancel=False, custom_id=None, **params):
+        """Subscribe to candle data via the symbol's shard."""
+        return self._subscribe('subscribe_candles', cancel, custom_id, params)
+
+    def subscribe_reports(self, cancel=False, custom_id=None, **params):
+        """Subscribe to reports via the primary shard."""
+        return self.primary.subscribe_reports(cancel, custom_id, **params)
+
+    def __getattr__(self, name):
+        # Delegate request_*, place_order etc. to the primary shard
+        if name.startswith(('request_', 'place_', 'cancel_', 'replace_')):
+            return getattr(self.primary, name)
+        raise AttributeError(name)
+
+    def _subscribe(self, name, cancel, custom_id, params):
+        """Send the subscription via the appropriate shard and record its assignment."""
+        key = (name, params.get('symbol'), params.get('period'))
+        if cancel:
+            self._params.pop(key, None)
+            shard = self._unassign(key)
+            if shard is None:
+                shard = self._select(key[1])
+            return getattr(self.clients[shard], name)(True, custom_id, **params)
+
+        shard = self.assignments.get(key)
+        if shard is None:
+            shard = self._select(key[1])
+        self._assign(key, shard)
+        self._params[key] = params
+        return getattr(self.clients[shard], name)(False, custom_id, **params)
+
+    def _assign(self, key, shard):
+        """Record the assignment of a subscription to a shard."""
+        self.assignments[key] = shard
+        self._by_symbol.setdefault(key[1], {})[key] = shard
+
+    def _unassign(self, key):
+        """Forget the assignment of a subscription, returning its shard or None."""
+        assigned = self._by_symbol.get(key[1])
+        if assigned is not None:
+            assigned.pop(key, None)
+            if not assigned:
+                del self._by_symbol[key[1]]
+        return self.assignments.pop(key, None)
+
+    def _select(self, symbol):
+        """Select a healthy shard for the given symbol."""
+        healthy = [i for i in range(len(self.clients)) if i not in self._failed]
+        if not healthy:
+            healthy = list(range(len(self.clients)))
+        if self.strategy == 'hash' and symbol is not None:
+            return healthy[zlib.crc32(symbol.encode('utf-8')) % len(healthy)]
+        load = {i: 0 for i in healthy}
+        for shard in self.assignments.values():
+            if shard in load:
+                load[shard] += 1
+        return min(healthy, key=load.get)
+
+    def _watch(self):
+        """Detect failed shards and move their subscriptions."""
+        while not self._stopped.wait(1):
+            now = time.monotonic()
+            for i, client in enumerate(self.clients):
+                if client.is_connected():
+                    self._down_since.pop(i, None)
+                    if i in self._failed:
+                        log.info("Shard %s recovered.", i)
+                        self._failed.discard(i)
+                    continue
+                down_since = self._down_since.setdefault(i, now)
+                if i not in self._failed and now - down_since > self.failover_after:
+                    log.warning("Shard %s failed, moving its subscriptions.", i)
+                    self._failed.add(i)
+                    self._failover(i)
+
+    def _failover(self, shard):
+        """Re-subscribe all subscriptions of the given shard via healthy shards."""
+        for key, assigned in list(self.assignments.items()):
+            if assigned != shard:
+                continue
+            name, symbol, _ = key
+            new_shard = self._select(symbol)
+            if new_shard == shard:
+                # No healthy shard left; keep the assignment and retry on recovery
+                continue
+            self._assign(key, new_shard)
+            log.info("Moving %s %s from shard %s to %s", name, symbol, shard, new_shard)
+            # Remove it from the failed shard's subscriptions, lest it's replayed on recovery
+            self.clients[shard].conn.subscriptions.discard(SUBSCRIBE_METHODS[name],
+                                                           self._params[key])
+            getattr(self.clients[new_shard], name)(False, None, **self._params[key])
@@ -0,0 +1,204 @@
+"""Hooks around the connector's hot paths, and a sampling profiler built on them.
+
+Hooks are registered on a connector via ``add_hook(event, callback)``, and called as follows:
+
+- ``pre_decode(frame)`` before a received frame is decoded, and ``post_decode(message)`` with
+  the decoded message.
+- ``pre_dispatch(method, symbol, params)`` before decoded data is handled, i.e. books and
+  caches updated and the data placed on the queue or passed to its router handlers, and
+  ``post_dispatch(method, symbol, params)`` once it was. Responses are dispatched with the
+  method ``'Response'``, no symbol and the response as params.
+- ``pre_send(method, payload)`` before a request is serialized and written (or queued by the
+  rate limiter), and ``post_send(method, payload)`` once it was. For ``send_batch()``, the
+  payload is the list of payloads of the batch.
+
+Hooks run on the thread handling the stage - the receiving thread for decode and dispatch
+(the child process of process connectors), the caller's for send - and exceptions they raise
+are logged and otherwise ignored. While no hook is registered, each stage costs a single
+``is None`` check. After ``sample_hooks(every)``, the connector runs the hooks for only 1 in
+``every`` received frames and sent requests; the others cost a counter increment.
+"""
+# Import Built-Ins
+import logging
+import threading
+import time
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+HOOK_EVENTS = ('pre_decode', 'post_decode', 'pre_dispatch', 'post_dispatch', 'pre_send',
+               'post_send')
+
+
+class Hooks:
+    """Callbacks registered per hook event; see the module docstring for their signatures.
+
+    ``frames`` and ``requests`` count the frames and requests seen by the connector, which runs
+    the callbacks for 1 in ``every`` of them.
+    """
+
+    __slots__ = HOOK_EVENTS + ('every', 'frames', 'requests')
+
+    def __init__(self, every=1):
+        """Initialize the instance.
+
+        :param every: run the callbacks for 1 in ``every`` frames and requests
+        """
+        for event in HOOK_EVENTS:
+            setattr(self, event, [])
+        self.every = every
+        self.frames = 0
+        self.requests = 0
+
+    def __bool__(self):
+        return any(getattr(self, event) for event in HOOK_EVENTS)
+
+    def add(self, event, callback):
+        """Register ``callback`` for ``event``.
+
+        :raises ValueError: if the event is unknown
+        """
+        if event not in HOOK_EVENTS:
+            raise ValueError("Unknown hook event %r - must be one of %s!" %
+                             (event, ', '.join(HOOK_EVENTS)))
+        getattr(self, event).append(callback)
+
+    def remove(self, event, callback):
+        """Unregister a callback previously registered via add()."""
+        callbacks = getattr(self, event) if event in HOOK_EVENTS else ()
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def run(self, event, *args):
+        """Call the callbacks registered for ``event`` with ``args``."""
+        for callback in getattr(self, event):
+            try:
+                callback(*args)
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception("Hook %r failed on %s: %s", callback, event, e)
+
+
+class SamplingProfiler:
+    """Records the wall and CPU time of each stage for 1 in ``every`` frames and requests.
+
+    The sampling is left to the connector (see ``sample_hooks()``), so frames and requests which
+    aren't sampled never reach the profiler.
+
+    Stages are keyed by their stack, as used in flame graphs: ``on_message;decode``,
+    ``on_message;dispatch;<method>`` and ``send;<method>``. ``dump()`` writes the totals in the
+    collapsed stack format read by ``flamegraph.pl``, speedscope and similar tools.
+
+    CPU time is the time the handling thread was scheduled; a large gap between wall and CPU
+    time points at lock contention, GIL waits or blocking I/O rather than slow code.
+    """
+
+    def __init__(self, every=100):
+        """Initialize the instance.
+
+        :param every: profile 1 in ``every`` received frames and sent requests
+        """
+        self.every = max(1, int(every))
+        self.frames = 0
+        self.requests = 0
+        self.stages = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self, conn):
+        """Register the profiler's hooks on the connector ``conn``, and sample its hooks.
+
+        Sampling applies to all hooks of the connector.
+        """
+        conn.sample_hooks(self.every)
+        for event in HOOK_EVENTS:
+            conn.add_hook(event, getattr(self, '_' + event))
+
+    def uninstall(self, conn):
+        """Unregister the profiler's hooks from the connector ``conn``, ending the sampling."""
+        for event in HOOK_EVENTS:
+            conn.remove_hook(event, getattr(self, '_' + event))
+        conn.sample_hooks(1)
+
+    def _start(self):
+        self._local.started = time.perf_counter_ns(), time.thread_time_ns()
+
+    def _stop(self, stack):
+        started = getattr(self._local, 'started', None)
+        if started is None:
+            # The hooks were installed between the stage's start and its end
+            return
+        self._local.started = None
+        wall, cpu = started
+        wall, cpu = time.perf_counter_ns() - wall, time.thread_time_ns() - cpu
+        with self._lock:
+            totals = self.stages.get(stack)
+            if totals is None:
+                totals = self.stages[stack] = [0, 0, 0]
+            totals[0] += 1
+            totals[1] += wall
+            totals[2] += cpu
+
+    def _pre_decode(self, frame):
+        self.frames += 1
+        self._start()
+
+    def _post_decode(self, message):
+        self._stop('on_message;decode')
+
+    def _pre_dispatch(self, method, symbol, params):
+        self._start()
+
+    def _post_dispatch(self, method, symbol, params):
+        self._stop('on_message;dispatch;%s' % method)
+
+    def _pre_send(self, method, payload):
+        self.requests += 1
+        self._start()
+
+    def _post_send(self, method, payload):
+        self._stop('send;%s' % method)
+
+    def stats(self):
+        """Return a dict of sample counts, and total and mean wall and CPU time per stack (us).
+
+        ``frames`` and ``requests`` are the numbers of frames and requests sampled.
+
+        Only sampled frames and requests are timed; multiply totals by ``every`` to estimate
+        the time spent on all of them.
+        """
+        with self._lock:
+            stages = {stack: list(totals) for stack, totals in self.stages.items()}
+        return {'every': self.every, 'frames': self.frames, 'requests': self.requests,
+                'stages': {stack: {'count': count, 'wall_us': wall / 1e3, 'cpu_us': cpu / 1e3,
+                                   'mean_wall_us': wall / count / 1e3,
+                                   'mean_cpu_us': cpu / count / 1e3}
+                           for stack, (count, wall, cpu) in stages.items()}}
+
+    def collapsed(self, clock='wall'):
+        """Return the totals in the collapsed stack format, one ``<stack> <us>`` line each.
+
+        :param clock: 'wall' or 'cpu'
+        :raises ValueError: if the clock is unknown
+        """
+        if clock not in ('wall', 'cpu'):
+            raise ValueError("Unknown clock %r - must be 'wall' or 'cpu'!" % clock)
+        index = 1 if clock == 'wall' else 2
+        with self._lock:
+            lines = ['hitbtc;%s %d' % (stack, totals[index] // 1000)
+                     for stack, totals in sorted(self.stages.items())]
+        return ''.join(line + '\n' for line in lines)
+
+    def dump(self, path, clock='wall'):
+        """Write the totals in the collapsed stack format to ``path``.
+
+        Render them with e.g. ``flamegraph.pl <path> > profile.svg``.
+
+        :param clock: 'wall' or 'cpu'
+        """
+        with open(path, 'w') as f:
+            f.write(self.collapsed(clock))
+
+    def reset(self):
+        """Discard all samples."""
+        with self._lock:
+            self.stages.clear()
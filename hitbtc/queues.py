@@ -0,0 +1,171 @@
+"""Bounded queue with configurable behaviour for when it's full."""
+# Import Built-Ins
+import logging
+import pickle
+import tempfile
+from collections import deque
+from queue import Queue, Full
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+POLICIES = ('drop_oldest', 'drop_newest', 'conflate', 'block', 'spill')
+
+
+def conflate_ticker(item):
+    """Default conflation key - conflate ticker items by symbol, nothing else.
+
+    Items may carry a timestamp pair as 4th element (see the connector's ``timestamps``).
+    """
+    if type(item) is tuple and len(item) >= 3 and item[0] == 'ticker':
+        return item[0], item[1]
+    return None
+
+
+class _Slot:
+    """Queue entry of a conflatable item, updated in place by newer items of the same key."""
+
+    __slots__ = ('key', 'item')
+
+    def __init__(self, key, item):
+        self.key = key
+        self.item = item
+
+
+class OverflowQueue(Queue):
+    """Queue applying an overflow policy instead of raising queue.Full.
+
+    Policies:
+
+        - 'drop_oldest': discard the oldest item to make room for the new one
+        - 'drop_newest': discard the new item
+        - 'conflate': replace a queued item having the same key (as returned by ``key(item)``)
+          with the new item, keeping its position; if no such item is queued and the queue is
+          full, drop the oldest item.
+        - 'block': wait up to ``timeout`` seconds for a free slot, then discard the new item
+        - 'spill': write items that don't fit to a temporary file, and read them back in
+          order once there is room again. The queue is effectively unbounded.
+
+    The ``dropped``, ``conflated`` and ``spilled`` attributes count the items affected.
+    """
+
+    def __init__(self, maxsize=0, policy=None, timeout=None, key=None, spill_dir=None):
+        """Initialize the instance.
+
+        :param maxsize: maximum number of items held in memory
+        :param policy: overflow policy, one of POLICIES; defaults to 'drop_oldest'
+        :param timeout: seconds to wait for a free slot with policy 'block'; defaults to 1s.
+        :param key: callable returning an item's conflation key, or None if the item may not
+                    be conflated; defaults to conflating ticker items per symbol.
+        :param spill_dir: directory of the spill file; defaults to the system's temp dir.
+        """
+        policy = policy or 'drop_oldest'
+        if policy not in POLICIES:
+            raise ValueError("Unknown overflow policy %r! Choose one of %s" %
+                             (policy, ', '.join(POLICIES)))
+        self.policy = policy
+        self.timeout = timeout or 1
+        self.key = key or conflate_ticker
+        self.spill_dir = spill_dir
+        self.dropped = 0
+        self.conflated = 0
+        self.spilled = 0
+        super(OverflowQueue, self).__init__(maxsize)
+
+    def _init(self, maxsize):
+        self.queue = deque()
+        self._slots = {}
+        self._spill = None
+        self._spill_read = 0
+        self._spill_count = 0
+
+    def _qsize(self):
+        return len(self.queue) + self._spill_count
+
+    def _put(self, item):
+        if self.policy == 'conflate':
+            key = self.key(item)
+            if key is not None:
+                item = self._slots[key] = _Slot(key, item)
+        elif self.policy == 'spill' and (self._spill_count or len(self.queue) >= self.maxsize > 0):
+            self._write_spill(item)
+            return
+        self.queue.append(item)
+
+    def _get(self):
+        if not self.queue and self._spill_count:
+            self._read_spill()
+        item = self.queue.popleft()
+        if type(item) is _Slot:
+            del self._slots[item.key]
+            item = item.item
+        return item
+
+    def put(self, item, block=False, timeout=None):
+        """Put the item on the queue, applying the overflow policy if the queue is full.
+
+        ``block`` and ``timeout`` are ignored; they're accepted for compatibility with
+        queue.Queue.put().
+        """
+        if self.policy == 'block':
+            try:
+                super(OverflowQueue, self).put(item, True, self.timeout)
+            except Full:
+                self.dropped += 1
+            return
+
+        with self.not_full:
+            if self.policy == 'conflate':
+                key = self.key(item)
+                slot = self._slots.get(key) if key is not None else None
+                if slot is not None:
+                    slot.item = item
+                    self.conflated += 1
+                    return
+            if self.policy != 'spill' and 0 < self.maxsize <= self._qsize():
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return
+                self._get()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def _write_spill(self, item):
+        """Append the item to the spill file."""
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix='hitbtc-spill-', dir=self.spill_dir)
+            log.warning("Queue full, spilling items to disk.")
+        self._spill.seek(0, 2)
+        pickle.dump(item, self._spill, pickle.HIGHEST_PROTOCOL)
+        self._spill_count += 1
+        self.spilled += 1
+
+    def _read_spill(self):
+        """Move up to maxsize items from the spill file back into memory."""
+        self._spill.seek(self._spill_read)
+        for _ in range(min(self._spill_count, self.maxsize or self._spill_count)):
+            self.queue.append(pickle.load(self._spill))
+            self._spill_count -= 1
+        self._spill_read = self._spill.tell()
+        if not self._spill_count:
+            # All spilled items were read back, start over with an empty file
+            self._spill.seek(0)
+            self._spill.truncate()
+            self._spill_read = 0
+
+    def close(self):
+        """Close the spill file, if any, discarding the items spilled to it."""
+        with self.mutex:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+                self._spill_read = 0
+                self._spill_count = 0
+
+    def stats(self):
+        """Return a dict of the queue's size and overflow counters."""
+        return {'size': self.qsize(), 'maxsize': self.maxsize, 'policy': self.policy,
+                'dropped': self.dropped, 'conflated': self.conflated, 'spilled': self.spilled}
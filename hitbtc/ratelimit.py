@@ -0,0 +1,200 @@
+"""Client-side rate limiting of outbound requests, with priority lanes."""
+# Import Built-Ins
+import logging
+import time
+from collections import deque
+from threading import Condition, Thread
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+# Lanes in order of priority
+LANES = ('cancel', 'order', 'market', 'reference')
+
+METHOD_LANES = {'cancelOrder': 'cancel', 'login': 'cancel',
+                'newOrder': 'order', 'cancelReplaceOrder': 'order',
+                'getOrders': 'market', 'getTradingBalance': 'market', 'getTrades': 'market',
+                'subscribeTicker': 'market', 'subscribeOrderbook': 'market',
+                'subscribeTrades': 'market', 'subscribeCandles': 'market',
+                'subscribeReports': 'market', 'unsubscribeTicker': 'market',
+                'unsubscribeOrderbook': 'market', 'unsubscribeTrades': 'market',
+                'unsubscribeCandles': 'market'}
+
+
+def lane_of(method):
+    """Return the lane of the given JSONRPC method; unknown methods are reference requests."""
+    return METHOD_LANES.get(method, 'reference')
+
+
+class TokenBucket:
+    """Token bucket allowing ``rate`` operations per second, and bursts of up to ``burst``."""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated_at')
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+
+    def delay(self, now):
+        """Return the seconds until a token is available at ``now``; 0 if one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Consume a token; call only after delay() returned 0."""
+        self.tokens -= 1
+
+
+class LaneStats:
+    """Counters and queue wait times of a lane."""
+
+    __slots__ = ('sent', 'dropped', 'wait_total', 'wait_max')
+
+    def __init__(self):
+        self.sent = 0
+        self.dropped = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self, queued):
+        return {'queued': queued, 'sent': self.sent, 'dropped': self.dropped,
+                'wait_mean': self.wait_total / self.sent if self.sent else 0.0,
+                'wait_max': self.wait_max}
+
+
+class RequestScheduler:
+    """Bounded outbound queue drained by a sender thread, at most ``rate`` payloads per second.
+
+    Payloads are queued in one of the LANES; the sender always writes the oldest payload of the
+    highest-priority lane first, so cancels are never stuck behind bulk informational requests.
+    If the queue is full, a new payload replaces the oldest payload of a lower-priority lane, or
+    is dropped itself if there is none. Replaced payloads are reported to ``on_drop``.
+    """
+
+    def __init__(self, write, rate, burst=None, maxsize=None, on_drop=None):
+        """Initialize the instance.
+
+        :param write: callable writing a serialized payload to the connection
+        :param rate: payloads per second
+        :param burst: payloads which may be sent at once after a quiet period; defaults to
+                      ``rate``.
+        :param maxsize: maximum number of queued payloads; defaults to 1000.
+        :param on_drop: callable called with the request ID of each replaced payload
+        """
+        self.write = write
+        self.bucket = TokenBucket(rate, burst)
+        self.maxsize = maxsize or 1000
+        self.on_drop = on_drop
+        self.lanes = {lane: deque() for lane in LANES}
+        self.stats = {lane: LaneStats() for lane in LANES}
+        self._size = 0
+        self._cond = Condition()
+        self._thread = None
+        self._stopped = False
+
+    def __len__(self):
+        return self._size
+
+    def submit(self, method, payload, i_d=None):
+        """Queue a serialized payload for sending.
+
+        :param method: JSONRPC method of the payload, determining its lane
+        :param payload: str, serialized payload
+        :param i_d: request ID, passed to ``on_drop`` if the payload is replaced later on
+        :return: Bool, False if the payload was dropped because the queue is full
+        """
+        lane = lane_of(method)
+        accepted = True
+        evicted = None
+        with self._cond:
+            if self._size >= self.maxsize:
+                victim = next((lower for lower in reversed(LANES[LANES.index(lane) + 1:])
+                               if self.lanes[lower]), None)
+                if victim is None:
+                    accepted = False
+                    self.stats[lane].dropped += 1
+                else:
+                    evicted = self.lanes[victim].popleft()[1]
+                    self.stats[victim].dropped += 1
+                    self._size -= 1
+            if accepted:
+                self.lanes[lane].append((payload, i_d, time.monotonic()))
+                self._size += 1
+                self._cond.notify()
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopped = False
+                    self._thread = Thread(target=self._run, name='RequestScheduler',
+                                          daemon=True)
+                    self._thread.start()
+        if not accepted:
+            log.warning("Outbound queue full, dropping %s request %s", lane, i_d)
+        elif evicted is not None:
+            log.warning("Outbound queue full, dropping request %s in favour of %s request %s",
+                        evicted, lane, i_d)
+            if self.on_drop is not None:
+                self.on_drop(evicted)
+        return accepted
+
+    def _next(self):
+        """Pop and return the highest-priority item, with its lane."""
+        for lane in LANES:
+            if self.lanes[lane]:
+                self._size -= 1
+                return lane, self.lanes[lane].popleft()
+        return None, None
+
+    def _run(self):
+        """Send queued payloads, pausing whenever the token bucket is empty."""
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._size:
+                        self._cond.wait()
+                        continue
+                    delay = self.bucket.delay(time.monotonic())
+                    if not delay:
+                        break
+                    # A higher-priority payload may arrive meanwhile, so pick only afterwards
+                    self._cond.wait(delay)
+                if self._stopped:
+                    return
+                self.bucket.take()
+                lane, (payload, _, queued_at) = self._next()
+                stats = self.stats[lane]
+                wait = time.monotonic() - queued_at
+                stats.sent += 1
+                stats.wait_total += wait
+                if wait > stats.wait_max:
+                    stats.wait_max = wait
+            try:
+                self.write(payload)
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception("Failed to send payload %s: %s", payload, e)
+
+    def clear(self):
+        """Discard all queued payloads.
+
+        :return: list of the request IDs of the discarded payloads
+        """
+        with self._cond:
+            ids = [item[1] for lane in LANES for item in self.lanes[lane]]
+            for lane in LANES:
+                self.lanes[lane].clear()
+            self._size = 0
+        return ids
+
+    def stop(self):
+        """Stop the sender thread; queued payloads are kept."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def metrics(self):
+        """Return a dict of counters and wait times (seconds) per lane."""
+        with self._cond:
+            return {lane: self.stats[lane].as_dict(len(self.lanes[lane])) for lane in LANES}
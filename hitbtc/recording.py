@@ -0,0 +1,220 @@
+"""Recording of received websocket frames to a compact binary log.
+
+A recording starts with a 16-byte header - the magic ``b'HBTCREC\\x00'``, a format version and
+the compression used - followed by the frames. Each frame is stored as a 12-byte little-endian
+prefix holding its ``time.monotonic_ns()`` receive timestamp and its length, followed by the
+UTF-8 encoded frame.
+
+Uncompressed recordings are written frame by frame, and can be read straight from a memory map.
+Compressed recordings are written in blocks of frames, each prefixed by its compressed and raw
+length; 'zlib' is always available, 'zstd' and 'lz4' require the zstandard and lz4 packages.
+Recordings are append-only; a truncated tail, e.g. after a crash, is ignored when reading.
+
+Pass ``record=<path>`` to a connector to record its session, and replay it with
+:class:`hitbtc.connector.HitBTCReplayConnector`.
+"""
+# Import Built-Ins
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+
+# Import Third-Party
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.block
+except ImportError:
+    lz4 = None
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+MAGIC = b'HBTCREC\x00'
+VERSION = 1
+HEADER = struct.Struct('<8sBB6x')
+FRAME = struct.Struct('<qI')
+BLOCK = struct.Struct('<II')
+
+COMPRESSIONS = {None: 0, 'zlib': 1, 'zstd': 2, 'lz4': 3}
+
+
+def _codec(compression):
+    """Return the ``(compress, decompress)`` functions of the given compression.
+
+    :raises ValueError: if the compression is unknown
+    :raises ImportError: if the compression's package isn't installed
+    """
+    if compression == 'zlib':
+        return zlib.compress, lambda data, size: zlib.decompress(data, bufsize=size)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("Compression 'zstd' requires the zstandard package!")
+        compressor, decompressor = zstandard.ZstdCompressor(), zstandard.ZstdDecompressor()
+        return compressor.compress, lambda data, size: decompressor.decompress(
+            data, max_output_size=size)
+    if compression == 'lz4':
+        if lz4 is None:
+            raise ImportError("Compression 'lz4' requires the lz4 package!")
+        return (lambda data: lz4.block.compress(data, store_size=False),
+                lambda data, size: lz4.block.decompress(data, uncompressed_size=size))
+    raise ValueError("Unknown compression %r!" % compression)
+
+
+class FrameRecorder:
+    """Appends received frames with their receive timestamps to a recording.
+
+    The file is opened on the first frame written, so a recorder created before a connector
+    process forks writes from the child process only.
+    """
+
+    def __init__(self, path, compression=None, block_size=None):
+        """Initialize the instance.
+
+        :param path: path of the recording; frames are appended if it exists already
+        :param compression: None, 'zlib', 'zstd' or 'lz4'
+        :param block_size: bytes of frames compressed per block; defaults to 64 KiB.
+        :raises ValueError: if the compression is unknown
+        :raises ImportError: if the compression's package isn't installed
+        """
+        self.path = path
+        self.compression = compression
+        self.block_size = block_size or 65536
+        self.frames = 0
+        self._compress = _codec(compression)[0] if compression else None
+        self._block = bytearray()
+        self._file = None
+
+    def _open(self):
+        """Open the recording for appending, writing its header if it's new."""
+        self._file = open(self.path, 'ab')
+        if self._file.tell():
+            with open(self.path, 'rb') as f:
+                magic, _, compression = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or compression != COMPRESSIONS[self.compression]:
+                self._file.close()
+                self._file = None
+                raise ValueError("%s is not a recording with compression %r!" %
+                                 (self.path, self.compression))
+        else:
+            self._file.write(HEADER.pack(MAGIC, VERSION, COMPRESSIONS[self.compression]))
+
+    def write(self, frame, received_at=None):
+        """Append a frame.
+
+        :param frame: str or bytes, the frame as received
+        :param received_at: int, ``time.monotonic_ns()`` of its reception; defaults to now
+        """
+        if self._file is None:
+            self._open()
+        if isinstance(frame, str):
+            frame = frame.encode('utf-8')
+        if received_at is None:
+            received_at = time.monotonic_ns()
+        prefix = FRAME.pack(received_at, len(frame))
+        self.frames += 1
+        if self._compress is None:
+            self._file.write(prefix)
+            self._file.write(frame)
+            return
+        self._block += prefix
+        self._block += frame
+        if len(self._block) >= self.block_size:
+            self._write_block()
+
+    def _write_block(self):
+        """Compress and write the buffered frames."""
+        data = self._compress(bytes(self._block))
+        self._file.write(BLOCK.pack(len(data), len(self._block)))
+        self._file.write(data)
+        self._block.clear()
+
+    def flush(self):
+        """Write all buffered frames to the file."""
+        if self._file is None:
+            return
+        if self._block:
+            self._write_block()
+        self._file.flush()
+
+    def close(self):
+        """Flush and close the recording."""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+
+class FrameReader:
+    """Reads a recording via a memory map.
+
+    Iterating over the reader yields ``(received_at, frame)`` tuples, where ``received_at`` is
+    the frame's ``time.monotonic_ns()`` receive timestamp and ``frame`` a memoryview of the
+    UTF-8 encoded frame. Frames of uncompressed recordings are views of the memory map itself;
+    copy them if they are kept beyond the reader's lifetime.
+    """
+
+    def __init__(self, path):
+        """Initialize the instance.
+
+        :param path: path of the recording
+        :raises ValueError: if the file isn't a recording
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError("%s is not a recording!" % path)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, compression = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("%s is not a recording!" % path)
+        self.compression = {code: name for name, code in COMPRESSIONS.items()}[compression]
+        self._decompress = _codec(self.compression)[1] if self.compression else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        view = memoryview(self._map)
+        try:
+            if self._decompress is None:
+                yield from self._frames(view, HEADER.size)
+                return
+            offset, end = HEADER.size, len(view)
+            while offset + BLOCK.size <= end:
+                length, raw_length = BLOCK.unpack_from(view, offset)
+                offset += BLOCK.size
+                if offset + length > end:
+                    log.warning("Recording %s ends in a truncated block.", self.path)
+                    return
+                block = self._decompress(view[offset:offset + length], raw_length)
+                offset += length
+                yield from self._frames(memoryview(block), 0)
+        finally:
+            view.release()
+
+    def _frames(self, view, offset):
+        """Yield the frames of the given view, starting at ``offset``."""
+        end = len(view)
+        while offset + FRAME.size <= end:
+            received_at, length = FRAME.unpack_from(view, offset)
+            offset += FRAME.size
+            if offset + length > end:
+                log.warning("Recording %s ends in a truncated frame.", self.path)
+                return
+            yield received_at, view[offset:offset + length]
+            offset += length
+
+    def close(self):
+        """Close the memory map."""
+        self._map.close()
@@ -0,0 +1,217 @@
+"""Compact, typed representations of stream payloads.
+
+HitBTC sends prices and quantities as strings. In typed mode, book levels, trades and candles are
+converted to integer fixed-point values instead: prices are expressed in ticks (multiples of the
+symbol's ``tickSize``) and quantities in lots (multiples of its ``quantityIncrement``), as
+reported by ``getSymbols``. Use :meth:`Scale.to_price` and :meth:`Scale.to_quantity` to convert
+them back.
+
+Records are either ``__slots__`` objects (:class:`Level`, :class:`Trade`, :class:`Candle`) or, if
+numpy is installed, structured arrays of ``LEVEL_DTYPE``, ``TRADE_DTYPE`` and ``CANDLE_DTYPE``.
+"""
+# Import Built-Ins
+import logging
+
+# Import Third-Party
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+LEVEL_DTYPE = [('price', '<i8'), ('size', '<i8')]
+TRADE_DTYPE = [('id', '<i8'), ('price', '<i8'), ('quantity', '<i8'), ('side', 'i1'),
+               ('timestamp', '<M8[ms]')]
+CANDLE_DTYPE = [('timestamp', '<M8[ms]'), ('open', '<i8'), ('close', '<i8'), ('min', '<i8'),
+                ('max', '<i8'), ('volume', '<f8'), ('volume_quote', '<f8')]
+
+SIDES = {'buy': 1, 'sell': -1}
+
+
+class Scale:
+    """Fixed-point scale of a symbol, converting between strings, floats and integers."""
+
+    __slots__ = ('tick_size', 'quantity_increment')
+
+    def __init__(self, tick_size, quantity_increment):
+        """Initialize the instance.
+
+        :param tick_size: str or float, the symbol's ``tickSize``
+        :param quantity_increment: str or float, the symbol's ``quantityIncrement``
+        """
+        self.tick_size = float(tick_size)
+        self.quantity_increment = float(quantity_increment)
+
+    def __repr__(self):
+        return '<Scale tick=%r lot=%r>' % (self.tick_size, self.quantity_increment)
+
+    @classmethod
+    def from_symbol(cls, symbol):
+        """Create a scale from a ``getSymbols`` result item."""
+        return cls(symbol['tickSize'], symbol['quantityIncrement'])
+
+    def price(self, value):
+        """Return the given price (str or float) in ticks."""
+        return round(float(value) / self.tick_size)
+
+    def quantity(self, value):
+        """Return the given quantity (str or float) in lots."""
+        return round(float(value) / self.quantity_increment)
+
+    def to_price(self, ticks):
+        """Return the price of the given number of ticks as float."""
+        return ticks * self.tick_size
+
+    def to_quantity(self, lots):
+        """Return the quantity of the given number of lots as float."""
+        return lots * self.quantity_increment
+
+
+class _Record:
+    """Base class of typed records."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__,
+                           ', '.join('%s=%r' % (name, getattr(self, name))
+                                     for name in self.__slots__))
+
+    def __eq__(self, other):
+        return (type(other) is type(self) and
+                all(getattr(self, name) == getattr(other, name) for name in self.__slots__))
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+
+class Level(_Record):
+    """Order book level; ``price`` in ticks, ``size`` in lots."""
+
+    __slots__ = ('price', 'size')
+
+    def __init__(self, price, size):
+        self.price = price
+        self.size = size
+
+
+class Trade(_Record):
+    """Public trade; ``price`` in ticks, ``quantity`` in lots, ``side`` 1 (buy) or -1 (sell)."""
+
+    __slots__ = ('id', 'price', 'quantity', 'side', 'timestamp')
+
+    def __init__(self, id, price, quantity, side, timestamp):  # pylint: disable=redefined-builtin
+        self.id = id
+        self.price = price
+        self.quantity = quantity
+        self.side = side
+        self.timestamp = timestamp
+
+
+class Candle(_Record):
+    """Candle; prices in ticks, volumes as floats."""
+
+    __slots__ = ('timestamp', 'open', 'close', 'min', 'max', 'volume', 'volume_quote')
+
+    # pylint: disable=redefined-builtin
+    def __init__(self, timestamp, open, close, min, max, volume, volume_quote):
+        self.timestamp = timestamp
+        self.open = open
+        self.close = close
+        self.min = min
+        self.max = max
+        self.volume = volume
+        self.volume_quote = volume_quote
+
+
+def _timestamp(value):
+    """Strip the UTC designator numpy refuses to parse."""
+    return value[:-1] if value.endswith('Z') else value
+
+
+class TypedConverter:
+    """Converts book, trade and candle params to typed records.
+
+    Converted params are shallow copies of the original params, whose ``bid``/``ask`` (books) or
+    ``data`` (trades, candles) items are replaced by records. Params of symbols without a known
+    scale, and of all other methods, are returned unchanged.
+    """
+
+    def __init__(self, use_numpy=False, scales=None):
+        """Initialize the instance.
+
+        :param use_numpy: Bool, whether or not to emit numpy structured arrays instead of lists
+                          of records
+        :param scales: dict of symbol to :class:`Scale`, e.g. ``SymbolRegistry.scales``
+        :raises ImportError: if ``use_numpy`` is True, but numpy isn't installed
+        """
+        if use_numpy and numpy is None:
+            raise ImportError("Typed mode 'numpy' requires the numpy package!")
+        self.use_numpy = use_numpy
+        self.scales = scales if scales is not None else {}
+        self._unknown = set()
+
+    def update(self, symbols):
+        """Add or update the scales of the given ``getSymbols`` result items."""
+        for symbol in symbols:
+            self.scales[symbol['id']] = Scale.from_symbol(symbol)
+            self._unknown.discard(symbol['id'])
+
+    def convert(self, method, symbol, params):
+        """Return typed params for the given stream data."""
+        if method in ('snapshotOrderbook', 'updateOrderbook'):
+            convert = self._levels
+            keys = ('bid', 'ask')
+        elif method in ('snapshotTrades', 'updateTrades'):
+            convert = self._trades
+            keys = ('data',)
+        elif method in ('snapshotCandles', 'updateCandles'):
+            convert = self._candles
+            keys = ('data',)
+        else:
+            return params
+
+        try:
+            scale = self.scales[symbol]
+        except KeyError:
+            if symbol not in self._unknown:
+                self._unknown.add(symbol)
+                log.warning("No tick size known for %s, passing its data on untyped - "
+                            "request the symbols first.", symbol)
+            return params
+
+        typed = dict(params)
+        for key in keys:
+            if key in params:
+                typed[key] = convert(scale, params[key])
+        return typed
+
+    def _levels(self, scale, levels):
+        price, quantity = scale.price, scale.quantity
+        if self.use_numpy:
+            return numpy.array([(price(level['price']), quantity(level['size']))
+                                for level in levels], dtype=LEVEL_DTYPE)
+        return [Level(price(level['price']), quantity(level['size'])) for level in levels]
+
+    def _trades(self, scale, trades):
+        price, quantity = scale.price, scale.quantity
+        if self.use_numpy:
+            return numpy.array([(trade['id'], price(trade['price']), quantity(trade['quantity']),
+                                 SIDES.get(trade['side'], 0), _timestamp(trade['timestamp']))
+                                for trade in trades], dtype=TRADE_DTYPE)
+        return [Trade(trade['id'], price(trade['price']), quantity(trade['quantity']),
+                      SIDES.get(trade['side'], 0), trade['timestamp']) for trade in trades]
+
+    def _candles(self, scale, candles):
+        price = scale.price
+        if self.use_numpy:
+            return numpy.array([(_timestamp(candle['timestamp']), price(candle['open']),
+                                 price(candle['close']), price(candle['min']),
+                                 price(candle['max']), float(candle['volume']),
+                                 float(candle['volumeQuote']))
+                                for candle in candles], dtype=CANDLE_DTYPE)
+        return [Candle(candle['timestamp'], price(candle['open']), price(candle['close']),
+                       price(candle['min']), price(candle['max']), float(candle['volume']),
+                       float(candle['volumeQuote'])) for candle in candles]
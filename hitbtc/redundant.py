@@ -0,0 +1,292 @@
+"""Hot-standby redundant connections, merged into a single deduplicated stream."""
+# Import Built-Ins
+import itertools
+import logging
+from collections import OrderedDict
+from threading import Lock
+
+# Import Homebrew
+from hitbtc.client import HitBTC
+from hitbtc.pending import first
+from hitbtc.wss import WebSocketConnectorProcess
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+def _field(item, name):
+    """Return a field of a dict, numpy record or typed record."""
+    try:
+        return item[name]
+    except TypeError:
+        return getattr(item, name)
+
+
+class StreamDeduplicator:
+    """Passes on the first copy of each stream item received via any of several connections.
+
+    Connections hand every item to :meth:`admit` before delivering it. Items are identified by
+    their ``sequence`` (order books), trade ``id`` (trades), ``timestamp`` (tickers), candle
+    contents and report contents; copies of items already delivered, as well as items older than
+    them, are discarded. Responses are deduplicated if their request ID was registered via
+    :meth:`expect`, i.e. if the same request was sent via each connection.
+    """
+
+    def __init__(self, maxsize=None):
+        """Initialize the instance.
+
+        :param maxsize: number of report and response keys to remember; defaults to 10000.
+        """
+        self.maxsize = maxsize or 10000
+        self._connections = {}
+        self._sequences = {}
+        self._trades = {}
+        self._tickers = {}
+        self._candles = {}
+        self._reports = OrderedDict()
+        self._expected = OrderedDict()
+        self._delivered = []
+        self.duplicates = 0
+        self._lock = Lock()
+
+    def register(self, conn):
+        """Register a connection, and return its index."""
+        with self._lock:
+            self._delivered.append(0)
+            self._connections[id(conn)] = len(self._delivered) - 1
+            return self._connections[id(conn)]
+
+    def expect(self, i_d):
+        """Register the ID of a request sent via all connections, delivering one response."""
+        with self._lock:
+            self._remember(self._expected, i_d, False)
+
+    def admit(self, conn, method, symbol, params):
+        """Return the params to deliver, or None if the item is a duplicate.
+
+        Trade updates may be partially new, in which case a copy of ``params`` holding only the
+        new trades is returned.
+        """
+        with self._lock:
+            if method in ('snapshotOrderbook', 'updateOrderbook'):
+                admitted = self._newer(self._sequences, symbol, params.get('sequence'))
+            elif method in ('snapshotTrades', 'updateTrades'):
+                params = self._new_trades(symbol, params)
+                admitted = params is not None
+            elif method == 'ticker':
+                admitted = self._newer(self._tickers, symbol, params.get('timestamp'))
+            elif method in ('snapshotCandles', 'updateCandles'):
+                admitted = self._new_candle(symbol, params)
+            elif method == 'report':
+                admitted = self._remember(self._reports, tuple(
+                    params.get(key) for key in ('clientOrderId', 'reportType', 'status',
+                                                'cumQuantity', 'updatedAt')), True)
+            elif method == 'Response':
+                i_d = params[0].get('id')
+                admitted = i_d not in self._expected or not self._expected[i_d]
+                if i_d in self._expected:
+                    self._expected[i_d] = True
+            else:
+                admitted = True
+            if admitted:
+                self._delivered[self._connections[id(conn)]] += 1
+                return params
+            self.duplicates += 1
+            return None
+
+    def _remember(self, keys, key, value):
+        """Add ``key`` to the bounded ``keys``; return False if it was present already."""
+        if key in keys:
+            return False
+        keys[key] = value
+        while len(keys) > self.maxsize:
+            keys.popitem(last=False)
+        return True
+
+    @staticmethod
+    def _newer(last, symbol, value):
+        """Return whether ``value`` is newer than the last one delivered for ``symbol``."""
+        if value is None:
+            return True
+        previous = last.get(symbol)
+        if previous is not None and value <= previous:
+            return False
+        last[symbol] = value
+        return True
+
+    def _new_trades(self, symbol, params):
+        """Return the params holding only the trades not delivered yet, or None."""
+        trades = params.get('data', ())
+        if not len(trades):
+            return params
+        last_id = self._trades.get(symbol)
+        self._trades[symbol] = max(last_id or 0, _field(trades[-1], 'id'))
+        if last_id is None or _field(trades[0], 'id') > last_id:
+            return params
+        if _field(trades[-1], 'id') <= last_id:
+            return None
+        params = dict(params)
+        if hasattr(trades, 'dtype'):
+            params['data'] = trades[trades['id'] > last_id]
+        else:
+            params['data'] = [trade for trade in trades if _field(trade, 'id') > last_id]
+        return params
+
+    def _new_candle(self, symbol, params):
+        """Return whether the last candle of ``params`` has not been delivered yet.
+
+        The current candle is updated in place, so all versions of it seen are remembered until
+        the next one starts.
+        """
+        candles = params.get('data', ())
+        if not len(candles):
+            return True
+        key = symbol, params.get('period')
+        candle = candles[-1]
+        timestamp = _field(candle, 'timestamp')
+        version = tuple(_field(candle, name) for name in ('close', 'min', 'max', 'volume'))
+        last_timestamp, versions = self._candles.get(key, (None, None))
+        if last_timestamp is not None:
+            if timestamp < last_timestamp or (timestamp == last_timestamp and
+                                              version in versions):
+                return False
+            if timestamp == last_timestamp:
+                versions.add(version)
+                return True
+        self._candles[key] = (timestamp, {version})
+        return True
+
+    def stats(self):
+        """Return the number of items delivered per connection, and of duplicates discarded."""
+        with self._lock:
+            return {'delivered': list(self._delivered), 'duplicates': self.duplicates}
+
+
+class HitBTCRedundant:
+    """Keeps several connections subscribed to the same channels, merging their streams.
+
+    Each ``subscribe_*`` call is sent via every connection. All connections share a single
+    queue, and a :class:`StreamDeduplicator` passes on whichever copy of an item arrives first,
+    so a blip on one connection causes no gap, and receive latency is that of the fastest path.
+    Subscription responses are delivered once; their futures resolve with the first success.
+
+    Requests and orders are sent via the first connected client, the primary by default, so
+    they fail over instantly as well. ``login()`` logs in all connections, and
+    ``subscribe_reports()`` subscribes all of them; their login responses are delivered once
+    per connection.
+
+    Only thread-based connections are supported, since the deduplicator's state lives in this
+    process.
+    """
+
+    def __init__(self, connections=2, key=None, secret=None, client_cls=None, **client_ops):
+        """Initialize the instance.
+
+        :param connections: number of connections to open
+        :param key: API Public Key
+        :param secret: API Secret Key
+        :param client_cls: client class to instantiate per connection; defaults to HitBTC
+        :param client_ops: kwargs passed to each client on instantiation
+        :raises ValueError: if the clients' connections are process-based
+        """
+        client_cls = client_cls or HitBTC
+        self.clients = [client_cls(key, secret, **client_ops) for _ in range(connections)]
+        if any(isinstance(client.conn, WebSocketConnectorProcess) for client in self.clients):
+            raise ValueError("Redundant connections must be thread-based!")
+        self.dedup = StreamDeduplicator()
+        for client in self.clients:
+            self.dedup.register(client.conn)
+            client.conn.dedup = self.dedup
+            client.conn.q = self.clients[0].conn.q
+        self._ids = itertools.count(1)
+
+    @property
+    def primary(self):
+        """The client preferred for requests and orders."""
+        return self.clients[0]
+
+    @property
+    def active(self):
+        """The first connected client, or the primary if none is connected."""
+        return next((client for client in self.clients if client.is_connected()), self.primary)
+
+    def start(self):
+        """Start all connections."""
+        for client in self.clients:
+            client.start()
+
+    def stop(self):
+        """Stop all connections."""
+        for client in self.clients:
+            client.stop()
+
+    def is_connected(self):
+        """Return whether or not any connection is established."""
+        return any(client.is_connected() for client in self.clients)
+
+    def recv(self, block=True, timeout=None):
+        """Retrieve data from the merged queue."""
+        return self.primary.recv(block, timeout)
+
+    def stats(self):
+        """Return the number of items delivered first per connection, and of duplicates."""
+        return self.dedup.stats()
+
+    def order_book(self, symbol):
+        """Return the most recent local order book of ``symbol`` of any connection, or None."""
+        books = [book for book in (client.order_book(symbol) for client in self.clients)
+                 if book is not None and book.sequence is not None]
+        return max(books, key=lambda book: book.sequence, default=None)
+
+    def latest_ticker(self, symbol):
+        """Return the latest ticker of ``symbol``, or None."""
+        return self.active.latest_ticker(symbol)
+
+    def latest_top(self, symbol):
+        """Return the latest top of book of ``symbol``, or None."""
+        return self.active.latest_top(symbol)
+
+    def login(self, key=None, secret=None, basic=None, custom_nonce=None):
+        """Login all connections; return the future of the active one's login."""
+        futures = [client.login(key, secret, basic, custom_nonce) for client in self.clients]
+        return futures[self.clients.index(self.active)]
+
+    def subscribe_reports(self, cancel=False, custom_id=None, **params):
+        """Subscribe to reports via all connections."""
+        return self._subscribe('subscribe_reports', cancel, custom_id, params)
+
+    def subscribe_ticker(self, cancel=False, custom_id=None, **params):
+        """Subscribe to ticker data via all connections."""
+        return self._subscribe('subscribe_ticker', cancel, custom_id, params)
+
+    def subscribe_book(self, cancel=False, custom_id=None, **params):
+        """Subscribe to order book data via all connections."""
+        return self._subscribe('subscribe_book', cancel, custom_id, params)
+
+    def subscribe_trades(self, cancel=False, custom_id=None, **params):
+        """Subscribe to trade data via all connections."""
+        return self._subscribe('subscribe_trades', cancel, custom_id, params)
+
+    def subscribe_candles(self, cancel=False, custom_id=None, **params):
+        """Subscribe to candle data via all connections."""
+        return self._subscribe('subscribe_candles', cancel, custom_id, params)
+
+    def __getattr__(self, name):
+        # Delegate request_*, place_order etc. to the active connection
+        if name.startswith(('request_', 'place_', 'cancel_', 'replace_')):
+            return getattr(self.active, name)
+        raise AttributeError(name)
+
+    def _subscribe(self, name, cancel, custom_id, params):
+        """Send the subscription via all connections, sharing a single request ID.
+
+        :return: a future resolved with the first successful response, or None if no
+                 connection is established
+        """
+        i_d = custom_id or 'redundant-%d' % next(self._ids)
+        self.dedup.expect(i_d)
+        futures = [getattr(client, name)(cancel, i_d, **params) for client in self.clients]
+        futures = [future for future in futures if future is not None]
+        if not futures:
+            return None
+        return first(futures, self.primary.conn._create_future())
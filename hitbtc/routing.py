@@ -0,0 +1,215 @@
+"""Routing of stream frames by method and symbol, before they are fully decoded."""
+# Import Built-Ins
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+# Stream methods whose params are a list, and therefore carry no single symbol
+SYMBOL_LESS_METHODS = {'activeOrders'}
+
+# Methods delivered on each channel. Responses are delivered with the method 'Response' and
+# the symbol 'Success' or 'Failure', matching the items placed on the queue.
+CHANNELS = {'ticker': ('ticker',),
+            'orderbook': ('snapshotOrderbook', 'updateOrderbook'),
+            'trades': ('snapshotTrades', 'updateTrades'),
+            'candles': ('snapshotCandles', 'updateCandles'),
+            'reports': ('activeOrders', 'report'),
+            'responses': ('Response',)}
+
+
+def _extract(frame, key, start=0):
+    """Return the str value following ``key`` in ``frame``, or None."""
+    i = frame.find(key, start)
+    if i == -1:
+        return None
+    i += len(key)
+    j = frame.find(b'"' if isinstance(frame, bytes) else '"', i)
+    if j == -1:
+        return None
+    value = frame[i:j]
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def peek(frame):
+    """Cheaply extract ``method`` and ``params.symbol`` from a raw, compact JSON frame.
+
+    This is a plain substring search - it does not validate the frame. Frames it cannot make
+    sense of (e.g. responses, which carry no method) return ``(None, None)``.
+
+    :param frame: str or bytes-like JSON frame
+    :return: tuple of (method, symbol); symbol is None for methods without a symbol
+    """
+    if isinstance(frame, str):
+        method_key, symbol_key = '"method":"', '"symbol":"'
+    else:
+        if not isinstance(frame, bytes):
+            frame = bytes(frame)
+        method_key, symbol_key = b'"method":"', b'"symbol":"'
+    method = _extract(frame, method_key)
+    if method is None or method in SYMBOL_LESS_METHODS:
+        return method, None
+    return method, _extract(frame, symbol_key)
+
+
+def _discard(method, symbol, params):
+    """Handler discarding all data passed to it."""
+
+
+class Offloaded:
+    """Wraps a handler, so that it is submitted to an executor instead of being called."""
+
+    __slots__ = ('handler', 'executor')
+
+    def __init__(self, handler, executor):
+        self.handler = handler
+        self.executor = executor
+
+    def __call__(self, *args):
+        self.executor.submit(self.handler, *args).add_done_callback(self._log_exception)
+
+    def __eq__(self, other):
+        return self.handler == getattr(other, 'handler', other)
+
+    def __hash__(self):
+        return hash(self.handler)
+
+    def _log_exception(self, future):
+        exception = future.exception()
+        if exception is not None:
+            log.error("Handler %r failed: %r", self.handler, exception)
+
+
+class Router:
+    """Routes stream data to handlers registered by (method, symbol).
+
+    A ``None`` method or symbol acts as a wildcard. Frames matching a blocked (method, symbol)
+    pair are discarded without being decoded. Frames with at least one handler are passed to
+    their handlers instead of being placed on the connector's queue; all other frames are
+    queued, unless ``queue_unrouted`` is False, in which case they are discarded undecoded, too.
+
+    Handlers are called as ``handler(method, symbol, params)`` on the receiving thread, unless
+    they were registered with ``offload=True``, in which case they are run by a pool of
+    ``workers`` threads. Note that offloaded handlers may be called out of order.
+    """
+
+    def __init__(self, queue_unrouted=True, workers=None):
+        """Initialize the instance.
+
+        :param queue_unrouted: Bool, whether or not to queue frames without handlers
+        :param workers: number of threads running offloaded handlers; defaults to 4.
+        """
+        self._handlers = {}
+        self._blocked = set()
+        self._cache = {}
+        self._queue_unrouted = queue_unrouted
+        self.workers = workers or 4
+        self._executor = None
+
+    @property
+    def active(self):
+        """Whether or not any routing rules are in place."""
+        return bool(self._handlers or self._blocked or not self._queue_unrouted)
+
+    @property
+    def queue_unrouted(self):
+        """Whether or not frames without handlers are placed on the queue."""
+        return self._queue_unrouted
+
+    @queue_unrouted.setter
+    def queue_unrouted(self, value):
+        self._queue_unrouted = value
+        self._cache.clear()
+
+    def add_handler(self, handler, method=None, symbol=None, offload=False):
+        """Register ``handler`` for stream data matching method and symbol.
+
+        :param offload: Bool, whether or not to run the handler in the worker pool
+        """
+        if offload:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers,
+                                                    thread_name_prefix='HandlerWorker')
+            handler = Offloaded(handler, self._executor)
+        self._handlers.setdefault((method, symbol), []).append(handler)
+        self._cache.clear()
+
+    def add_channel_handler(self, channel, handler, symbol=None, offload=False):
+        """Register ``handler`` for all methods of the given channel (see CHANNELS)."""
+        try:
+            methods = CHANNELS[channel]
+        except KeyError:
+            raise ValueError("Unknown channel %r! Choose one of %s" %
+                             (channel, ', '.join(CHANNELS)))
+        for method in methods:
+            self.add_handler(handler, method, symbol, offload)
+
+    def remove_channel_handler(self, channel, handler, symbol=None):
+        """Unregister a handler previously registered via add_channel_handler()."""
+        for method in CHANNELS.get(channel, ()):
+            self.remove_handler(handler, method, symbol)
+
+    def remove_handler(self, handler, method=None, symbol=None):
+        """Unregister a handler previously registered via add_handler()."""
+        handlers = self._handlers.get((method, symbol), [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self._handlers.pop((method, symbol), None)
+        self._cache.clear()
+
+    def mute(self, method=None, symbol=None):
+        """Decode and process stream data matching method and symbol, but don't deliver it.
+
+        Muted data still updates the connector's books and caches, but isn't placed on the queue.
+        """
+        self.add_handler(_discard, method, symbol)
+
+    def unmute(self, method=None, symbol=None):
+        """Remove a rule previously added via mute()."""
+        self.remove_handler(_discard, method, symbol)
+
+    def block(self, method=None, symbol=None):
+        """Discard stream data matching method and symbol, without decoding it."""
+        self._blocked.add((method, symbol))
+        self._cache.clear()
+
+    def unblock(self, method=None, symbol=None):
+        """Remove a rule previously added via block()."""
+        self._blocked.discard((method, symbol))
+        self._cache.clear()
+
+    def lookup(self, method, symbol):
+        """Return the handlers for the given method and symbol.
+
+        :return: tuple of handlers - empty if data should be queued - or None, if the data
+                 should be discarded
+        """
+        try:
+            return self._cache[(method, symbol)]
+        except KeyError:
+            pass
+        keys = ((method, symbol), (method, None), (None, symbol), (None, None))
+        if any(key in self._blocked for key in keys):
+            handlers = None
+        else:
+            handlers = tuple(handler for key in keys for handler in self._handlers.get(key, ()))
+            if not handlers and not self._queue_unrouted:
+                handlers = None
+        self._cache[(method, symbol)] = handlers
+        return handlers
+
+    def dispatch(self, handlers, method, symbol, params):
+        """Call the given handlers, logging any exceptions they raise."""
+        for handler in handlers:
+            try:
+                handler(method, symbol, params)
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception("Handler %r failed on %s %s: %s", handler, method, symbol, e)
+
+    def shutdown(self):
+        """Shut the worker pool down, if it was started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,388 @@
+"""Shared memory structures used to pass data between processes without pickling."""
+# Import Built-Ins
+import logging
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class SharedRingBuffer:
+    """Single-producer, single-consumer ring buffer of byte records in shared memory.
+
+    Layout: a 64 byte header holding the total number of bytes written and read so far (two
+    unsigned 64 bit integers), followed by the data area. Records are stored as a 4 byte length
+    prefix and the payload, padded to a multiple of 4 bytes. A record which doesn't fit in the
+    remainder of the data area is preceded by a wrap marker, and written to its start instead.
+
+    The producer only ever advances the write counter, the consumer only the read counter, so no
+    lock is required.
+    """
+
+    HEADER = 64
+    WRAP = 0xFFFFFFFF
+
+    def __init__(self, shm, owner=False):
+        """Initialize the instance; use create() or attach() instead."""
+        self.shm = shm
+        self.owner = owner
+        self.buf = shm.buf
+        self.capacity = shm.size - self.HEADER
+        self.capacity -= self.capacity % 4
+
+    @classmethod
+    def create(cls, size=None, name=None):
+        """Create a new ring buffer.
+
+        :param size: size of the data area in bytes; defaults to 8 MiB.
+        :param name: name of the shared memory block; defaults to a random name.
+        """
+        size = size or 8 * 1024 * 1024
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size + cls.HEADER)
+        shm.buf[:cls.HEADER] = bytes(cls.HEADER)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to an existing ring buffer by name."""
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        """Name of the shared memory block."""
+        return self.shm.name
+
+    def __getstate__(self):
+        return {'name': self.shm.name, 'owner': False}
+
+    def __setstate__(self, state):
+        self.__init__(shared_memory.SharedMemory(name=state['name']), state['owner'])
+
+    def __len__(self):
+        """Return the number of bytes currently buffered."""
+        written, read = struct.unpack_from('<QQ', self.buf, 0)
+        return written - read
+
+    def put(self, data):
+        """Append a record.
+
+        :param data: bytes-like payload
+        :return: Bool, False if there wasn't enough free space and the record was discarded
+        """
+        buf, capacity = self.buf, self.capacity
+        written, read = struct.unpack_from('<QQ', buf, 0)
+        length = len(data)
+        size = 4 + length + (-length % 4)
+        offset = written % capacity
+        skip = capacity - offset if capacity - offset < size else 0
+        if skip + size > capacity - (written - read):
+            return False
+        if skip:
+            struct.pack_into('<I', buf, self.HEADER + offset, self.WRAP)
+            written += skip
+            offset = 0
+        start = self.HEADER + offset
+        buf[start + 4:start + 4 + length] = data
+        struct.pack_into('<I', buf, start, length)
+        # Publish the record only once it's completely written
+        struct.pack_into('<Q', buf, 0, written + size)
+        return True
+
+    def get(self):
+        """Remove and return the oldest record as bytes, or None if the buffer is empty."""
+        buf, capacity = self.buf, self.capacity
+        written, read = struct.unpack_from('<QQ', buf, 0)
+        if read == written:
+            return None
+        offset = read % capacity
+        length, = struct.unpack_from('<I', buf, self.HEADER + offset)
+        if length == self.WRAP:
+            read += capacity - offset
+            offset = 0
+            length, = struct.unpack_from('<I', buf, self.HEADER)
+        start = self.HEADER + offset + 4
+        data = bytes(buf[start:start + length])
+        struct.pack_into('<Q', buf, 8, read + 4 + length + (-length % 4))
+        return data
+
+    def close(self):
+        """Detach from the shared memory block, and unlink it if we created it."""
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _open_untracked(name=None, create=False, size=0):
+    """Open a shared memory block which the resource tracker won't unlink when we exit.
+
+    Readers in other processes must not take the block down with them; the publisher unlinks
+    it explicitly instead, see _unlink_untracked().
+    """
+    try:
+        return shared_memory.SharedMemory(name, create, size, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the block with the resource tracker
+        shm = shared_memory.SharedMemory(name, create, size)
+        resource_tracker.unregister(shm._name, 'shared_memory')  # pylint: disable=protected-access
+        return shm
+
+
+def _unlink_untracked(shm):
+    """Unlink a block opened via _open_untracked()."""
+    if not hasattr(shm, '_track'):
+        # SharedMemory.unlink() unregisters the block on Python < 3.13
+        resource_tracker.register(shm._name, 'shared_memory')  # pylint: disable=protected-access
+    shm.unlink()
+
+
+class SharedBookLayout:
+    """Fixed memory layout of order books published via shared memory.
+
+    Header (64 bytes): magic, version, max_symbols, depth and number of used slots, as unsigned
+    32 bit integers. It is followed by ``max_symbols`` slots, each made up of a 64 byte slot
+    header - seqlock counter (u64), book sequence (i64), wall clock time of the last update
+    (f64), number of bid and ask levels (u32 each) and the symbol (32 bytes, utf-8) - and four
+    float64 arrays of ``depth`` items: bid prices, bid sizes, ask prices and ask sizes.
+    """
+
+    MAGIC = 0x4B4F4248
+    VERSION = 1
+    HEADER = struct.Struct('<IIIII')
+    HEADER_SIZE = 64
+    SLOT_HEADER = struct.Struct('<QqdII32s')
+    SLOT_HEADER_SIZE = 64
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.buf = shm.buf
+        magic, version, self.max_symbols, self.depth, _ = self.HEADER.unpack_from(self.buf, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("Shared memory block %r holds no published books!" % shm.name)
+        self.slot_size = self.SLOT_HEADER_SIZE + 4 * 8 * self.depth
+
+    @classmethod
+    def size(cls, max_symbols, depth):
+        """Return the number of bytes required for the given dimensions."""
+        return cls.HEADER_SIZE + max_symbols * (cls.SLOT_HEADER_SIZE + 4 * 8 * depth)
+
+    @property
+    def name(self):
+        """Name of the shared memory block."""
+        return self.shm.name
+
+    @property
+    def n_symbols(self):
+        """Number of slots in use."""
+        return self.HEADER.unpack_from(self.buf, 0)[4]
+
+    def offset(self, slot):
+        """Return the offset of the given slot."""
+        return self.HEADER_SIZE + slot * self.slot_size
+
+    def array_offset(self, slot, array):
+        """Return the offset of an array of the given slot (0: bid prices, 1: bid sizes,
+        2: ask prices, 3: ask sizes)."""
+        return self.offset(slot) + self.SLOT_HEADER_SIZE + array * 8 * self.depth
+
+
+class SharedBookPublisher(SharedBookLayout):
+    """Publishes the top ``depth`` levels of local order books into shared memory.
+
+    Every slot is guarded by a seqlock: its counter is odd while the slot is being written, and
+    incremented again once the write is complete, so readers can detect torn reads without any
+    locking. Only a single process may publish into a block.
+    """
+
+    def __init__(self, name=None, max_symbols=None, depth=None):
+        """Create the shared memory block.
+
+        :param name: name of the shared memory block; defaults to a random name.
+        :param max_symbols: maximum number of symbols to publish; defaults to 64.
+        :param depth: number of levels published per side; defaults to 20.
+        """
+        max_symbols = max_symbols or 64
+        depth = depth or 20
+        shm = _open_untracked(name, create=True, size=self.size(max_symbols, depth))
+        shm.buf[:self.HEADER_SIZE] = bytes(self.HEADER_SIZE)
+        self.HEADER.pack_into(shm.buf, 0, self.MAGIC, self.VERSION, max_symbols, depth, 0)
+        super(SharedBookPublisher, self).__init__(shm)
+        self.slots = {}
+        self._structs = {}
+        self._owner_pid = os.getpid()
+
+    def _slot(self, symbol):
+        """Return the slot of ``symbol``, allocating one if necessary, or None if full."""
+        try:
+            return self.slots[symbol]
+        except KeyError:
+            pass
+        slot = len(self.slots)
+        if slot >= self.max_symbols:
+            log.warning("Cannot publish %s - all %s slots are taken!", symbol, self.max_symbols)
+            self.slots[symbol] = None
+            return None
+        self.SLOT_HEADER.pack_into(self.buf, self.offset(slot), 0, -1, 0.0, 0, 0,
+                                   symbol.encode('utf-8'))
+        self.slots[symbol] = slot
+        self.HEADER.pack_into(self.buf, 0, self.MAGIC, self.VERSION, self.max_symbols,
+                              self.depth, slot + 1)
+        return slot
+
+    def _pack(self, offset, values):
+        """Write the given floats at offset."""
+        n = len(values)
+        try:
+            packer = self._structs[n]
+        except KeyError:
+            packer = self._structs[n] = struct.Struct('<%dd' % n)
+        packer.pack_into(self.buf, offset, *values)
+
+    def publish(self, book):
+        """Write the top levels of the given hitbtc.book.OrderBook into its slot."""
+        slot = self._slot(book.symbol)
+        if slot is None:
+            return
+        depth, buf, offset = self.depth, self.buf, self.offset(slot)
+        counter, = struct.unpack_from('<Q', buf, offset)
+        struct.pack_into('<Q', buf, offset, counter + 1)
+
+        bids, asks = book.bids, book.asks
+        n_bids, n_asks = min(depth, len(bids)), min(depth, len(asks))
+        self._pack(self.array_offset(slot, 0), [-key for key in bids.keys[:n_bids]])
+        self._pack(self.array_offset(slot, 1), bids.sizes[:n_bids])
+        self._pack(self.array_offset(slot, 2), asks.keys[:n_asks])
+        self._pack(self.array_offset(slot, 3), asks.sizes[:n_asks])
+        struct.pack_into('<qdII', buf, offset + 8, book.sequence if book.sequence is not None
+                         else -1, time.time(), n_bids, n_asks)
+
+        struct.pack_into('<Q', buf, offset, counter + 2)
+
+    def clear(self, symbol):
+        """Publish an empty book for ``symbol``, e.g. while it is being resynchronized."""
+        slot = self.slots.get(symbol)
+        if slot is None:
+            return
+        offset = self.offset(slot)
+        counter, = struct.unpack_from('<Q', self.buf, offset)
+        struct.pack_into('<Q', self.buf, offset, counter + 1)
+        struct.pack_into('<qdII', self.buf, offset + 8, -1, time.time(), 0, 0)
+        struct.pack_into('<Q', self.buf, offset, counter + 2)
+
+    def close(self):
+        """Release the shared memory block, and unlink it if called by the creating process."""
+        if self.buf is None:
+            return
+        self.buf = None
+        self.shm.close()
+        if os.getpid() == self._owner_pid:
+            _unlink_untracked(self.shm)
+
+
+class SharedBookReader(SharedBookLayout):
+    """Reads order books published by a SharedBookPublisher, from any process.
+
+    Reads are lock-free: they are retried if the publisher updated the slot meanwhile, up to
+    ``READ_RETRIES`` times.
+    """
+
+    READ_RETRIES = 10000
+
+    def __init__(self, name):
+        """Attach to the published books.
+
+        :param name: name of the shared memory block, see SharedBookPublisher.name
+        """
+        super(SharedBookReader, self).__init__(_open_untracked(name))
+        self._slots = {}
+
+    def symbols(self):
+        """Return the list of published symbols."""
+        self._scan()
+        return list(self._slots)
+
+    def _scan(self):
+        """Index slots allocated since the last scan."""
+        for slot in range(len(self._slots), self.n_symbols):
+            raw = self.SLOT_HEADER.unpack_from(self.buf, self.offset(slot))[5]
+            self._slots[raw.rstrip(b'\0').decode('utf-8')] = slot
+
+    def slot(self, symbol):
+        """Return the slot index of ``symbol``, or None if it isn't published."""
+        if symbol not in self._slots:
+            self._scan()
+        return self._slots.get(symbol)
+
+    def top(self, symbol, n=None):
+        """Return the best ``n`` levels of ``symbol`` as ``(bids, asks, sequence)``.
+
+        ``bids`` and ``asks`` are lists of ``(price, size)`` tuples; ``sequence`` is the
+        book's sequence number, or -1 if the book isn't synchronized. Returns None if the
+        symbol isn't published.
+
+        :raises RuntimeError: if no consistent read succeeded within ``READ_RETRIES`` attempts,
+                              e.g. because the publisher died while writing the slot
+        """
+        slot = self.slot(symbol)
+        if slot is None:
+            return None
+        n = min(n or self.depth, self.depth)
+        buf, offset = self.buf, self.offset(slot)
+        levels = struct.Struct('<%dd' % n)
+        for _ in range(self.READ_RETRIES):
+            before, sequence, _, n_bids, n_asks = struct.unpack_from('<QqdII', buf, offset)
+            if not before % 2:
+                bid_prices = levels.unpack_from(buf, self.array_offset(slot, 0))
+                bid_sizes = levels.unpack_from(buf, self.array_offset(slot, 1))
+                ask_prices = levels.unpack_from(buf, self.array_offset(slot, 2))
+                ask_sizes = levels.unpack_from(buf, self.array_offset(slot, 3))
+                after, = struct.unpack_from('<Q', buf, offset)
+                if before == after:
+                    break
+            # Let the publisher finish its write
+            time.sleep(0)
+        else:
+            raise RuntimeError("Slot of %s is still being written after %s reads - its "
+                               "publisher may have died mid-write!" % (symbol, self.READ_RETRIES))
+        return (list(zip(bid_prices[:n_bids], bid_sizes[:n_bids])),
+                list(zip(ask_prices[:n_asks], ask_sizes[:n_asks])), sequence)
+
+    def best(self, symbol):
+        """Return the best bid and ask of ``symbol`` as ``(bid, ask)``; each may be None."""
+        top = self.top(symbol, 1)
+        if top is None:
+            return None, None
+        bids, asks, _ = top
+        return (bids[0] if bids else None), (asks[0] if asks else None)
+
+    def view(self, symbol):
+        """Return zero-copy float64 memoryviews of the slot's arrays, and its seqlock counter.
+
+        Returns ``(counter, bid_prices, bid_sizes, ask_prices, ask_sizes)``. Only the first
+        ``n_bids``/``n_asks`` items are valid. The views reflect later updates as they happen;
+        a read is consistent if ``changed(symbol, counter)`` returns False afterwards and
+        ``counter`` is even.
+        """
+        slot = self.slot(symbol)
+        if slot is None:
+            return None
+        size = 8 * self.depth
+        arrays = [self.buf[start:start + size].cast('d')
+                  for start in (self.array_offset(slot, i) for i in range(4))]
+        counter, = struct.unpack_from('<Q', self.buf, self.offset(slot))
+        return (counter,) + tuple(arrays)
+
+    def changed(self, symbol, counter):
+        """Return whether or not the slot of ``symbol`` was written since ``counter`` was read."""
+        return struct.unpack_from('<Q', self.buf, self.offset(self.slot(symbol)))[0] != counter
+
+    def close(self):
+        """Detach from the shared memory block.
+
+        Views returned by view() must be released beforehand.
+        """
+        self.buf = None
+        self.shm.close()
@@ -0,0 +1,59 @@
+"""Registry of active subscriptions, replayed after reconnecting."""
+# Import Built-Ins
+import logging
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+# Subscriptions requiring a logged-in connection
+PRIVATE_METHODS = frozenset(('subscribeReports',))
+
+
+class SubscriptionRegistry:
+    """Deduplicated, ordered record of the subscriptions sent on a connection.
+
+    Subscriptions are keyed by method, symbol and period; subscribing twice records a single
+    entry, and unsubscribing removes it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries.values()))
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @staticmethod
+    def key(method, params):
+        """Return the registry key of the given subscription method and params."""
+        if method.startswith('unsubscribe'):
+            method = 's' + method[3:]
+        return method, params.get('symbol'), params.get('period')
+
+    def track(self, method, params):
+        """Record a subscribe or unsubscribe request; other methods are ignored."""
+        if method.startswith('subscribe'):
+            self._entries[self.key(method, params)] = (method, params)
+        elif method.startswith('unsubscribe'):
+            self._entries.pop(self.key(method, params), None)
+
+    def discard(self, method, params):
+        """Forget a subscription without unsubscribing, e.g. after moving it elsewhere."""
+        self._entries.pop(self.key(method, params), None)
+
+    def public(self):
+        """Return ``(method, params)`` of all subscriptions not requiring a login."""
+        return [entry for entry in self if entry[0] not in PRIVATE_METHODS]
+
+    def private(self):
+        """Return ``(method, params)`` of all subscriptions requiring a login."""
+        return [entry for entry in self if entry[0] in PRIVATE_METHODS]
+
+    def clear(self):
+        """Forget all subscriptions."""
+        self._entries.clear()
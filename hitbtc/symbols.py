@@ -0,0 +1,168 @@
+"""Registry of symbol and currency metadata, cached locally between runs."""
+# Import Built-Ins
+import json
+import logging
+import os
+import time
+from decimal import Decimal, InvalidOperation
+
+# Import Homebrew
+from hitbtc.records import Scale
+
+# Init Logging Facilities
+log = logging.getLogger(__name__)
+
+
+class OrderValidationError(ValueError):
+    """Raised if an order's price or quantity would be rejected by the exchange."""
+
+
+def _decimal(value, name):
+    """Convert an order parameter to Decimal, without float rounding artefacts."""
+    try:
+        return Decimal(value if isinstance(value, str) else repr(value))
+    except (InvalidOperation, TypeError):
+        raise OrderValidationError("Invalid %s %r!" % (name, value))
+
+
+class SymbolRegistry:
+    """Metadata of symbols and currencies, as returned by ``getSymbols`` and ``getCurrencies``.
+
+    Symbols are indexed by their id (e.g. 'ETHBTC') and by their base and quote currency.
+
+    If a ``path`` is given, the registry is written to it whenever it is updated, and loaded from
+    it on instantiation if it is younger than ``ttl`` seconds - a warm restart therefore doesn't
+    have to wait for the symbols to be requested again.
+    """
+
+    def __init__(self, path=None, ttl=None):
+        """Initialize the instance.
+
+        :param path: path of the cache file; defaults to no caching.
+        :param ttl: seconds after which the cache file is considered stale; defaults to 1 hour.
+        """
+        self.path = path
+        self.ttl = ttl or 3600
+        self.symbols = {}
+        self.currencies = {}
+        self.scales = {}
+        self.updated_at = None
+        self._by_base = {}
+        self._by_quote = {}
+        if path:
+            self.load()
+
+    def __contains__(self, symbol):
+        return symbol in self.symbols
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def fresh(self):
+        """Whether or not the registry was updated within the last ``ttl`` seconds."""
+        return self.updated_at is not None and time.time() - self.updated_at < self.ttl
+
+    def get(self, symbol):
+        """Return the ``getSymbols`` item of the given symbol id, or None."""
+        return self.symbols.get(symbol)
+
+    def currency(self, currency):
+        """Return the ``getCurrencies`` item of the given currency id, or None."""
+        return self.currencies.get(currency)
+
+    def by_base(self, currency):
+        """Return the ids of all symbols with the given base currency."""
+        return sorted(self._by_base.get(currency, ()))
+
+    def by_quote(self, currency):
+        """Return the ids of all symbols with the given quote currency."""
+        return sorted(self._by_quote.get(currency, ()))
+
+    def update_symbols(self, symbols):
+        """Add or update the given ``getSymbols`` result items."""
+        for symbol in symbols:
+            symbol_id = symbol['id']
+            self.symbols[symbol_id] = symbol
+            self.scales[symbol_id] = Scale.from_symbol(symbol)
+            self._by_base.setdefault(symbol.get('baseCurrency'), set()).add(symbol_id)
+            self._by_quote.setdefault(symbol.get('quoteCurrency'), set()).add(symbol_id)
+        self._updated()
+
+    def update_currencies(self, currencies):
+        """Add or update the given ``getCurrencies`` result items."""
+        for currency in currencies:
+            self.currencies[currency['id']] = currency
+        self._updated()
+
+    def _updated(self):
+        self.updated_at = time.time()
+        if self.path:
+            self.save()
+
+    def load(self):
+        """Load the cache file, unless it is missing, unreadable or stale.
+
+        :return: Bool, whether or not the cache was loaded
+        """
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            log.warning("Could not read symbol cache %s: %s", self.path, e)
+            return False
+        if (not isinstance(data, dict) or not isinstance(data.get('symbols'), list) or
+                not isinstance(data.get('updated_at'), (int, float))):
+            log.warning("Could not read symbol cache %s: not a symbol cache", self.path)
+            return False
+        if time.time() - data['updated_at'] >= self.ttl:
+            log.info("Symbol cache %s is stale, ignoring it.", self.path)
+            return False
+        path, self.path = self.path, None
+        try:
+            self.update_symbols(data.get('symbols', ()))
+            self.update_currencies(data.get('currencies', ()))
+        finally:
+            self.path = path
+        self.updated_at = data['updated_at']
+        log.debug("Loaded %s symbols from %s", len(self.symbols), self.path)
+        return True
+
+    def save(self):
+        """Write the registry to the cache file, atomically."""
+        data = {'updated_at': self.updated_at, 'symbols': list(self.symbols.values()),
+                'currencies': list(self.currencies.values())}
+        tmp = '%s.%s.tmp' % (self.path, os.getpid())
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log.warning("Could not write symbol cache %s: %s", self.path, e)
+
+    def validate_order(self, symbol, quantity, price=None):
+        """Check the given order parameters against the symbol's increments.
+
+        Orders of unknown symbols pass unchecked.
+
+        :param symbol: symbol id
+        :param quantity: str or number, order quantity
+        :param price: str or number, limit price; None for market orders
+        :raises OrderValidationError: if quantity or price would be rejected by the exchange
+        """
+        info = self.symbols.get(symbol)
+        if info is None:
+            return
+        increment = Decimal(info['quantityIncrement'])
+        qty = _decimal(quantity, 'quantity')
+        if qty <= 0 or qty % increment:
+            raise OrderValidationError("Quantity %s of %s is not a positive multiple of %s!" %
+                                       (quantity, symbol, info['quantityIncrement']))
+        if price is not None:
+            tick_size = Decimal(info['tickSize'])
+            px = _decimal(price, 'price')
+            if px <= 0 or px % tick_size:
+                raise OrderValidationError("Price %s of %s is not a positive multiple of %s!" %
+                                           (price, symbol, info['tickSize']))
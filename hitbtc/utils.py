@@ -93,3 +93,55 @@ response_types = {'getCurrency': resp_get_currency, 'getCurrencies': resp_get_cu
                   'newOrder': resp_place_order, 'cancelOrder': resp_cancel_order,
                   'cancelReplaceOrder': resp_cancel_replace_order,
                   'login' : resp_login}
+
+
+class ResponseSummary:
+    """Human-readable summary of a successful response, formatted on first use only.
+
+    Pass instances to logging calls as argument and to ``echo()``; if neither consumes the
+    summary, it is never formatted.
+    """
+
+    __slots__ = ('method', 'request', 'result', '_text')
+
+    def __init__(self, method, request, result):
+        self.method = method
+        self.request = request
+        self.result = result
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            self._text = self._format()
+        return self._text
+
+    def _format(self):
+        method = self.method
+        msg = response_types.get(method)
+        if msg is None:
+            return "Sucessfully processed %s request." % method
+        if method.startswith('subscribe'):
+            if 'symbol' in self.request['params']:
+                return msg.format(symbol=self.request['params']['symbol'])
+            return msg
+        text = "Sucessfully processed %s request:\n" % method
+        if isinstance(self.result, list):
+            # getSymbols, getCurrencies, getTrades, getTradingBalance, getOrders
+            for item in self.result:
+                # Don't print zero balances
+                if method == 'getTradingBalance' and not (float(item['available']) > 0 or
+                                                          float(item['reserved']) > 0):
+                    continue
+                try:
+                    text += msg.format(**item)
+                except KeyError as e:
+                    text += "%r (missing %s)\n" % (item, e)
+        elif isinstance(self.result, dict):
+            # place, cancel, replace, getSymbol, getCurrency
+            try:
+                text += msg.format(**self.result)
+            except KeyError as e:
+                text += "%r (missing %s)\n" % (self.result, e)
+        else:
+            text += msg.format(self.result)
+        return text
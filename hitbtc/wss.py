@@ -4,11 +4,12 @@
 
 # Import Built-Ins
 import logging
-from queue import Queue
-from threading import Thread, Timer
+import os
+import random
+from threading import Thread, Event
 import multiprocessing as mp
+import queue
 
-import json
 import time
 import ssl
 
@@ -16,10 +17,21 @@ import ssl
 import websocket
 
 # Import home-grown
+from hitbtc.codecs import get_codec
+from hitbtc.queues import OverflowQueue
+from hitbtc.shm import SharedRingBuffer
 
 # Init Logging Facilities
 log = logging.getLogger(__name__)
 
+# Process connectors are forked regardless of the default start method, as the child must
+# inherit the connector's locks and state; 'fork' isn't available on Windows.
+try:
+    FORK = mp.get_context('fork')
+except ValueError:
+    FORK = None
+_Process = FORK.Process if FORK is not None else mp.Process
+
 
 class WebSocketConnector:
     """Websocket Connection Thread.
@@ -32,47 +44,61 @@ class WebSocketConnector:
 
     # pylint: disable=too-many-instance-attributes, too-many-arguments,unused-argument
 
-    def __init__(self, url, timeout=None, q_maxsize=None, reconnect_interval=None, log_level=None):
+    def __init__(self, url, timeout=None, q_maxsize=None, reconnect_interval=None, log_level=None,
+                 codec=None, overflow=None, overflow_timeout=None):
         """Initialize a WebSocketConnector Instance.
 
         :param url: websocket address, defaults to v2 websocket.
         :param timeout: timeout for connection; defaults to 10s
-        :param reconnect_interval: interval at which to try reconnecting;
-                                   defaults to 10s.
+        :param reconnect_interval: maximum interval between reconnection attempts;
+                                   defaults to 10s. Attempts back off exponentially from
+                                   ``backoff_initial`` (50ms) up to this interval, with jitter.
         :param log_level: logging level for the connection Logger. Defaults to
                           logging.INFO.
+        :param codec: name of the JSON codec to use ('orjson', 'ujson' or 'json') or a codec
+                      instance; defaults to the fastest one installed. See hitbtc.codecs.
+        :param overflow: policy applied when the queue is full; one of 'drop_oldest' (default),
+                         'drop_newest', 'conflate', 'block' or 'spill'. See
+                         hitbtc.queues.OverflowQueue.
+        :param overflow_timeout: seconds to wait for a free slot with overflow policy 'block'.
         :param args: args for Thread.__init__()
         :param kwargs: kwargs for Thread.__ini__()
         """
         # Queue used to pass data up to Node
-        self.q = Queue(maxsize=q_maxsize or 100)
+        self.q = OverflowQueue(maxsize=q_maxsize or 100, policy=overflow, timeout=overflow_timeout)
 
         # Connection Settings
         self.url = url
         self.conn = None
+        self.codec = get_codec(codec)
 
         # Connection Handling Attributes
         self._is_connected = False
         self.disconnect_called = False
         self.reconnect_required = False
         self.reconnect_interval = reconnect_interval if reconnect_interval else 10
+        self.backoff_initial = 0.05
+        self.reconnect_attempts = 0
         self.paused = False
 
         # Setup Timer attributes
+        # A single Watchdog thread checks the monotonic timestamps below, instead of
+        # re-arming a threading.Timer for every message received.
+        self.watchdog = None
+        self.timers_active = False
+        self.last_message_at = time.monotonic()
+
         # Tracks API Connection & Responses
-        self.ping_timer = None
         self.ping_interval = 120
+        self.ping_sent_at = None
 
         # Set up history of sent commands for re-subscription
         self.history = []
 
         # Tracks Websocket Connection
-        self.connection_timer = None
         self.connection_timeout = timeout if timeout else 10
 
         # Tracks responses from send_ping()
-        self.pong_timer = None
-        self.pong_received = False
         self.pong_timeout = 30
 
         self.log = logging.getLogger(self.__module__)
@@ -80,11 +106,15 @@ class WebSocketConnector:
         if log_level == logging.DEBUG:
             websocket.enableTrace(True)
 
-        formatter = logging.Formatter('%(asctime)s:%(name)s:%(levelname)s\t%(message)s')
-        file_handler = logging.FileHandler(filename='wss.log', mode='w+')
-        file_handler.setLevel(level=log_level if log_level else logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        self.log.addHandler(file_handler)
+        # Connectors share their module's logger; pools must not attach a handler per connector
+        path = os.path.abspath('wss.log')
+        if not any(getattr(handler, 'baseFilename', None) == path
+                   for handler in self.log.handlers):
+            formatter = logging.Formatter('%(asctime)s:%(name)s:%(levelname)s\t%(message)s')
+            file_handler = logging.FileHandler(filename='wss.log', mode='w+')
+            file_handler.setLevel(level=log_level if log_level else logging.DEBUG)
+            file_handler.setFormatter(formatter)
+            self.log.addHandler(file_handler)
 
     def stop(self):
         """Wrap around disconnect()."""
@@ -97,6 +127,9 @@ class WebSocketConnector:
         self._is_connected = False
         if self.conn:
             self.conn.close()
+        if self.watchdog:
+            self.watchdog.stop()
+            self.watchdog = None
 
     def reconnect(self):
         """Issue a reconnection by setting the reconnect_required event."""
@@ -116,7 +149,8 @@ class WebSocketConnector:
             on_open=self._on_open,
             on_message=self._on_message,
             on_error=self._on_error,
-            on_close=self._on_close
+            on_close=self._on_close,
+            on_pong=self._on_pong
         )
 
         ssl_defaults = ssl.get_default_verify_paths()
@@ -125,14 +159,26 @@ class WebSocketConnector:
 
         while self.reconnect_required:
             if not self.disconnect_called:
-                self.log.info("Attempting to connect again in %s seconds.", self.reconnect_interval)
-                time.sleep(self.reconnect_interval)
+                delay = self._backoff()
+                self.log.info("Attempting to connect again in %.3f seconds.", delay)
+                time.sleep(delay)
 
                 # We need to set this flag since closing the socket will
                 # set it to False
                 self.conn.keep_running = True
                 self.conn.run_forever(sslopt=sslopt_ca_certs)
 
+    def _backoff(self):
+        """Return the delay before the next reconnection attempt.
+
+        Doubles with every failed attempt, starting at ``backoff_initial`` and capped at
+        ``reconnect_interval``; a random jitter of up to half the delay is subtracted, so that
+        many clients don't reconnect in lockstep.
+        """
+        delay = min(self.reconnect_interval, self.backoff_initial * 2 ** self.reconnect_attempts)
+        self.reconnect_attempts += 1
+        return delay * random.uniform(0.5, 1)
+
     def run(self):
         """Run the main method of thread."""
         self._connect()
@@ -148,19 +194,17 @@ class WebSocketConnector:
         :param message: received data as bytes
         :return:
         """
-        self._stop_timer()
+        # We've received data, reset timers
+        self.last_message_at = time.monotonic()
 
         raw, received_at = message, time.time()
 
         try:
-            data = json.loads(raw)
-        except json.JSONDecodeError as e:
+            data = self.codec.loads(raw)
+        except ValueError as e:
             # Something wrong with this data, log and discard
             self.log.exception("Exception %s for data %s; Discarding..", e, raw)
             return
-        finally:
-            # We've received data, reset timers
-            self._start_timer()
         self.pass_up(data, received_at)
 
     def _on_close(self, ws, *args):
@@ -173,26 +217,33 @@ class WebSocketConnector:
         """
         self.log.info("Connection closed")
         self._stop_timer()
+        self._is_connected = False
+        if not self.disconnect_called:
+            # Closed by the server - reconnect
+            self.reconnect_required = True
 
     def _on_open(self, ws):
         """Log connection status, set Events for _connect(), start timers and send a test ping.
 
         Execute on opening a new connection.
 
-        If the connection was previously severed unintentionally, it re-subscribes
-        to the channels by executing the commands found in self.history, in
-        chronological order.
+        Re-subscribes to channels via _resubscribe().
 
         :param ws: Webscoket obj
         """
         self.log.info("Connection opened")
         self._is_connected = True
+        self.reconnect_attempts = 0
         self._start_timer()
-        if self.reconnect_required:
-            self.log.info("Reconnection successful, re-subscribing to"
-                          "channels..")
+        self._resubscribe()
+
+    def _resubscribe(self):
+        """Replay the commands found in self.history, in chronological order, if the
+        connection was previously severed unintentionally."""
+        if self.reconnect_required and self.history:
+            self.log.info("Reconnection successful, re-subscribing to channels..")
             for cmd in self.history:
-                self.send(cmd)
+                self._write(self.codec.dumps(cmd))
 
     def _on_error(self, ws, error):
         """Log the error, reset the self._is_connected flag and issue a reconnect.
@@ -208,20 +259,73 @@ class WebSocketConnector:
         self._is_connected = False
         self.reconnect_required = True
 
+    def _on_pong(self, ws, *args):
+        """Count a received pong as activity on the connection.
+
+        :param ws: Websocket obj
+        :param *args: additional arguments
+        """
+        self.last_message_at = time.monotonic()
+
     def _stop_timer(self):
         """Stop connection timer."""
-
-        if self.connection_timer:
-            self.connection_timer.cancel()
+        self.timers_active = False
 
     def _start_timer(self):
-        """Reset and start timer for API connection."""
-        self._stop_timer()
+        """Reset and start timer for API connection.
+
+        Starts the connector's Watchdog, if it isn't running yet.
+        """
+        self.last_message_at = time.monotonic()
+        self.ping_sent_at = None
+        self.timers_active = True
+        if self.watchdog is None:
+            self.watchdog = self._start_watchdog()
+
+    def _start_watchdog(self):
+        """Create and start the Watchdog checking this connector's timers."""
+        watchdog = Watchdog(self)
+        watchdog.start()
+        return watchdog
+
+    def _check_timers(self, now):
+        """Check connection and pong time-outs and send pings on idle connections.
 
-        # Automatically reconnect if we didnt receive data
-        self.connection_timer = Timer(self.connection_timeout,
-                                      self._connection_timed_out)
-        self.connection_timer.start()
+        Called periodically by the Watchdog.
+
+        :param now: float, current time.monotonic() value
+        """
+        if not self.timers_active:
+            return
+
+        idle = now - self.last_message_at
+        if idle > self.connection_timeout:
+            self.log.info("No data received for %.1f seconds!", idle)
+            self._timed_out()
+            return
+
+        if self.ping_sent_at is not None:
+            if self.last_message_at >= self.ping_sent_at:
+                # Data arrived since the ping was sent, the connection is alive
+                self.ping_sent_at = None
+            elif now - self.ping_sent_at > self.pong_timeout:
+                self.log.info("No pong received within %s seconds!", self.pong_timeout)
+                self._timed_out()
+        elif idle > min(self.ping_interval, self.connection_timeout / 2):
+            self.send_ping()
+
+    def _timed_out(self):
+        """Stop the timers and issue a reconnect."""
+        self.timers_active = False
+        self._connection_timed_out()
+
+    def send_ping(self):
+        """Send a ping frame to the API to test the connection."""
+        self.ping_sent_at = time.monotonic()
+        try:
+            self.conn.send('', websocket.ABNF.OPCODE_PING)
+        except Exception as e:  # pylint: disable=broad-except
+            self.log.error("Could not send ping: %s", e)
 
     def send(self, data):
         """Send the given Payload to the API via the websocket connection.
@@ -232,20 +336,39 @@ class WebSocketConnector:
         :return:
         """
         if self._is_connected:
-            payload = json.dumps(data)
+            payload = self.codec.dumps(data)
             self.history.append(data)
-            self.conn.send(payload)
+            self._write(payload)
         else:
             log.error("Cannot send payload! Connection not established!")
 
+    def _write(self, payload):
+        """Write the serialized payload to the websocket connection.
+
+        :param payload: str, serialized data
+        """
+        self.conn.send(payload)
+
+    def _write_many(self, payloads):
+        """Write several serialized payloads back to back.
+
+        :param payloads: list of str
+        """
+        for payload in payloads:
+            self._write(payload)
+
+    def _write_scheduled(self, payload):
+        """Write a payload released by a rate limiter's sender thread."""
+        self._write(payload)
+
     def pass_up(self, data, recv_at):
         """Pass data up to the client via the internal Queue().
 
         :param data: data to be passed up
-        :param recv_at: float, time of reception
+        :param recv_at: float, time of reception; unused here, but available to subclasses
         :return:
         """
-        self.q.put(data, recv_at)
+        self.q.put(data)
 
     def recv(self, block=True, timeout=None):
         """Wrap for self.q.get().
@@ -264,37 +387,189 @@ class WebSocketConnector:
         self.reconnect()
 
 
+class Watchdog(Thread):
+    """Single, long-lived thread supervising a connector's time-outs.
+
+    Calls ``connector._check_timers()`` every ``resolution`` seconds.
+    """
+
+    def __init__(self, connector, resolution=None):
+        """Initialize the instance.
+
+        :param connector: WebSocketConnector instance to supervise
+        :param resolution: interval in seconds between checks; defaults to a quarter of the
+                           connector's connection timeout, but at most 1s.
+        """
+        super(Watchdog, self).__init__(name='Watchdog', daemon=True)
+        self.connector = connector
+        self.resolution = resolution or min(1.0, connector.connection_timeout / 4)
+        self._stopped = Event()
+
+    def run(self):
+        """Check the connector's timers until stopped."""
+        while not self._stopped.wait(self.resolution):
+            try:
+                self.connector._check_timers(time.monotonic())
+            except Exception as e:  # pylint: disable=broad-except
+                log.exception("Watchdog check failed: %s", e)
+
+    def stop(self):
+        """Stop the watchdog."""
+        self._stopped.set()
+
+
 class WebSocketConnectorThread(WebSocketConnector, Thread):
     """Thread-based WebsocketConnector."""
 
     def __init__(self, url, timeout=None, q_maxsize=None, reconnect_interval=None, log_level=None,
-                 **kwargs):
+                 codec=None, overflow=None, overflow_timeout=None, **kwargs):
         """Initialize the instance."""
         super(WebSocketConnectorThread, self).__init__(url, timeout=timeout, q_maxsize=q_maxsize,
                                                        reconnect_interval=reconnect_interval,
-                                                       log_level=log_level)
+                                                       log_level=log_level, codec=codec,
+                                                       overflow=overflow,
+                                                       overflow_timeout=overflow_timeout)
         Thread.__init__(self, **kwargs)
         self.daemon = True
 
     def disconnect(self):
-        """Disconnect from the websocket and join thread."""
+        """Disconnect from the websocket, join thread and close the queue's spill file."""
         super(WebSocketConnectorThread, self).disconnect()
         Thread.join(self, timeout=1)
+        self.q.close()
+
 
+class WebSocketConnectorProcess(WebSocketConnector, _Process):
+    """Process-based websocket connector.
 
-class WebSocketConnectorProcess(WebSocketConnector, mp.Process):
-    """Process-based websocket connector."""
+    The websocket connection, decoding and all processing of received data run in a child
+    process. Data is passed to the parent through a shared memory ring buffer, encoded with the
+    connector's codec; payloads sent by the parent are forwarded to the child via a command
+    queue.
+
+    The child process is always started with the 'fork' start method, whatever the default
+    start method is; the connector is therefore not available on Windows.
+    """
 
     def __init__(self, url, timeout=None, q_maxsize=None, reconnect_interval=None, log_level=None,
-                 **kwargs):
-        """Initialize the instance."""
+                 codec=None, overflow=None, overflow_timeout=None, ring_size=None, **kwargs):
+        """Initialize the instance.
+
+        :param ring_size: size of the shared memory ring buffer in bytes; defaults to 8 MiB.
+        :raises RuntimeError: if the 'fork' start method isn't available on this platform
+        """
+        if FORK is None:
+            raise RuntimeError("WebSocketConnectorProcess requires the 'fork' start method, "
+                               "which isn't available on this platform!")
+        self._connected = FORK.Value('b', 0, lock=False)
+        self._ring_dropped = FORK.Value('Q', 0, lock=False)
         super(WebSocketConnectorProcess, self).__init__(url, timeout=timeout, q_maxsize=q_maxsize,
                                                         reconnect_interval=reconnect_interval,
-                                                        log_level=log_level)
-        mp.Process.__init__(self, **kwargs)
+                                                        log_level=log_level, codec=codec,
+                                                        overflow=overflow,
+                                                        overflow_timeout=overflow_timeout)
+        _Process.__init__(self, **kwargs)
         self.daemon = True
+        self.ring = SharedRingBuffer.create(ring_size)
+        self._commands = FORK.Queue()
+        self._child = False
+
+    @property
+    def _is_connected(self):
+        """Connection state of the child process, shared with the parent."""
+        return bool(self._connected.value)
+
+    @_is_connected.setter
+    def _is_connected(self, value):
+        self._connected.value = bool(value)
+
+    @property
+    def ring_dropped(self):
+        """Number of items discarded because the ring buffer was full."""
+        return self._ring_dropped.value
+
+    def run(self):
+        """Run the main method of the child process."""
+        self._child = True
+        Thread(target=self._read_commands, name='CommandReader', daemon=True).start()
+        self._connect()
+
+    def _read_commands(self):
+        """Write payloads sent by the parent to the connection, until receiving None."""
+        while True:
+            payload = self._commands.get()
+            if payload is None:
+                self.disconnect()
+                return
+            if not self._is_connected:
+                continue
+            if isinstance(payload, list):
+                self._write_many(payload)
+            else:
+                self._write(payload)
+
+    def _write(self, payload):
+        """Write the payload to the connection, or forward it to the child process."""
+        if self._child:
+            self.conn.send(payload)
+        else:
+            self._commands.put(payload)
+
+    def _write_many(self, payloads):
+        """Forward a batch of payloads to the child process in a single command."""
+        if self._child:
+            super(WebSocketConnectorProcess, self)._write_many(payloads)
+        else:
+            self._commands.put(payloads)
+
+    def pass_up(self, data, recv_at):
+        """Pass data up to the parent via the shared memory ring buffer."""
+        self._publish(data)
+
+    def _publish(self, item):
+        """Encode the item and write it to the ring buffer."""
+        if not self.ring.put(self.codec.dumps(item).encode('utf-8')):
+            self._ring_dropped.value += 1
+
+    def _read_ring(self, block=True, timeout=None):
+        """Return the next decoded item of the ring buffer.
+
+        Polls the ring buffer, backing off from 50us up to 1ms between polls.
+
+        :raises queue.Empty: if no item arrived in time, or block is False
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        delay = 0.00005
+        while True:
+            data = self.ring.get()
+            if data is not None:
+                return self.codec.loads(data)
+            if not block or (deadline is not None and time.monotonic() >= deadline):
+                raise queue.Empty
+            time.sleep(delay)
+            delay = min(delay * 2, 0.001)
+
+    def recv(self, block=True, timeout=None):
+        """Retrieve the next item received by the child process.
+
+        :param block: Whether or not to make the call to this method block
+        :param timeout: Value in seconds which determines a timeout for recv()
+        :return:
+        """
+        return self._read_ring(block, timeout)
 
     def disconnect(self):
-        """Disconnect from the websocket and join the process."""
-        super(WebSocketConnectorProcess, self).disconnect()
-        mp.Process.join(self, timeout=1)
+        """Disconnect from the websocket, join the process and close the queue's spill file."""
+        if self._child:
+            super(WebSocketConnectorProcess, self).disconnect()
+            return
+        self.disconnect_called = True
+        if self.is_alive():
+            self._commands.put(None)
+            _Process.join(self, timeout=1)
+        if self.is_alive():
+            self.log.warning("Child process did not exit in time, terminating it.")
+            self.terminate()
+        if self.ring.buf is not None:
+            self.ring.close()
+        self.q.close()
@@ -10,5 +10,7 @@ setup(name='hitbtc',
       packages=['hitbtc'],
       classifiers=['Programming Language :: Python :: 3 :: Only'],
       install_requires=['websocket-client'],
+      extras_require={'aio': ['websockets'], 'numpy': ['numpy'], 'zstd': ['zstandard'],
+                      'lz4': ['lz4']},
       package_data={'': ['*.md', '*.rst']})
 
@@ -0,0 +1,63 @@
+"""Fixtures shared by the tests: a local mock server and clients connected to it."""
+# Import Built-Ins
+import logging
+import queue
+import time
+
+# Import Third-Party
+import pytest
+
+# Import Homebrew
+from hitbtc import HitBTC
+from hitbtc.mockserver import MockHitBTCServer
+
+
+def wait_for(predicate, timeout=5):
+    """Wait until ``predicate()`` is true, failing the test after ``timeout`` seconds."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            pytest.fail("Timed out waiting for %s" % getattr(predicate, '__name__', predicate))
+        time.sleep(0.01)
+
+
+def drain(client, seconds):
+    """Return the items received by ``client`` within ``seconds``."""
+    items = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            items.append(client.recv(timeout=0.05))
+        except queue.Empty:
+            continue
+    return items
+
+
+@pytest.fixture
+def server():
+    """A mock server with two symbols, sending 20 updates per second each."""
+    server = MockHitBTCServer(symbols=2, rate=20, seed=1)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client_factory(server):
+    """Return a function creating started clients connected to ``server``."""
+    clients = []
+
+    def create(**kwargs):
+        kwargs.setdefault('silent', True)
+        kwargs.setdefault('log_level', logging.WARNING)
+        kwargs.setdefault('key', 'key')
+        kwargs.setdefault('secret', 'secret')
+        client = HitBTC(url=server.url, **kwargs)
+        clients.append(client)
+        client.start()
+        wait_for(client.is_connected)
+        return client
+
+    yield create
+    for client in clients:
+        client.stop()
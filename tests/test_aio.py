@@ -0,0 +1,23 @@
+"""Tests of the asyncio client."""
+# Import Built-Ins
+import asyncio
+import logging
+
+# Import Third-Party
+import pytest
+
+# Import Homebrew
+from hitbtc import AsyncHitBTC
+
+
+def test_aio_requests_fail_while_disconnected(server):
+    async def request():
+        client = AsyncHitBTC(url=server.url, silent=True, log_level=logging.WARNING)
+        with pytest.raises(ConnectionError):
+            await client.subscribe_ticker(symbol='ETHBTC')
+        async with client:
+            await asyncio.wait_for(client.connected(), 5)
+            assert await asyncio.wait_for(client.subscribe_ticker(symbol='ETHBTC'), 5)
+
+    asyncio.run(request())
+
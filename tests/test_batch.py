@@ -0,0 +1,19 @@
+"""Tests of aggregating the futures of batch requests."""
+# Import Built-Ins
+from concurrent.futures import Future
+
+# Import Homebrew
+from hitbtc.pending import RequestError, gather
+
+
+def test_gather_collects_results_and_errors():
+    futures = [Future(), Future()]
+    payloads = [{'id': 1}, {'id': 2}]
+    batch = gather(payloads, futures, Future())
+    futures[0].latency = futures[1].latency = 0.1
+    futures[0].set_result('ok')
+    futures[1].set_exception(RequestError(payloads[1], {'error': {'code': 20001}}))
+    result = batch.result(1)
+    assert not result.ok
+    assert result.results == ['ok', None]
+    assert len(result.failed) == 1
@@ -0,0 +1,139 @@
+"""Tests of the local order book engine."""
+# Import Homebrew
+from hitbtc.book import BookManager, BookSide, OrderBook
+
+from tests.conftest import drain, wait_for
+
+
+def levels(*pairs):
+    return [{'price': str(price), 'size': str(size)} for price, size in pairs]
+
+
+def snapshot(sequence=1):
+    return {'bid': levels((0.9, 1), (0.8, 2), (0.7, 3)), 'ask': levels((1.1, 1), (1.2, 2)),
+            'symbol': 'ETHBTC', 'sequence': sequence}
+
+
+def update(sequence, bid=(), ask=()):
+    return {'bid': levels(*bid), 'ask': levels(*ask), 'symbol': 'ETHBTC', 'sequence': sequence}
+
+
+def test_side_keeps_best_level_first():
+    bids, asks = BookSide(descending=True), BookSide()
+    for price in (0.5, 0.9, 0.7):
+        bids.update(price, 1.0)
+        asks.update(price, 1.0)
+    assert bids.best() == (0.9, 1.0)
+    assert asks.best() == (0.5, 1.0)
+    assert [price for price, _ in bids.top(3)] == [0.9, 0.7, 0.5]
+
+
+def test_side_update_and_remove_level():
+    side = BookSide()
+    side.update(1.0, 2.0)
+    side.update(1.0, 3.0)
+    assert side.depth_at(1.0) == 3.0
+    side.update(1.0, 0)
+    assert len(side) == 0
+    assert side.depth_at(1.0) == 0.0
+    # Removing a level which doesn't exist is a no-op
+    side.update(2.0, 0)
+    assert len(side) == 0
+
+
+def test_snapshot_then_updates():
+    book = OrderBook('ETHBTC')
+    assert book.update(update(2, bid=[(0.95, 1)])) is False
+    book.snapshot(snapshot(1))
+    assert book.synced
+    assert book.best_bid() == (0.9, 1.0)
+    assert book.update(update(2, bid=[(0.95, 1)], ask=[(1.1, 0)]))
+    assert book.best_bid() == (0.95, 1.0)
+    assert book.best_ask() == (1.2, 2.0)
+    assert book.sequence == 2
+
+
+def test_stale_update_is_discarded():
+    book = OrderBook('ETHBTC')
+    book.snapshot(snapshot(5))
+    assert book.update(update(5, bid=[(0.95, 1)])) is False
+    assert book.update(update(3, bid=[(0.95, 1)])) is False
+    assert book.best_bid() == (0.9, 1.0)
+    assert book.synced
+
+
+def test_gap_clears_book_until_next_snapshot():
+    book = OrderBook('ETHBTC')
+    book.snapshot(snapshot(1))
+    assert book.update(update(3, bid=[(0.95, 1)])) is False
+    assert not book.synced
+    assert book.gaps == 1
+    assert book.best_bid() is None
+    # Updates are discarded until a snapshot arrives
+    assert book.update(update(4, bid=[(0.95, 1)])) is False
+    book.snapshot(snapshot(10))
+    assert book.update(update(11, bid=[(0.95, 1)]))
+
+
+def test_updates_without_sequence_are_applied():
+    book = OrderBook('ETHBTC')
+    book.snapshot(snapshot(1))
+    unsequenced = update(None, bid=[(0.95, 1)])
+    del unsequenced['sequence']
+    assert book.update(unsequenced)
+    assert book.synced
+    assert book.sequence == 1
+    assert book.best_bid() == (0.95, 1.0)
+    assert book.update(update(2, bid=[(0.96, 1)]))
+    assert book.best_bid() == (0.96, 1.0)
+
+
+def test_snapshot_without_sequence_syncs_book():
+    book = OrderBook('ETHBTC')
+    unsequenced = snapshot()
+    del unsequenced['sequence']
+    book.snapshot(unsequenced)
+    assert book.synced
+    assert book.update({'bid': levels((0.95, 1)), 'ask': [], 'symbol': 'ETHBTC'})
+    assert book.best_bid() == (0.95, 1.0)
+
+
+def test_manager_reports_gaps_once():
+    gaps = []
+    books = BookManager(on_gap=gaps.append)
+    books.apply('snapshotOrderbook', 'ETHBTC', snapshot(1))
+    assert books.apply('updateOrderbook', 'ETHBTC', update(2)) is books['ETHBTC']
+    assert books.apply('updateOrderbook', 'ETHBTC', update(4)) is None
+    assert books.apply('updateOrderbook', 'ETHBTC', update(5)) is None
+    assert gaps == ['ETHBTC']
+
+
+def test_manager_reset_marks_books_out_of_sync():
+    books = BookManager()
+    books.apply('snapshotOrderbook', 'ETHBTC', snapshot(1))
+    books.reset()
+    assert not books['ETHBTC'].synced
+    assert books.apply('updateOrderbook', 'ETHBTC', update(2)) is None
+
+
+def test_book_resyncs_after_gap(server, client_factory):
+    client = client_factory()
+    client.subscribe_book(symbol='ETHBTC').result(5)
+    wait_for(lambda: client.order_book('ETHBTC') is not None and
+             client.order_book('ETHBTC').synced)
+    # Skip a few sequence numbers, as if updates were lost
+    market = server.markets['ETHBTC']
+    market.sequence += 5
+    skipped = market.sequence
+    snapshots = []
+
+    def resynced():
+        snapshots.extend(params['sequence'] for method, _, params in drain(client, 0.05)
+                         if method == 'snapshotOrderbook')
+        return any(sequence > skipped for sequence in snapshots)
+
+    wait_for(resynced)
+    book = client.order_book('ETHBTC')
+    assert book.gaps == 1
+    assert book.synced
+    assert book.sequence >= max(snapshots)
@@ -0,0 +1,54 @@
+"""Tests of the latest value cache."""
+# Import Homebrew
+from hitbtc.cache import LatestValueCache
+
+from tests.conftest import wait_for
+
+
+def test_sequence_increments_per_update():
+    cache = LatestValueCache()
+    cache.set('a', 1)
+    cache.set('a', 2)
+    latest = cache.get('a')
+    assert latest.value == 2
+    assert latest.sequence == 2
+    assert not cache.changed('a', 2)
+    cache.set('a', 3)
+    assert cache.changed('a', 2)
+
+
+def test_set_if_changed_ignores_equal_values():
+    cache = LatestValueCache()
+    assert cache.set_if_changed('a', 1)
+    assert not cache.set_if_changed('a', 1)
+    assert cache.get('a').sequence == 1
+
+
+def test_sequence_survives_clear():
+    cache = LatestValueCache()
+    cache.set('a', 1)
+    seen = cache.get('a').sequence
+    cache.clear()
+    assert cache.get('a') is None
+    assert cache.changed('a', seen)
+    cache.set('a', 1)
+    assert cache.get('a').sequence > seen
+    assert cache.changed('a', seen)
+    assert not cache.changed('b', 1)
+
+
+def test_sequence_survives_reconnect(server, client_factory):
+    client = client_factory()
+    cache = client.conn.latest
+    cleared = []
+    clear = cache.clear
+    cache.clear = lambda: (cleared.append(True), clear())
+    client.subscribe_ticker(symbol='ETHBTC').result(5)
+    wait_for(lambda: client.latest_ticker('ETHBTC') is not None)
+    seen = client.latest_ticker('ETHBTC').sequence
+
+    server.disconnect_all()
+    wait_for(lambda: cleared)
+    wait_for(lambda: client.latest_ticker('ETHBTC') is not None, timeout=10)
+    assert client.latest_ticker('ETHBTC').sequence > seen
+    assert cache.changed(('ticker', 'ETHBTC'), seen)
@@ -0,0 +1,17 @@
+"""Tests of the mock server's order handling."""
+# Import Third-Party
+import pytest
+
+# Import Homebrew
+from hitbtc.pending import RequestError
+
+
+def test_order_round_trip(client_factory):
+    client = client_factory()
+    assert client.login().result(5)
+    order = client.place_order(symbol='ETHBTC', side='buy', quantity='1', price='0.07',
+                               clientOrderId='order-1').result(5)
+    assert order['status'] == 'new'
+    assert client.cancel_order(clientOrderId='order-1').result(5)['status'] == 'canceled'
+    with pytest.raises(RequestError):
+        client.cancel_order(clientOrderId='order-1').result(5)
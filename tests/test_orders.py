@@ -0,0 +1,28 @@
+"""Tests of tracking order state from order results."""
+# Import Built-Ins
+import logging
+from concurrent.futures import Future
+
+# Import Homebrew
+from hitbtc.connector import HitBTCConnector
+
+
+def test_order_results_are_tracked(client_factory):
+    client = client_factory()
+    client.login().result(5)
+    client.place_order(symbol='ETHBTC', side='buy', quantity='1', price='0.07',
+                       clientOrderId='order-1').result(5)
+    assert client.orders.get('order-1')['status'] == 'new'
+    client.cancel_order(clientOrderId='order-1').result(5)
+    assert client.orders.get('order-1')['status'] == 'canceled'
+
+
+def test_results_without_order_are_ignored():
+    conn = HitBTCConnector(url='ws://localhost:1', silent=True, log_level=logging.WARNING)
+    for i_d, result in enumerate((True, None, {'id': '1'})):
+        future = Future()
+        request = {'method': 'newOrder', 'params': {}, 'id': i_d}
+        conn.requests.add(i_d, request, future)
+        conn._handle_response({'jsonrpc': '2.0', 'result': result, 'id': i_d})
+        assert future.result(0) == result
+    assert len(conn.orders) == 0
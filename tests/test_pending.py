@@ -0,0 +1,78 @@
+"""Tests of the pending request table."""
+# Import Built-Ins
+import time
+from concurrent.futures import Future
+
+# Import Third-Party
+import pytest
+
+# Import Homebrew
+from hitbtc.pending import PendingRequests, RequestError, RequestTimeout
+
+
+def test_resolve_sets_result_and_latency():
+    requests = PendingRequests()
+    future = Future()
+    requests.add(1, {'id': 1}, future)
+    assert 1 in requests
+    requests.resolve(requests.pop(1), 'ok')
+    assert future.result(0) == 'ok'
+    assert future.latency >= 0
+    assert len(requests) == 0
+
+
+def test_expire_fails_requests_past_their_deadline():
+    requests = PendingRequests(timeout=30)
+    late, patient = Future(), Future()
+    requests.add(1, {'id': 1}, late, timeout=0.01)
+    requests.add(2, {'id': 2}, patient)
+    expired = requests.expire(time.monotonic() + 1)
+    assert [entry.request for entry in expired] == [{'id': 1}]
+    with pytest.raises(RequestTimeout):
+        late.result(0)
+    assert not patient.done()
+    assert 2 in requests
+
+
+def test_answered_requests_never_expire():
+    requests = PendingRequests()
+    future = Future()
+    requests.add(1, {'id': 1}, future, timeout=0.01)
+    requests.resolve(requests.pop(1), 'ok')
+    assert requests.expire(time.monotonic() + 1) == []
+    assert future.result(0) == 'ok'
+
+
+def test_full_table_evicts_oldest_request():
+    requests = PendingRequests(maxsize=2)
+    futures = [Future() for _ in range(3)]
+    for i, future in enumerate(futures):
+        requests.add(i, {'id': i}, future)
+    assert len(requests) == 2
+    assert 0 not in requests
+    with pytest.raises(RequestTimeout):
+        futures[0].result(0)
+
+
+def test_duplicate_id_is_rejected():
+    requests = PendingRequests()
+    requests.add(1, {'id': 1}, Future())
+    with pytest.raises(ValueError):
+        requests.add(1, {'id': 1}, Future())
+
+
+def test_deadline_heap_stays_bounded():
+    requests = PendingRequests(maxsize=10)
+    for i in range(10000):
+        requests.add(i, {'id': i}, Future())
+        requests.resolve(requests.pop(i), None)
+    assert len(requests._deadlines) <= 2 * requests.maxsize + 16
+
+
+def test_clear_fails_all_pending_requests():
+    requests = PendingRequests()
+    future = Future()
+    requests.add(1, {'id': 1}, future)
+    requests.clear()
+    with pytest.raises(RequestTimeout):
+        future.result(0)
@@ -0,0 +1,74 @@
+"""Tests of the connector's hooks and the sampling profiler."""
+# Import Built-Ins
+import json
+import logging
+
+# Import Homebrew
+from hitbtc.connector import HitBTCConnector
+from hitbtc.profiling import SamplingProfiler
+
+TICKER = json.dumps({'jsonrpc': '2.0', 'method': 'ticker',
+                     'params': {'symbol': 'ETHBTC', 'last': '1',
+                                'timestamp': '2018-01-01T00:00:00.000Z'}})
+
+
+def connector(**kwargs):
+    return HitBTCConnector(url='ws://localhost:1', silent=True, stdout_only=True,
+                           log_level=logging.WARNING, **kwargs)
+
+
+def test_hooks_run_for_every_frame():
+    conn = connector()
+    frames = []
+    conn.add_hook('pre_decode', frames.append)
+    for _ in range(3):
+        conn._on_message(None, TICKER)
+    assert frames == [TICKER] * 3
+    conn.remove_hook('pre_decode', frames.append)
+    assert conn.hooks is None
+
+
+def test_failing_hook_is_ignored():
+    conn = connector()
+    dispatched = []
+
+    def fail(frame):
+        raise RuntimeError(frame)
+
+    conn.add_hook('pre_decode', fail)
+    conn.add_hook('post_dispatch', lambda *args: dispatched.append(args[0]))
+    conn._on_message(None, TICKER)
+    assert dispatched == ['ticker']
+
+
+def test_connector_samples_hooks():
+    conn = connector()
+    conn.sample_hooks(10)
+    frames, dispatched = [], []
+    conn.add_hook('pre_decode', frames.append)
+    conn.add_hook('post_dispatch', lambda *args: dispatched.append(args[0]))
+    for _ in range(100):
+        conn._on_message(None, TICKER)
+    assert len(frames) == len(dispatched) == 10
+    assert conn.hooks.frames == 100
+
+
+def test_profiler_times_sampled_stages(tmp_path):
+    conn = connector(profile=10)
+    for _ in range(100):
+        conn._on_message(None, TICKER)
+    stats = conn.profiler.stats()
+    assert stats['every'] == 10
+    assert stats['frames'] == 10
+    assert stats['stages']['on_message;decode']['count'] == 10
+    assert stats['stages']['on_message;dispatch;ticker']['count'] == 10
+    path = tmp_path / 'profile.folded'
+    conn.profiler.dump(str(path))
+    assert path.read_text().splitlines()[0].startswith('hitbtc;on_message;decode ')
+
+    conn.profiler.uninstall(conn)
+    assert conn.hooks is None
+    frames = []
+    conn.add_hook('pre_decode', frames.append)
+    conn._on_message(None, TICKER)
+    assert frames == [TICKER]
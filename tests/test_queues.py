@@ -0,0 +1,96 @@
+"""Tests of the overflow policies of the connector queue."""
+# Import Built-Ins
+import queue
+import time
+
+# Import Third-Party
+import pytest
+
+# Import Homebrew
+from hitbtc.queues import OverflowQueue, conflate_ticker
+
+
+def drain(q):
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except queue.Empty:
+            return items
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        OverflowQueue(2, 'drop_everything')
+
+
+def test_drop_oldest():
+    q = OverflowQueue(2, 'drop_oldest')
+    for i in range(4):
+        q.put(i)
+    assert drain(q) == [2, 3]
+    assert q.dropped == 2
+
+
+def test_drop_newest():
+    q = OverflowQueue(2, 'drop_newest')
+    for i in range(4):
+        q.put(i)
+    assert drain(q) == [0, 1]
+    assert q.dropped == 2
+
+
+def test_conflate_replaces_queued_ticker_in_place():
+    q = OverflowQueue(10, 'conflate')
+    q.put(('ticker', 'ETHBTC', {'last': '1'}))
+    q.put(('updateTrades', 'ETHBTC', {'data': []}))
+    q.put(('ticker', 'ETHBTC', {'last': '2'}))
+    q.put(('ticker', 'BTCUSD', {'last': '3'}))
+    assert drain(q) == [('ticker', 'ETHBTC', {'last': '2'}),
+                        ('updateTrades', 'ETHBTC', {'data': []}),
+                        ('ticker', 'BTCUSD', {'last': '3'})]
+    assert q.conflated == 1
+
+
+def test_conflate_timestamped_items():
+    q = OverflowQueue(10, 'conflate')
+    for i in range(5):
+        q.put(('ticker', 'ETHBTC', {'last': str(i)}, (i, i)))
+    assert drain(q) == [('ticker', 'ETHBTC', {'last': '4'}, (4, 4))]
+    assert conflate_ticker(('ticker', 'ETHBTC', {}, (0, 0))) == ('ticker', 'ETHBTC')
+    assert conflate_ticker(('updateTrades', 'ETHBTC', {})) is None
+
+
+def test_block_waits_then_drops():
+    q = OverflowQueue(1, 'block', timeout=0.05)
+    q.put(1)
+    started = time.monotonic()
+    q.put(2)
+    assert time.monotonic() - started >= 0.04
+    assert q.dropped == 1
+    assert drain(q) == [1]
+
+
+def test_spill_keeps_order_and_close_discards_file(tmp_path):
+    q = OverflowQueue(2, 'spill', spill_dir=str(tmp_path))
+    for i in range(7):
+        q.put(i)
+    assert q.spilled == 5
+    assert q.qsize() == 7
+    assert drain(q) == list(range(7))
+
+    q.put(7)
+    q.put(8)
+    q.put(9)
+    spill = q._spill
+    q.close()
+    assert spill.closed
+    assert drain(q) == [7, 8]
+
+
+def test_stats():
+    q = OverflowQueue(1, 'drop_oldest')
+    q.put(1)
+    q.put(2)
+    assert q.stats() == {'size': 1, 'maxsize': 1, 'policy': 'drop_oldest', 'dropped': 1,
+                         'conflated': 0, 'spilled': 0}
@@ -0,0 +1,83 @@
+"""Tests of the outbound request scheduler and its priority lanes."""
+# Import Built-Ins
+import threading
+
+# Import Homebrew
+from hitbtc.ratelimit import RequestScheduler, TokenBucket, lane_of
+
+
+class BlockingWriter:
+    """Records written payloads, blocking on the first until released."""
+
+    def __init__(self, expected=1):
+        self.written = []
+        self.expected = expected
+        self.started = threading.Event()
+        self.done = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, payload):
+        self.written.append(payload)
+        self.started.set()
+        if len(self.written) == self.expected:
+            self.done.set()
+        self.release.wait(5)
+
+
+def test_lanes_of_methods():
+    assert lane_of('cancelOrder') == 'cancel'
+    assert lane_of('newOrder') == 'order'
+    assert lane_of('subscribeTicker') == 'market'
+    assert lane_of('getSymbol') == 'reference'
+
+
+def test_token_bucket():
+    bucket = TokenBucket(10, burst=2)
+    now = bucket.updated_at
+    for _ in range(2):
+        assert bucket.delay(now) == 0
+        bucket.take()
+    assert bucket.delay(now) > 0
+    assert bucket.delay(now + 0.2) == 0
+
+
+def test_higher_lanes_are_sent_first():
+    writer = BlockingWriter(expected=5)
+    scheduler = RequestScheduler(writer, rate=1000)
+    try:
+        scheduler.submit('getSymbol', 'busy')
+        assert writer.started.wait(5)
+        for method in ('getSymbol', 'getTrades', 'newOrder', 'cancelOrder'):
+            assert scheduler.submit(method, method)
+        writer.release.set()
+        assert writer.done.wait(5)
+        assert writer.written == ['busy', 'cancelOrder', 'newOrder', 'getTrades', 'getSymbol']
+        assert scheduler.metrics()['cancel']['sent'] == 1
+    finally:
+        writer.release.set()
+        scheduler.stop()
+
+
+def test_full_queue_evicts_lower_lanes():
+    writer = BlockingWriter()
+    dropped = []
+    scheduler = RequestScheduler(writer, rate=1000, maxsize=2, on_drop=dropped.append)
+    try:
+        scheduler.submit('getSymbol', 'busy', 0)
+        assert writer.started.wait(5)
+        assert scheduler.submit('getSymbol', 'reference', 1)
+        assert scheduler.submit('getTrades', 'market', 2)
+        # The oldest payload of the lowest lane makes room for the cancel
+        assert scheduler.submit('cancelOrder', 'cancel', 3)
+        assert dropped == [1]
+        # Nothing ranks below a reference request, so it is dropped itself
+        assert not scheduler.submit('getSymbol', 'reference', 4)
+        assert dropped == [1]
+        metrics = scheduler.metrics()
+        assert metrics['reference']['dropped'] == 2
+        assert metrics['cancel']['queued'] == 1
+        assert scheduler.clear() == [3, 2]
+        assert len(scheduler) == 0
+    finally:
+        writer.release.set()
+        scheduler.stop()
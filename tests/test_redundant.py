@@ -0,0 +1,90 @@
+"""Tests of the stream deduplicator and redundant connections."""
+# Import Built-Ins
+import logging
+from concurrent.futures import Future
+
+# Import Third-Party
+import pytest
+
+# Import Homebrew
+from hitbtc.pending import RequestTimeout, first
+from hitbtc.redundant import HitBTCRedundant, StreamDeduplicator
+
+from tests.conftest import drain, wait_for
+
+
+def trades(*ids):
+    return {'data': [{'id': i_d, 'price': '1', 'quantity': '1'} for i_d in ids],
+            'symbol': 'ETHBTC'}
+
+
+@pytest.fixture
+def dedup():
+    dedup = StreamDeduplicator()
+    dedup.register('a')
+    dedup.register('b')
+    return dedup
+
+
+def test_books_are_deduplicated_by_sequence(dedup):
+    update = {'symbol': 'ETHBTC', 'sequence': 2}
+    assert dedup.admit('a', 'updateOrderbook', 'ETHBTC', update) is update
+    assert dedup.admit('b', 'updateOrderbook', 'ETHBTC', update) is None
+    # Older updates are discarded as well, other symbols are independent
+    assert dedup.admit('b', 'updateOrderbook', 'ETHBTC', {'sequence': 1}) is None
+    assert dedup.admit('b', 'updateOrderbook', 'BTCUSD', {'sequence': 1}) is not None
+    assert dedup.admit('b', 'updateOrderbook', 'ETHBTC', {'sequence': 3}) is not None
+    assert dedup.stats() == {'delivered': [1, 2], 'duplicates': 2}
+
+
+def test_trades_are_trimmed_to_new_ones(dedup):
+    assert dedup.admit('a', 'updateTrades', 'ETHBTC', trades(1, 2)) is not None
+    assert dedup.admit('b', 'updateTrades', 'ETHBTC', trades(1, 2)) is None
+    params = dedup.admit('b', 'updateTrades', 'ETHBTC', trades(2, 3, 4))
+    assert [trade['id'] for trade in params['data']] == [3, 4]
+    assert dedup.admit('a', 'updateTrades', 'ETHBTC', trades(3, 4)) is None
+
+
+def test_tickers_are_deduplicated_by_timestamp(dedup):
+    ticker = {'symbol': 'ETHBTC', 'timestamp': '2018-01-01T00:00:01.000Z'}
+    assert dedup.admit('a', 'ticker', 'ETHBTC', ticker) is ticker
+    assert dedup.admit('b', 'ticker', 'ETHBTC', dict(ticker)) is None
+    ticker = {'symbol': 'ETHBTC', 'timestamp': '2018-01-01T00:00:02.000Z'}
+    assert dedup.admit('b', 'ticker', 'ETHBTC', ticker) is ticker
+
+
+def test_only_expected_responses_are_deduplicated(dedup):
+    dedup.expect('sub-1')
+    response = ({'id': 'sub-1'}, {'id': 'sub-1', 'result': True})
+    assert dedup.admit('b', 'Response', None, response) is response
+    assert dedup.admit('a', 'Response', None, response) is None
+    response = ({'id': 'login'}, {'id': 'login', 'result': True})
+    assert dedup.admit('a', 'Response', None, response) is response
+    assert dedup.admit('b', 'Response', None, response) is response
+
+
+def test_first_resolves_with_first_success():
+    futures = [Future(), Future()]
+    aggregate = first(futures, Future())
+    futures[0].set_exception(RequestTimeout({'id': 1}))
+    assert not aggregate.done()
+    futures[1].set_result('ok')
+    assert aggregate.result(1) == 'ok'
+
+
+def test_redundant_connections_deliver_each_item_once(server):
+    redundant = HitBTCRedundant(url=server.url, silent=True, log_level=logging.WARNING)
+    redundant.start()
+    try:
+        wait_for(lambda: all(client.is_connected() for client in redundant.clients))
+        assert redundant.subscribe_book(symbol='ETHBTC').result(5)
+        items = drain(redundant, 1)
+        sequence = redundant.order_book('ETHBTC').sequence
+    finally:
+        redundant.stop()
+    responses = [item for item in items if item[0] == 'Response']
+    sequences = [item[2]['sequence'] for item in items if item[0].endswith('Orderbook')]
+    assert len(responses) == 1
+    assert sequences and sequences == sorted(set(sequences))
+    assert redundant.stats()['duplicates'] > 0
+    assert sequence >= sequences[-1]
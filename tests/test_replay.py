@@ -0,0 +1,97 @@
+"""Tests of recording sessions and replaying them."""
+# Import Built-Ins
+import json
+import logging
+import threading
+
+# Import Third-Party
+import pytest
+
+# Import Homebrew
+from hitbtc import HitBTC
+from hitbtc.recording import FrameReader, FrameRecorder
+
+from tests.conftest import drain, wait_for
+
+
+def ticker(i):
+    return json.dumps({'jsonrpc': '2.0', 'method': 'ticker',
+                       'params': {'symbol': 'ETHBTC', 'last': str(i),
+                                  'timestamp': '2018-01-01T00:00:%02d.000Z' % i}})
+
+
+@pytest.fixture(params=[None, 'zlib'])
+def recording(request, tmp_path):
+    """A recording of 20 tickers, received 50ms apart."""
+    path = str(tmp_path / 'session.rec')
+    recorder = FrameRecorder(path, request.param, block_size=256)
+    for i in range(20):
+        recorder.write(ticker(i), received_at=i * 50000000)
+    recorder.close()
+    return path
+
+
+@pytest.fixture
+def thread_errors(monkeypatch):
+    """Collect exceptions raised in threads."""
+    errors = []
+    monkeypatch.setattr(threading, 'excepthook', errors.append)
+    return errors
+
+
+def replay(path, **kwargs):
+    return HitBTC(mode='replay', replay=path, silent=True, log_level=logging.WARNING, **kwargs)
+
+
+def test_recording_round_trip(recording):
+    with FrameReader(recording) as reader:
+        frames = [(received_at, str(frame, 'utf-8')) for received_at, frame in reader]
+    assert frames == [(i * 50000000, ticker(i)) for i in range(20)]
+
+
+def test_replay_delivers_all_frames(recording, thread_errors):
+    client = replay(recording)
+    client.start()
+    try:
+        assert client.conn.replay_done.wait(5)
+        items = drain(client, 0.1)
+    finally:
+        client.stop()
+    assert [item[2]['last'] for item in items] == [str(i) for i in range(20)]
+    assert client.latest_ticker('ETHBTC').value['last'] == '19'
+    assert not thread_errors
+
+
+def test_stop_during_paced_replay(recording, thread_errors):
+    client = replay(recording, speed=1)
+    client.start()
+    wait_for(lambda: client.conn.replayed)
+    client.stop()
+    assert client.conn.replay_done.is_set()
+    client.conn.join(5)
+    assert not client.conn.is_alive()
+    assert 0 < client.conn.replayed < 20
+    assert not thread_errors
+
+
+def test_replay_of_recorded_session(server, client_factory, tmp_path, thread_errors):
+    path = str(tmp_path / 'session.rec')
+    client = client_factory(record=path)
+    client.subscribe_book(symbol='ETHBTC').result(5)
+    wait_for(lambda: client.order_book('ETHBTC') is not None and
+             client.order_book('ETHBTC').sequence is not None)
+    drain(client, 0.5)
+    client.conn.recorder.flush()
+    frames = client.conn.recorder.frames
+    sequence = client.order_book('ETHBTC').sequence
+    client.stop()
+
+    replayed = replay(path)
+    replayed.start()
+    try:
+        assert replayed.conn.replay_done.wait(5)
+    finally:
+        replayed.stop()
+    assert replayed.conn.replayed >= frames
+    assert replayed.order_book('ETHBTC').sequence >= sequence
+    assert not thread_errors
@@ -0,0 +1,95 @@
+"""Tests of publishing order books into shared memory."""
+# Import Built-Ins
+import multiprocessing
+import struct
+import time
+
+# Import Third-Party
+import pytest
+
+# Import Homebrew
+from hitbtc.book import OrderBook
+from hitbtc.shm import SharedBookPublisher, SharedBookReader
+
+
+def book_of(size, depth):
+    book = OrderBook('ETHBTC')
+    for level in range(depth):
+        book.bids.update(1.0 - level / 100, size)
+        book.asks.update(1.0 + level / 100, size)
+    book.sequence = int(size)
+    return book
+
+
+def publish_forever(publisher, depth):
+    book = book_of(1.0, depth)
+    size = 1.0
+    while True:
+        size += 1
+        for level in range(depth):
+            book.bids.update(1.0 - level / 100, size)
+            book.asks.update(1.0 + level / 100, size)
+        book.sequence = int(size)
+        publisher.publish(book)
+
+
+def test_reader_never_sees_torn_books():
+    depth = 20
+    publisher = SharedBookPublisher(max_symbols=1, depth=depth)
+    publisher.publish(book_of(1.0, depth))
+    reader = SharedBookReader(publisher.name)
+    child = multiprocessing.get_context('fork').Process(target=publish_forever, args=(publisher, depth), daemon=True)
+    child.start()
+    try:
+        sequences = set()
+        deadline = time.monotonic() + 1
+        while time.monotonic() < deadline:
+            bids, asks, sequence = reader.top('ETHBTC')
+            assert len(bids) == len(asks) == depth
+            assert {size for _, size in bids + asks} == {float(sequence)}
+            sequences.add(sequence)
+        # The child published concurrently with the reads
+        assert len(sequences) > 1
+    finally:
+        child.terminate()
+        child.join()
+        reader.close()
+        publisher.close()
+
+
+def test_reader_best_and_clear():
+    publisher = SharedBookPublisher(max_symbols=1, depth=5)
+    reader = SharedBookReader(publisher.name)
+    try:
+        assert reader.best('ETHBTC') == (None, None)
+        publisher.publish(book_of(2.0, 3))
+        assert reader.symbols() == ['ETHBTC']
+        assert reader.best('ETHBTC') == ((1.0, 2.0), (1.0, 2.0))
+        publisher.clear('ETHBTC')
+        assert reader.top('ETHBTC') == ([], [], -1)
+        # Further symbols don't fit and are ignored
+        other = book_of(1.0, 1)
+        other.symbol = 'BTCUSD'
+        publisher.publish(other)
+        assert reader.top('BTCUSD') is None
+    finally:
+        reader.close()
+        publisher.close()
+
+
+def test_reader_gives_up_on_slot_left_mid_write():
+    publisher = SharedBookPublisher(max_symbols=1, depth=5)
+    reader = SharedBookReader(publisher.name)
+    try:
+        publisher.publish(book_of(2.0, 3))
+        # A publisher dying mid-write leaves the seqlock counter odd
+        offset = publisher.offset(publisher.slots['ETHBTC'])
+        counter, = struct.unpack_from('<Q', publisher.buf, offset)
+        struct.pack_into('<Q', publisher.buf, offset, counter + 1)
+        started = time.monotonic()
+        with pytest.raises(RuntimeError):
+            reader.top('ETHBTC')
+        assert time.monotonic() - started < 5
+    finally:
+        reader.close()
+        publisher.close()
@@ -0,0 +1,55 @@
+"""Tests of the shared memory ring buffer."""
+# Import Homebrew
+from hitbtc.shm import SharedRingBuffer
+
+
+def test_ring_buffer_round_trip():
+    ring = SharedRingBuffer.create(64)
+    try:
+        assert ring.get() is None
+        assert ring.put(b'abc')
+        assert ring.put(b'')
+        assert ring.get() == b'abc'
+        assert ring.get() == b''
+        assert ring.get() is None
+        assert len(ring) == 0
+    finally:
+        ring.close()
+
+
+def test_ring_buffer_wraps_around():
+    ring = SharedRingBuffer.create(64)
+    try:
+        # Records of 24 bytes regularly don't fit at the end of the 64 byte data area
+        for i in range(20):
+            record = bytes([i]) * 20
+            assert ring.put(record)
+            assert ring.get() == record
+        assert len(ring) == 0
+    finally:
+        ring.close()
+
+
+def test_ring_buffer_rejects_records_when_full():
+    ring = SharedRingBuffer.create(64)
+    try:
+        assert ring.put(b'x' * 28)
+        assert ring.put(b'y' * 28)
+        assert not ring.put(b'z')
+        assert ring.get() == b'x' * 28
+        assert ring.put(b'z')
+        assert ring.get() == b'y' * 28
+        assert ring.get() == b'z'
+    finally:
+        ring.close()
+
+
+def test_ring_buffer_attach():
+    ring = SharedRingBuffer.create(64)
+    try:
+        other = SharedRingBuffer.attach(ring.name)
+        ring.put(b'abc')
+        assert other.get() == b'abc'
+        other.close()
+    finally:
+        ring.close()
@@ -0,0 +1,37 @@
+"""Tests of the symbol registry's cache file."""
+# Import Built-Ins
+import json
+
+# Import Third-Party
+import pytest
+
+# Import Homebrew
+from hitbtc.symbols import SymbolRegistry
+
+SYMBOL = {'id': 'ETHBTC', 'baseCurrency': 'ETH', 'quoteCurrency': 'BTC',
+          'quantityIncrement': '0.001', 'tickSize': '0.000001',
+          'takeLiquidityRate': '0.001', 'provideLiquidityRate': '-0.0001',
+          'feeCurrency': 'BTC'}
+
+
+def test_cache_round_trip(tmp_path):
+    path = str(tmp_path / 'symbols.json')
+    SymbolRegistry(path).update_symbols([SYMBOL])
+    registry = SymbolRegistry(path)
+    assert 'ETHBTC' in registry
+
+
+@pytest.mark.parametrize('content', ['[]', '"x"', '{}', '{"updated_at": 1e12}',
+                                     '{"symbols": [], "updated_at": "now"}', 'not json'])
+def test_bad_cache_file_is_ignored(tmp_path, content):
+    path = tmp_path / 'symbols.json'
+    path.write_text(content)
+    registry = SymbolRegistry(str(path))
+    assert not registry.load()
+    assert len(registry) == 0
+
+
+def test_stale_cache_file_is_ignored(tmp_path):
+    path = tmp_path / 'symbols.json'
+    path.write_text(json.dumps({'updated_at': 0, 'symbols': [SYMBOL], 'currencies': []}))
+    assert len(SymbolRegistry(str(path))) == 0